@@ -0,0 +1,365 @@
+#!/usr/bin/env python3
+
+################################################################################
+# Luis Morgado da Costa (lmorgado.dacosta@gmail.com)
+# License: MIT License (see tab2lmf.py)
+# Files: align.py, tabreader.py, tab2lmf.py
+################################################################################
+
+
+################################################################################
+# USAGE & NOTES
+################################################################################
+# The first half of building a wordnet from aligned dictionaries: given a
+# bilingual dictionary (foreign headword -> English translations) and an
+# English wordnet in .tab form, it proposes synsets for each headword,
+# scores them, and writes the lang:lemma rows tab2lmf.py converts:
+#
+# python3 align.py mcm-eng.tsv wn-data-eng.tab --lang mcm --output mcm.tab \
+#                  --scores mcm-scores.tsv --jobs 4
+# python3 tab2lmf.py okwn mcm.tab --output okwn.xml
+#
+# The dictionary has one headword per line, with its translations
+# separated by tabs or by ';' (and an optional POS, n/v/a/r, after a '|'):
+#
+# bonitu    beautiful; pretty
+# kumí|v    eat; to have a meal
+#
+# Lines of the same headword (and POS) are put together if they follow each
+# other (sort -t$'\t' -k1,1 the dictionary otherwise). In translations,
+# 'to ' before verbs and 'a ', 'an ', 'the ' are dropped, and words in
+# parentheses are kept as context for the glosses: 'bank (of a river)'.
+#
+# The candidates of a headword are the synsets of its translations (their
+# :lemma rows in the English .tab, in order, which gives their sense rank).
+# Each candidate gets four signals, combined as a noisy-or of their
+# WEIGHTS (conf = 1 - (1 - w1 s1) (1 - w2 s2) ...):
+#
+# - overlap:  how many of the translations share the synset (two different
+#             translations in one synset is the strongest evidence);
+# - senses:   1 / the number of synsets of the translation (1 if it is
+#             monosemous);
+# - rank:     1 / (1 + the sense rank of the synset for the translation);
+# - gloss:    the share of the other words of the entry (of translations
+#             that are not in the synset, and context words) found in the
+#             synset's lemmas and :def rows.
+#
+# Rows with conf >= --threshold (0.6 by default) are written, best first
+# for each headword; --scores writes the best --candidates of each
+# headword with their signals, to review them or to choose the threshold.
+# The summary gives the mean conf of the rows written, which is what the
+# 'conf' of the wordnet's meta data (its confidenceScore) should be.
+# bench_align.py measures the precision and recall of each threshold on a
+# synthetic dictionary (there, 0.6 is the lowest with a precision above
+# 0.85), and the throughput.
+#
+# The English wordnet is read once into compact structures (words and
+# synsets as integers, the words of each synset as a frozenset, so that
+# each signal is a set operation in C). The dictionary is read as a
+# stream and scored in chunks of CHUNK_SIZE entries; with --jobs N the
+# chunks are scored by N worker processes (forked, so they share the
+# English wordnet), and the rows come out in the order of the dictionary.
+################################################################################
+
+import sys, re, argparse, multiprocessing
+from operator import itemgetter
+from tabreader import TabReader, LEMMA, DEF
+from lmfwriter import open_output, close_output
+from lexicon import gc_paused
+
+CHUNK_SIZE = 2000  # dictionary entries scored at a time
+THRESHOLD = 0.6
+CANDIDATES = 10  # best candidates of each headword written to --scores
+WEIGHTS = {'overlap': 0.85, 'senses': 0.7, 'rank': 0.3, 'gloss': 0.8}
+
+STOPWORDS = frozenset('''a an the of to in on at by for from with as or and not no be is are was
+    were been being it its this that these those some any one who which what something someone
+    somebody thing things way etc'''.split())
+
+_words = re.compile(r"\w+").findall
+_parentheses = re.compile(r"\(([^)]*)\)|\[([^]]*)\]")
+_prefixes = ('to ', 'a ', 'an ', 'the ')
+
+
+def content_words(text):
+    return [w for w in _words(text.lower()) if w not in STOPWORDS and len(w) > 1]
+
+
+def normalize(translation):
+    """the lemma key of a translation, and its context words (from the
+       parentheses)"""
+    context = []
+    for m in _parentheses.finditer(translation):
+        context.extend(content_words(m.group(1) or m.group(2) or ''))
+    key = ' '.join(_parentheses.sub(' ', translation).replace('_', ' ').lower().split())
+    for prefix in _prefixes:
+        if key.startswith(prefix) and len(key) > len(prefix):
+            key = key[len(prefix):]
+            break
+    return key, context
+
+
+################################################################################
+# THE ENGLISH WORDNET
+################################################################################
+class English:
+    """the lemmas, synsets and gloss words of an English wordnet (.tab),
+       with words and synsets numbered"""
+
+    def __init__(self):
+        self.words = dict()    # words['dog'] = 17
+        self.synsets = []      # synsets[n] = '02084071-n'
+        self.numbers = dict()  # numbers['02084071-n'] = n
+        self.lemmas = dict()   # lemmas['dog'] = (n, ...), in sense order
+        self.glosses = []      # glosses[n] = frozenset of the word numbers of synset n
+
+    def word_numbers(self, words):
+        return {self.words.setdefault(w, len(self.words)) for w in words}
+
+    @gc_paused
+    def read(self, fn, lang='eng'):
+        lemmas = dict()
+        glosses = dict()  # glosses[n] = set of word numbers (while reading)
+        self.reader = TabReader(fn)
+        for (kind, ss, l, a, b, _) in self.reader:
+            if l != lang or (kind is not LEMMA and kind is not DEF):
+                continue
+            n = self.numbers.get(ss)
+            if n is None:
+                n = self.numbers[ss] = len(self.synsets)
+                self.synsets.append(ss)
+            if kind is LEMMA:
+                key = normalize(a)[0]
+                senses = lemmas.setdefault(key, [])
+                if n not in senses:
+                    senses.append(n)
+                words = content_words(a)
+            else:
+                words = content_words(b)
+            glosses.setdefault(n, set()).update(self.word_numbers(words))
+        self.lemmas = {key: tuple(senses) for key, senses in lemmas.items()}
+        empty = frozenset()
+        self.glosses = [frozenset(glosses[n]) if n in glosses else empty for n in range(len(self.synsets))]
+        return self
+
+
+################################################################################
+# SCORING
+################################################################################
+def score_entry(english, translations, pos=None):
+    """the candidate synsets of a dictionary entry, as (conf, synset
+       number, signals) tuples, best first"""
+
+    keys, context = [], []
+    for translation in translations:
+        key, words = normalize(translation)
+        context.extend(words)
+        if key and key not in keys:
+            keys.append(key)
+
+    found = []  # (key, senses) of the translations in the wordnet
+    for key in keys:
+        senses = english.lemmas.get(key)
+        if senses and pos:
+            senses = tuple(n for n in senses if english.synsets[n][-1].replace('s', 'a') == pos)
+        if senses:
+            found.append((key, senses))
+        else:  # (the words of the others are context)
+            context.extend(content_words(key))
+    if not found:
+        return []
+
+    # candidates[synset] = (its translations, fewest senses, best rank);
+    # most synsets come from a single translation, so that is a str
+    candidates = dict()
+    for key, senses in found:
+        count = len(senses)
+        for rank, n in enumerate(senses):
+            c = candidates.get(n)
+            if c is None:
+                candidates[n] = (key, count, rank)
+            else:
+                linked = c[0] if type(c[0]) is tuple else (c[0],)
+                candidates[n] = (linked + (key,), min(c[1], count), min(c[2], rank))
+
+    words = english.words
+    context = {words[w] for w in context if w in words}
+    all_words = {key: {words[w] for w in content_words(key) if w in words} for key, _ in found}
+    # others_of[translations] = the other words of the entry
+    others_of = {key: context.union(*(words for other, words in all_words.items() if other != key))
+                 - all_words[key] for key in all_words}
+    glosses = english.glosses
+    k = len(found)
+    w_overlap, w_senses, w_rank, w_gloss = (WEIGHTS[s] for s in ('overlap', 'senses', 'rank', 'gloss'))
+
+    scored = []
+    for n, (linked, count, rank) in candidates.items():
+        others = others_of.get(linked)
+        if others is None:
+            others = others_of[linked] = context.union(*(words for key, words in all_words.items()
+                                                         if key not in linked)).difference(
+                                                             *(all_words[key] for key in linked))
+        overlap = (len(linked) - 1) / (k - 1) if type(linked) is tuple else 0.0
+        gloss = len(others & glosses[n]) / len(others) if others else 0.0
+        signals = (overlap, 1 / count, 1 / (1 + rank), gloss)
+        conf = 1 - ((1 - w_overlap * overlap) * (1 - w_senses * signals[1]) *
+                    (1 - w_rank * signals[2]) * (1 - w_gloss * gloss))
+        scored.append((conf, n, signals))
+    scored.sort(key=itemgetter(0), reverse=True)  # (stable: ties stay in sense order)
+    return scored
+
+
+def score_chunk(english, entries, lang, threshold, candidates):
+    """the .tab rows (and score lines) of a chunk of dictionary entries,
+       and counts: entries, entries with candidates, rows and their conf;
+       there are score lines for the best candidates of each entry (none
+       if candidates is 0)"""
+
+    rows, scores = [], []
+    counts = [len(entries), 0, 0, 0.0]
+    synsets = english.synsets
+    for headword, pos, translations in entries:
+        scored = score_entry(english, translations, pos)
+        if not scored:
+            continue
+        counts[1] += 1
+        for conf, n, _ in scored:
+            if conf < threshold:
+                break
+            rows.append('%s\t%s:lemma\t%s\n' % (synsets[n], lang, headword))
+            counts[2] += 1
+            counts[3] += conf
+        if candidates:
+            entry = '\t%s\t%s\t' % (lang, headword)
+            glossed = '; '.join(translations)
+            scores.extend('%s%s%.4f\t%.3f\t%.3f\t%.3f\t%.3f\t%s\n' % ((synsets[n], entry, conf) + signals + (glossed,))
+                          for conf, n, signals in scored[:candidates])
+    return ''.join(rows), ''.join(scores), counts
+
+
+forked = None  # (english, lang, threshold, candidates), as seen by the worker processes
+
+def score_forked_chunk(entries):
+    english, lang, threshold, candidates = forked
+    return score_chunk(english, entries, lang, threshold, candidates)
+
+
+################################################################################
+# THE DICTIONARY
+################################################################################
+def read_dictionary(fn):
+    """yields the (headword, pos, translations) of a dictionary (see the
+       notes above); consecutive lines of the same headword are merged"""
+
+    entry = None
+    with open(fn, encoding='utf-8') as f:
+        for line in f:
+            fields = line.rstrip('\n').split('\t')
+            headword = fields[0].strip()
+            if not headword or headword.startswith('#') or len(fields) < 2:
+                continue
+            pos = None
+            if '|' in headword:
+                headword, pos = (s.strip() for s in headword.rsplit('|', 1))
+                pos = pos.replace('s', 'a') or None
+            translations = [t.strip() for field in fields[1:] for t in field.split(';') if t.strip()]
+            if entry and entry[0] == headword and entry[1] == pos:
+                entry[2].extend(t for t in translations if t not in entry[2])
+                continue
+            if entry:
+                yield tuple(entry)
+            entry = [headword, pos, translations]
+    if entry:
+        yield tuple(entry)
+
+
+def chunks(entries, size=CHUNK_SIZE):
+    chunk = []
+    for entry in entries:
+        chunk.append(entry)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def align(english, dictionary, lang, out, scores=None, threshold=THRESHOLD, candidates=CANDIDATES, jobs=1):
+    """writes the lang:lemma rows of the entries of the dictionary file
+       whose conf is at least threshold to out (and the best candidates
+       of each to scores, if given); returns the counts of score_chunk(),
+       summed"""
+
+    global forked
+
+    pool = None
+    if scores is None:
+        candidates = 0
+    if jobs > 1:
+        forked = (english, lang, threshold, candidates)
+        pool = multiprocessing.get_context('fork').Pool(jobs)
+        results = pool.imap(score_forked_chunk, chunks(read_dictionary(dictionary)))
+    else:
+        results = (score_chunk(english, chunk, lang, threshold, candidates)
+                   for chunk in chunks(read_dictionary(dictionary)))
+
+    if scores is not None:
+        scores.write('# synset\tlang\tlemma\tconf\toverlap\tsenses\trank\tgloss\ttranslations\n')
+    totals = [0, 0, 0, 0.0]
+    try:
+        for rows, score_lines, counts in results:
+            out.write(rows)
+            if scores is not None:
+                scores.write(score_lines)
+            totals = [t + c for t, c in zip(totals, counts)]
+    finally:
+        if pool:
+            pool.close()
+            pool.join()
+            forked = None
+    return totals
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description="Align a bilingual dictionary to an English wordnet")
+    parser.add_argument('dictionary', help="headword <tab> translations (see align.py)")
+    parser.add_argument('english', help="the English wordnet, as a .tab file (.gz/.xz)")
+    parser.add_argument('--lang', required=True, help="the language of the headwords (e.g. mcm)")
+    parser.add_argument('--english-lang', default='eng', help="the language of the English rows")
+    parser.add_argument('--output', help=".tab file to write (.gz/.zst are compressed; default: stdout)")
+    parser.add_argument('--scores', metavar='FILE', help="also write the candidates with their signals")
+    parser.add_argument('--candidates', type=int, default=CANDIDATES,
+                        help="candidates of each headword in --scores (default: {})".format(CANDIDATES))
+    parser.add_argument('--threshold', type=float, default=THRESHOLD,
+                        help="lowest conf of the rows written (default: {})".format(THRESHOLD))
+    parser.add_argument('--jobs', type=int, default=1, help="worker processes")
+    args = parser.parse_args(args)
+
+    english = English().read(args.english, args.english_lang)
+    english.reader.problems.report()
+    sys.stderr.write("{}: {} lemmas, {} synsets\n".format(args.english, len(english.lemmas),
+                                                          len(english.synsets)))
+    if not english.lemmas:
+        sys.stderr.write("No {}:lemma rows in {}\n".format(args.english_lang, args.english))
+        return 1
+
+    out = open_output(args.output)
+    scores = open_output(args.scores) if args.scores else None
+    try:
+        entries, aligned, rows, conf = align(english, args.dictionary, args.lang, out, scores,
+                                             args.threshold, args.candidates, args.jobs)
+    finally:
+        close_output(out)
+        if scores:
+            close_output(scores)
+
+    sys.stderr.write("{}: {} headwords, {} with candidates, {} rows with conf >= {}\n".format(
+        args.dictionary, entries, aligned, rows, args.threshold))
+    if rows:
+        sys.stderr.write("mean conf of the rows: {0:.2f} (for the meta data: 'conf':\"{0:.2f}\")\n".format(
+            conf / rows))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+
+################################################################################
+# Luis Morgado da Costa (lmorgado.dacosta@gmail.com)
+# License: MIT License (see tab2lmf.py)
+# Files: tab2lmf.py, lexicon.py, lmfwriter.py, backends.py, lookup.py
+################################################################################
+
+
+################################################################################
+# USAGE & NOTES
+################################################################################
+# This file is a companion to tab2lmf.py (--sqlite, --parquet): output
+# backends besides the WN-LMF XML, fed from the same wordnet read_wn()
+# returns, so that one run gives the XML and the database.
+#
+# Both backends write the same tables, given once in TABLES and filled by
+# table_rows(). Rows refer to each other by integer keys (numbered in the
+# order the XML writer writes the elements); the XML ids are kept as well:
+#
+# lexicons           rowid, id, language, label, email, license, version,
+#                    citation, url, description, confidence
+# synsets            rowid, id, lexicon, offset, pos, ili
+# entries            rowid, id, lexicon, lemma, pos
+# forms              entry, rank, form, category, tag
+# senses             rowid, id, entry, synset, rank
+# definitions        synset, language, rank, definition
+# examples           synset, language, rank, example
+# synset_relations   source, type, target    (synsets)
+# sense_relations    source, type, target    (senses)
+#
+# Forms are those of the XML (the variants, and their ASCII transliterations
+# with category 'transliteration'), and definitions are kept one per row
+# instead of joined with '; '.
+#
+# - sqlite: one transaction, with journaling and syncing off while the
+#   rows are loaded with executemany() (straight from the row generators,
+#   so no table is built in memory), and the indexes (INDEXES) created
+#   after the load, which is much faster than updating them row by row;
+# - parquet: one .parquet file per table in a directory; this needs the
+#   pyarrow package (pip install pyarrow);
+# - lookup: not these tables, but the index of the forms of the wordnet
+#   (lemmas, variants and their ASCII forms) to find synsets by exact,
+#   folded and prefix queries, see lookup.py.
+#
+# More backends can be added to BACKENDS, as write(wn, meta, path).
+################################################################################
+
+import os, sqlite3
+from lmfwriter import lmf_forms, entry_forms
+from translit import transliterate
+from lookup import write_lookup
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+
+TABLES = [
+    ('lexicons', [('rowid', 'INTEGER PRIMARY KEY'), ('id', 'TEXT'), ('language', 'TEXT'),
+                  ('label', 'TEXT'), ('email', 'TEXT'), ('license', 'TEXT'), ('version', 'TEXT'),
+                  ('citation', 'TEXT'), ('url', 'TEXT'), ('description', 'TEXT'),
+                  ('confidence', 'TEXT')]),
+    ('synsets', [('rowid', 'INTEGER PRIMARY KEY'), ('id', 'TEXT'), ('lexicon', 'INTEGER'),
+                 ('offset', 'TEXT'), ('pos', 'TEXT'), ('ili', 'TEXT')]),
+    ('entries', [('rowid', 'INTEGER PRIMARY KEY'), ('id', 'TEXT'), ('lexicon', 'INTEGER'),
+                 ('lemma', 'TEXT'), ('pos', 'TEXT')]),
+    ('forms', [('entry', 'INTEGER'), ('rank', 'INTEGER'), ('form', 'TEXT'),
+               ('category', 'TEXT'), ('tag', 'TEXT')]),
+    ('senses', [('rowid', 'INTEGER PRIMARY KEY'), ('id', 'TEXT'), ('entry', 'INTEGER'),
+                ('synset', 'INTEGER'), ('rank', 'INTEGER')]),
+    ('definitions', [('synset', 'INTEGER'), ('language', 'TEXT'), ('rank', 'INTEGER'),
+                     ('definition', 'TEXT')]),
+    ('examples', [('synset', 'INTEGER'), ('language', 'TEXT'), ('rank', 'INTEGER'),
+                  ('example', 'TEXT')]),
+    ('synset_relations', [('source', 'INTEGER'), ('type', 'TEXT'), ('target', 'INTEGER')]),
+    ('sense_relations', [('source', 'INTEGER'), ('type', 'TEXT'), ('target', 'INTEGER')]),
+]
+
+INDEXES = [
+    ('lexicons', 'id', True), ('synsets', 'id', True), ('synsets', 'offset', False),
+    ('synsets', 'ili', False), ('entries', 'id', True), ('entries', 'lemma', False),
+    ('forms', 'entry', False), ('forms', 'form', False), ('senses', 'id', True),
+    ('senses', 'entry', False), ('senses', 'synset', False), ('definitions', 'synset', False),
+    ('examples', 'synset', False), ('synset_relations', 'source', False),
+    ('synset_relations', 'target', False), ('sense_relations', 'source', False),
+    ('sense_relations', 'target', False),
+]
+
+
+################################################################################
+# ROWS
+################################################################################
+def table_rows(wn, meta):
+    """a generator of the rows (tuples, in the order of TABLES) of each
+       table, by name; the generators share the numbering of synsets,
+       entries and senses, so they must be run in the order of TABLES"""
+
+    wnid = wn.wnid
+    synset_keys = dict()  # synset_keys['01646866-v'] = synsets.rowid
+    sense_keys = dict()   # sense_keys[(lang, lemma, ss)] = senses.rowid (for srels)
+
+    def lexicons():
+        info = meta[wnid]
+        for n, lang in enumerate(wn.lexicons, 1):
+            yield (n, wnid + '-' + lang, lang, info['label'], info['email'], info['license'],
+                   info['version'], info['citation'], info['url'], info['description'], info['conf'])
+
+    def synsets():
+        for l, lexicon in enumerate(wn.lexicons.values(), 1):
+            for synset in lexicon.synsets:
+                n = synset_keys[synset.ss] = len(synset_keys) + 1
+                yield (n, wn.synset_id(synset), l, synset.ss, synset.pos, synset.ili)
+
+    def entries():
+        n = 0
+        for l, lexicon in enumerate(wn.lexicons.values(), 1):
+            for entry in lexicon.entries:
+                n += 1
+                yield (n, lexicon.entry_id(entry), l, entry.lemma, entry.pos)
+
+    def forms():
+        transliterate.batch(entry_forms((entry.lemma, entry.variants)
+                                        for lexicon in wn.lexicons.values() for entry in lexicon.entries))
+        n = 0
+        for lexicon in wn.lexicons.values():
+            for entry in lexicon.entries:
+                n += 1
+                for rank, (form, cat, tag) in enumerate(lmf_forms(entry.lemma, entry.variants)):
+                    yield (n, rank, form, cat, tag)
+
+    def senses():
+        e = s = 0
+        nodes = wn.srels.nodes
+        for lexicon in wn.lexicons.values():
+            for entry in lexicon.entries:
+                e += 1
+                lexID = lexicon.entry_id(entry)
+                for rank, synset in enumerate(entry.senses):
+                    s += 1
+                    key = (lexicon.lang, entry.lemma, synset.ss)
+                    if key in nodes and wn.senses.get(key, (None, None))[1] is entry:
+                        sense_keys[key] = s
+                    yield (s, wn.synset_id(synset) + '-' + lexID, e, synset_keys[synset.ss], rank)
+
+    def glosses(glosses):
+        for ss, n in synset_keys.items():
+            by_lang = glosses.get(ss)
+            if by_lang:
+                for lang, texts in by_lang.items():
+                    for rank, text in enumerate(texts):
+                        yield (n, lang, rank, text)
+
+    def synset_relations():
+        for ss, n in synset_keys.items():
+            for rel, target in wn.ssrels.targets(ss):
+                yield (n, rel, synset_keys[target])
+
+    def sense_relations():
+        for key, n in sense_keys.items():
+            for rel, target in wn.srels.targets(key):
+                yield (n, rel, sense_keys[target])
+
+    return {'lexicons': lexicons(), 'synsets': synsets(), 'entries': entries(),
+            'forms': forms(), 'senses': senses(), 'definitions': glosses(wn.defs),
+            'examples': glosses(wn.exes), 'synset_relations': synset_relations(),
+            'sense_relations': sense_relations()}
+
+
+################################################################################
+# BACKENDS
+################################################################################
+def write_sqlite(wn, meta, path):
+    """writes the tables into a new SQLite database at path"""
+
+    if os.path.exists(path):
+        os.remove(path)
+    db = sqlite3.connect(path, isolation_level=None)
+    db.execute("PRAGMA journal_mode = OFF")
+    db.execute("PRAGMA synchronous = OFF")
+    db.execute("BEGIN")
+    rows = table_rows(wn, meta)
+    for name, columns in TABLES:
+        db.execute("CREATE TABLE {} ({})".format(
+            name, ', '.join('{} {}'.format(column, kind) for column, kind in columns)))
+        db.executemany("INSERT INTO {} VALUES ({})".format(name, ', '.join('?' * len(columns))),
+                       rows[name])
+    for table, column, unique in INDEXES:
+        db.execute("CREATE {}INDEX {}_{} ON {} ({})".format(
+            'UNIQUE ' if unique else '', table, column, table, column))
+    db.execute("COMMIT")
+    db.execute("ANALYZE")
+    db.close()
+
+
+def write_parquet(wn, meta, path):
+    """writes each table to path/table.parquet"""
+
+    if pyarrow is None:
+        raise SystemExit("Writing {} needs the pyarrow package (pip install pyarrow)".format(path))
+    types = {'INTEGER': pyarrow.int64(), 'TEXT': pyarrow.string()}
+    os.makedirs(path, exist_ok=True)
+    rows = table_rows(wn, meta)
+    for name, columns in TABLES:
+        schema = pyarrow.schema([(column, types[kind.split()[0]]) for column, kind in columns])
+        data = list(zip(*rows[name])) or [()] * len(columns)
+        table = pyarrow.table([pyarrow.array(values, type=field.type)
+                               for values, field in zip(data, schema)], schema=schema)
+        pyarrow.parquet.write_table(table, os.path.join(path, name + '.parquet'))
+
+
+BACKENDS = {'sqlite': write_sqlite, 'parquet': write_parquet, 'lookup': write_lookup}
@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+
+################################################################################
+# Luis Morgado da Costa (lmorgado.dacosta@gmail.com)
+# License: MIT License (see tab2lmf.py)
+################################################################################
+
+
+################################################################################
+# USAGE & NOTES
+################################################################################
+# Benchmark of the dictionary alignment (align.py), on an English wordnet
+# written by synthetic.py and a dictionary made from it, so that the
+# synset each headword was made from is known. Each headword gets one to
+# three lemmas of its synset as translations; one in five also gets a
+# wrong one (a lemma of another synset), and one in four a word of the
+# synset's definition in parentheses.
+#
+# It gives the time to read the English wordnet, the throughput of the
+# alignment (in headwords and in translations per second) with 1 and with
+# --jobs processes, and the precision and recall of the rows written at
+# several thresholds (a row is right if its synset is the one the
+# headword was made from).
+#
+# python3 bench_align.py [number of .tab lines] [number of headwords] [jobs]
+################################################################################
+
+import sys, os, io, random, tempfile, time
+from synthetic import synthetic_tab
+from align import English, align, content_words
+
+THRESHOLDS = (0.3, 0.4, 0.5, 0.6, 0.7, 0.8)
+
+
+def synthetic_dictionary(fn, english, headwords, seed=0):
+    """writes a dictionary of headwords made from synsets of english;
+       returns the synset of each headword, and the number of translations"""
+    rnd = random.Random(seed)
+    lemmas = dict()  # lemmas[synset number] = its lemmas
+    for key, senses in english.lemmas.items():
+        for n in senses:
+            lemmas.setdefault(n, []).append(key)
+    numbers = sorted(lemmas)
+    words = {number: word for word, number in english.words.items()}
+    truth, translations = dict(), 0
+    with open(fn, 'w', encoding='utf-8') as f:
+        for i in range(headwords):
+            n = numbers[rnd.randrange(len(numbers))]
+            chosen = rnd.sample(lemmas[n], min(len(lemmas[n]), rnd.randint(1, 3)))
+            if rnd.random() < 0.2:
+                chosen.append(rnd.choice(lemmas[numbers[rnd.randrange(len(numbers))]]))
+            if rnd.random() < 0.25:
+                gloss = sorted(english.glosses[n] - {english.words.get(w) for w in content_words(' '.join(chosen))})
+                if gloss:
+                    chosen[0] += ' ({})'.format(words[rnd.choice(gloss)])
+            headword = 'hw{}'.format(i)
+            truth[headword] = english.synsets[n]
+            translations += len(chosen)
+            f.write('{}\t{}\n'.format(headword, '; '.join(chosen)))
+    return truth, translations
+
+
+def evaluate(scores, truth, threshold):
+    """precision and recall of the candidates with conf >= threshold"""
+    right = wrong = 0
+    for line in scores:
+        ss, _, headword, conf = line.split('\t', 4)[:4]
+        if float(conf) >= threshold:
+            if truth[headword] == ss:
+                right += 1
+            else:
+                wrong += 1
+    return right / max(1, right + wrong), right / len(truth)
+
+
+if __name__ == '__main__':
+    lines = int(sys.argv[1]) if len(sys.argv) > 1 else 300000
+    headwords = int(sys.argv[2]) if len(sys.argv) > 2 else 200000
+    jobs = int(sys.argv[3]) if len(sys.argv) > 3 else os.cpu_count() or 1
+
+    tmp = tempfile.mkdtemp()
+    tab, dictionary = os.path.join(tmp, 'eng.tab'), os.path.join(tmp, 'dict.tsv')
+    try:
+        synthetic_tab(tab, lines, langs=['eng'])
+        start = time.perf_counter()
+        english = English().read(tab)
+        print('{:,} lines: {:,} lemmas, {:,} synsets, {:,} words; read in {:.2f} s'.format(
+            lines, len(english.lemmas), len(english.synsets), len(english.words), time.perf_counter() - start))
+        truth, translations = synthetic_dictionary(dictionary, english, headwords)
+
+        scores = None
+        for n in sorted({1, jobs}):
+            out, scores = io.StringIO(), io.StringIO()
+            start = time.perf_counter()
+            entries, aligned, rows, conf = align(english, dictionary, 'xxx', out, scores, jobs=n)
+            seconds = time.perf_counter() - start
+            print('{} job(s): {:,} headwords in {:.2f} s, {:10,.0f} headwords/s {:10,.0f} translations/s; '
+                  '{:,} rows, mean conf {:.2f}'.format(n, entries, seconds, entries / seconds,
+                                                       translations / seconds, rows, conf / max(1, rows)))
+
+        candidates = scores.getvalue().splitlines()[1:]
+        print('{:>9} {:>10} {:>8}'.format('threshold', 'precision', 'recall'))
+        for threshold in THRESHOLDS:
+            print('{:9.1f} {:10.3f} {:8.3f}'.format(threshold, *evaluate(candidates, truth, threshold)))
+    finally:
+        for fn in (tab, dictionary):
+            if os.path.exists(fn):
+                os.remove(fn)
+        os.rmdir(tmp)
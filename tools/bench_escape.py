@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+
+################################################################################
+# Luis Morgado da Costa (lmorgado.dacosta@gmail.com)
+# License: MIT License (see tab2lmf.py)
+################################################################################
+
+
+################################################################################
+# USAGE & NOTES
+################################################################################
+# Measures what XML escaping costs the writer: lmfwriter.write_lmf is timed
+# as it is, and with the escape functions replaced by no-ops (the old,
+# unescaped output), on a synthetic .tab file where about 1% of the
+# definitions and examples contain characters that need escaping (best
+# CPU time of the repeats of each, timed in turns).
+#
+# python3 bench_escape.py [number of lines] [repeats]
+################################################################################
+
+import sys, os, io, random, tempfile, time
+from collections import defaultdict as dd
+from synthetic import synthetic_tab
+from lexicon import read_wn
+import lmfwriter
+
+# the escaping functions the writer calls as it renders (see xmlescape.py;
+# ids are escaped once, while reading)
+ESCAPES = ('escape_attr', 'escape_text', 'escape_name')
+
+
+def write_time(wn, meta):
+    out = io.StringIO()
+    start = time.process_time()
+    lmfwriter.write_lmf(wn, meta, out)
+    return time.process_time() - start, len(out.getvalue())
+
+
+def unescaped_time(wn, meta):
+    escapes = {name: getattr(lmfwriter, name) for name in ESCAPES}
+    for name in ESCAPES:
+        setattr(lmfwriter, name, lambda s: s)
+    try:
+        return write_time(wn, meta)[0]
+    finally:
+        for name, f in escapes.items():
+            setattr(lmfwriter, name, f)
+
+
+if __name__ == '__main__':
+    lines = int(sys.argv[1]) if len(sys.argv) > 1 else 300000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+
+    meta = dd(lambda: dd(str))
+    meta['bench'] = dd(str, {'id': 'bench', 'label': 'Benchmark & co.', 'conf': '1.0'})
+
+    fd, tab = tempfile.mkstemp(suffix='.tab')
+    os.close(fd)
+    try:
+        synthetic_tab(tab, lines)
+        wn = read_wn(tab, 'bench', dd(str))
+    finally:
+        os.remove(tab)
+
+    rnd = random.Random(0)
+    for glosses in (wn.defs, wn.exes):
+        for by_lang in glosses.values():
+            for texts in by_lang.values():
+                for i in range(len(texts)):
+                    if rnd.random() < 0.01:
+                        texts[i] += ' (A&B <x>)'
+
+    # (the two are timed in turns, so that a slower or faster spell of the
+    # machine does not fall on only one of them)
+    escaped = unescaped = None
+    for _ in range(repeats):
+        seconds, size = write_time(wn, meta)
+        escaped = seconds if escaped is None else min(escaped, seconds)
+        seconds = unescaped_time(wn, meta)
+        unescaped = seconds if unescaped is None else min(unescaped, seconds)
+
+    print('{:,} lines, {:.1f} MB of XML'.format(lines, size / 2**20))
+    print('unescaped  {:6.3f} s'.format(unescaped))
+    print('escaped    {:6.3f} s'.format(escaped))
+    print('overhead   {:6.1f} %'.format(100 * (escaped - unescaped) / unescaped))
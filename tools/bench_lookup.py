@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+
+################################################################################
+# Luis Morgado da Costa (lmorgado.dacosta@gmail.com)
+# License: MIT License (see tab2lmf.py)
+################################################################################
+
+
+################################################################################
+# USAGE & NOTES
+################################################################################
+# Benchmark of the lemma lookup index (lookup.py), on a wordnet read from a
+# synthetic .tab file (synthetic.py): the time to build, write and load the
+# index, the latency of single exact, folded and prefix queries (mean,
+# median and 99th percentile, in microseconds), and the throughput of a
+# batch of 100k exact and folded queries (LemmaIndex.batch).
+#
+# Queries are forms of the wordnet (lemmas, variants, in upper case for the
+# folded ones), with one in ten that is not in it.
+#
+# python3 bench_lookup.py [number of lines] [number of single queries]
+################################################################################
+
+import sys, os, random, tempfile, time
+from collections import defaultdict as dd
+from synthetic import synthetic_tab
+from lexicon import read_wn
+from lookup import compile_index, load_lookup
+
+BATCH = 100000
+
+
+def latencies(f, queries):
+    """mean, median and 99th percentile of f(query), in microseconds"""
+    times = []
+    for query in queries:
+        start = time.perf_counter_ns()
+        f(query)
+        times.append(time.perf_counter_ns() - start)
+    times.sort()
+    return (sum(times) / len(times) / 1000, times[len(times) // 2] / 1000,
+            times[int(len(times) * 0.99)] / 1000)
+
+
+if __name__ == '__main__':
+    lines = int(sys.argv[1]) if len(sys.argv) > 1 else 300000
+    singles = int(sys.argv[2]) if len(sys.argv) > 2 else 10000
+
+    tmp = tempfile.mkdtemp()
+    tab, idx = os.path.join(tmp, 'wn.tab'), os.path.join(tmp, 'wn.lemmas')
+    try:
+        synthetic_tab(tab, lines)
+        wn = read_wn(tab, 'bench', dd(str))
+
+        start = time.perf_counter()
+        data = compile_index(wn)
+        with open(idx, 'wb') as f:
+            f.write(data)
+        built = time.perf_counter() - start
+        start = time.perf_counter()
+        index = load_lookup(idx)
+        loaded = time.perf_counter() - start
+        print('{:,} lines: {:,} forms, {:.1f} MB; built in {:.2f} s, loaded in {:.3f} ms'.format(
+            lines, len(index), len(data) / 2**20, built, loaded * 1000))
+
+        rnd = random.Random(0)
+        forms = [(lang, form) for lang, lexicon in wn.lexicons.items()
+                 for entry in lexicon.entries for form in (entry.lemma,) + entry.variants]
+        del wn
+
+        def queries(n):
+            for _ in range(n):
+                lang, form = forms[rnd.randrange(len(forms))]
+                yield lang, form if rnd.random() < 0.9 else form + 'qx'
+
+        single = list(queries(singles))
+        print('{:<16} {:>10} {:>10} {:>10}'.format('query', 'mean us', 'median us', 'p99 us'))
+        for name, f in [('exact', lambda q: index.exact(q[1], q[0])),
+                        ('exact, any lang', lambda q: index.exact(q[1])),
+                        ('folded', lambda q: index.folded(q[1].upper(), q[0])),
+                        ('prefix (10)', lambda q: index.prefix(q[1][:3], q[0], limit=10))]:
+            print('{:<16} {:10.1f} {:10.1f} {:10.1f}'.format(name, *latencies(f, single)))
+
+        batch = [form for _, form in queries(BATCH)]
+        for name, folded in [('exact', False), ('folded', True)]:
+            start = time.perf_counter()
+            found = index.batch(batch, folded=folded)
+            seconds = time.perf_counter() - start
+            print('batch of {:,} {:<7} {:8.2f} s  {:10,.0f} queries/s  ({:,} distinct forms found)'.format(
+                BATCH, name, seconds, BATCH / seconds, sum(1 for synsets in found.values() if synsets)))
+    finally:
+        for fn in (tab, idx):
+            if os.path.exists(fn):
+                os.remove(fn)
+        os.rmdir(tmp)
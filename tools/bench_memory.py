@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+
+################################################################################
+# Luis Morgado da Costa (lmorgado.dacosta@gmail.com)
+# License: MIT License (see tab2lmf.py)
+################################################################################
+
+
+################################################################################
+# USAGE & NOTES
+################################################################################
+# Compares the memory held by the wordnet model in lexicon.py against the
+# nested dict-of-dict-of-set structure tab2lmf.py used to build, on a
+# synthetic .tab file (synthetic.py, 1M lines by default).
+#
+# python3 bench_memory.py [number of lines]
+################################################################################
+
+import sys, os, gc, tempfile, time, tracemalloc
+from collections import defaultdict as dd
+from synthetic import synthetic_tab
+from lexicon import read_wn
+
+
+def read_wn_nested(fn, wnid, ilimap):
+    """the previous reader, kept here as the baseline"""
+
+    lexicon = dd(lambda: dd(lambda: dd(lambda: dd(lambda:set()))))
+    ss_defs = dd(lambda: dd(lambda: dd()))
+    ss_exes = dd(lambda: dd(lambda: dd()))
+    defined_synsets = dd()
+
+    tab_file = open(fn, 'r')
+    lex_c = 0
+    for line in tab_file:
+        tab = line.split('\t')
+        if tab[1].endswith(':lemma'):
+            lex_c += 1
+            lang = tab[1].split(':')[0]
+            ss = tab[0].strip()
+            lemma = tab[2].strip()
+            pos = ss[-1].replace('s', 'a')
+            variants = set()
+            for i in range(3, len(tab)):
+                variants.add(tab[i].strip())
+
+            if ss in defined_synsets.keys():
+                ssID = wnid + '-' + defined_synsets[ss] + '-' + ss
+                new_ss = False
+            else:
+                defined_synsets[ss] = lang
+                ssID = wnid + '-' + lang + '-' + ss
+                new_ss = True
+
+            if lexicon[lang]['Lex'][(lemma,tuple(variants),pos)]['lexID']:
+                lexID = list(lexicon[lang]['Lex'][(lemma,tuple(variants),pos)]['lexID'])[0]
+            else:
+                lexID = wnid+'-'+lang+'-'+'lex'+str(lex_c)
+
+            if new_ss:
+                lexicon[lang]['Synset'][ssID]['pos'].add(pos)
+                lexicon[lang]['Synset'][ssID]['ili'].add(ilimap[ss])
+
+            lexicon[lang]['Lex'][(lemma,tuple(variants),pos)]['lexID'].add(lexID)
+            lexicon[lang]['LexEntry'][lexID]['lemma'].add(lemma)
+            lexicon[lang]['LexEntry'][lexID]['pos'].add(pos)
+            for var in variants:
+                lexicon[lang]['LexEntry'][lexID]['variants'].add(var)
+            lexicon[lang]['LexEntry'][lexID]['sense'].add(ssID)
+
+        elif (tab[1].endswith(':def')) and (len(tab) == 4) :
+            ss_defs[tab[0].strip()][tab[1].split(':')[0].strip()][int(tab[2].strip())] = tab[3].strip()
+
+        elif (tab[1].endswith(':exe')) and (len(tab) == 4) :
+            ss_exes[tab[0].strip()][tab[1].split(':')[0].strip()][int(tab[2].strip())] = tab[3].strip()
+
+    tab_file.close()
+    return lexicon, ss_defs, ss_exes
+
+
+def measure(reader, fn):
+    """returns (seconds, MB held after reading, MB at peak)"""
+
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    wn = reader(fn, 'bench', dd(str))
+    seconds = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del wn
+    return seconds, current / 2**20, peak / 2**20
+
+
+if __name__ == '__main__':
+    lines = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+
+    fd, fn = tempfile.mkstemp(suffix='.tab')
+    os.close(fd)
+    try:
+        synthetic_tab(fn, lines)
+        print('{:,} lines ({:.1f} MB)'.format(lines, os.path.getsize(fn) / 2**20))
+        results = dict()
+        for name, reader in [('nested dicts', read_wn_nested), ('lexicon.py', read_wn)]:
+            results[name] = measure(reader, fn)
+            print('{:<14} {:7.1f} s  {:8.1f} MB held  {:8.1f} MB peak'.format(name, *results[name]))
+        print('memory held: {:.1f}x smaller'.format(results['nested dicts'][1] / results['lexicon.py'][1]))
+    finally:
+        os.remove(fn)
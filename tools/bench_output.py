@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+
+################################################################################
+# Luis Morgado da Costa (lmorgado.dacosta@gmail.com)
+# License: MIT License (see tab2lmf.py)
+################################################################################
+
+
+################################################################################
+# USAGE & NOTES
+################################################################################
+# Measures the XML output throughput (MB/s of uncompressed XML) of
+# lmfwriter.write_lmf, against the previous print()-per-element writer
+# (kept here as the baseline), on a synthetic .tab file; and of the same
+# writer with --pipeline (the encoding, compression and writing done by a
+# thread, see pipeline.py).
+#
+# python3 bench_output.py [number of lines] [--zstd]
+################################################################################
+
+import sys, os, tempfile, time
+from collections import defaultdict as dd
+from synthetic import synthetic_tab
+from lexicon import read_wn
+from lmfwriter import write_lmf, open_output, close_output, vary, print_header, print_footer
+from pipeline import pipeline
+
+
+def write_lmf_print(wn, meta, out):
+    """the previous writer: elements built with str += and print()ed"""
+
+    wnid = wn.wnid
+    print("""<?xml version="1.0" encoding="UTF-8"?>""", file=out)
+    print("""<!DOCTYPE LexicalResource SYSTEM "http://globalwordnet.github.io/schemas/WN-LMF-1.0.dtd">""", file=out)
+    print("""<LexicalResource xmlns:dc="http://purl.org/dc/elements/1.1/">""", file=out)
+    for lang, lexicon in wn.lexicons.items():
+        print(print_header(meta[wnid], lang, None), file=out)
+        for entry in lexicon.entries:
+            lexID = lexicon.entry_id(entry)
+            lexEntry = str()
+            lexEntry += """    <LexicalEntry id="{}">\n""".format(lexID)
+            lexEntry += """      <Lemma writtenForm="{}" partOfSpeech="{}"/>\n""".format(entry.lemma, entry.pos)
+            newvariants = set(entry.variants)
+            for v in entry.variants:
+                lexEntry += """      <Form  writtenForm="{}"></Form>\n""".format(v)
+                for (var,cat,tag) in vary(v):
+                    if var not in newvariants:
+                        newvariants.add(var)
+                        lexEntry += """      <Form  writtenForm="{}">\n""".format(var)
+                        lexEntry += """          <Tag category="{}">{}</Tag>\n""".format(cat, tag)
+                        lexEntry += """      </Form>\n"""
+            for synset in entry.senses:
+                ssID = wn.synset_id(synset)
+                lexEntry += """      <Sense id="{}" synset="{}"></Sense>\n""".format(ssID+'-'+lexID, ssID)
+            lexEntry += """    </LexicalEntry>"""
+            print(lexEntry, file=out)
+
+        for synset in lexicon.synsets:
+            defs, exes = wn.defs.get(synset.ss), wn.exes.get(synset.ss)
+            synEntry = """    <Synset id="{}" ili="{}" partOfSpeech="{}">""".format(wn.synset_id(synset), synset.ili, synset.pos)
+            if defs or exes:
+                synEntry += "\n"
+                for def_lang in (defs or ()):
+                    definition = ""
+                    for text in defs[def_lang]:
+                        definition += text
+                        definition += '; '
+                    synEntry += """        <Definition language="{}">{}</Definition>\n""".format(def_lang, definition.strip('; '))
+                for exe_lang in (exes or ()):
+                    for example in exes[exe_lang]:
+                        synEntry += """        <Example language="{}">{}</Example>\n""".format(exe_lang, example.strip())
+                synEntry += """    </Synset>"""
+            else:
+                synEntry += """</Synset>"""
+            print(synEntry, file=out)
+        print(print_footer(), file=out)
+    print("""</LexicalResource>""", file=out)
+
+
+def run(name, write, fn, size=None):
+    start = time.perf_counter()
+    write(fn)
+    seconds = time.perf_counter() - start
+    size = size or os.path.getsize(fn)
+    print('{:<24} {:6.2f} s  {:7.1f} MB/s  ({:.1f} MB on disk)'.format(
+        name, seconds, size / 2**20 / seconds, os.path.getsize(fn) / 2**20))
+    return size
+
+
+if __name__ == '__main__':
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    lines = int(args[0]) if args else 500000
+
+    meta = dd(lambda: dd(str))
+    meta['bench'] = dd(str, {'id': 'bench', 'label': 'Benchmark', 'conf': '1.0'})
+
+    tmp = tempfile.mkdtemp()
+    tab = os.path.join(tmp, 'wn.tab')
+    synthetic_tab(tab, lines)
+    wn = read_wn(tab, 'bench', dd(str))
+    print('{:,} lines'.format(lines))
+
+    def print_based(fn):
+        out = open(fn, 'w', encoding='utf-8', buffering=1)  # like a terminal stdout
+        write_lmf_print(wn, meta, out)
+        out.close()
+
+    def buffered(fn):
+        out = open_output(fn)
+        write_lmf(wn, meta, out)
+        close_output(out)
+
+    def pipelined(fn):
+        pipeline.enable()
+        try:
+            buffered(fn)
+        finally:
+            pipeline.enabled = False
+
+    try:
+        size = run('print() per element', print_based, os.path.join(tmp, 'print.xml'))
+        run('buffered', buffered, os.path.join(tmp, 'buffered.xml'))
+        run('buffered, gzip', buffered, os.path.join(tmp, 'buffered.xml.gz'), size)
+        run('pipelined', pipelined, os.path.join(tmp, 'pipelined.xml'), size)
+        run('pipelined, gzip', pipelined, os.path.join(tmp, 'pipelined.xml.gz'), size)
+        if '--zstd' in sys.argv:
+            run('buffered, zstd', buffered, os.path.join(tmp, 'buffered.xml.zst'), size)
+    finally:
+        for f in os.listdir(tmp):
+            os.remove(os.path.join(tmp, f))
+        os.rmdir(tmp)
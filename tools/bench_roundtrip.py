@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+
+################################################################################
+# Luis Morgado da Costa (lmorgado.dacosta@gmail.com)
+# License: MIT License (see tab2lmf.py)
+################################################################################
+
+
+################################################################################
+# USAGE & NOTES
+################################################################################
+# Round trip check (and benchmark) of lmf2tab.py: a synthetic .tab file,
+# or the given one, is converted to WN-LMF (A), back to .tab with lmf2tab,
+# and to WN-LMF again (B). A and B must have the same elements, with the
+# same ids and content (their order may differ, see lmf2tab.py). Both
+# conversions use --stable-ids, and the exit status is 1 if anything
+# differs, so this can run in CI.
+#
+# python3 bench_roundtrip.py [number of lines | wn.tab] [wnid]
+################################################################################
+
+import sys, os, time, tempfile
+import xml.etree.ElementTree as ET
+from collections import defaultdict as dd
+from synthetic import synthetic_tab
+from lexicon import read_wn
+from lmfwriter import write_lmf
+from lmf2tab import lmf2tab
+
+MAX_SHOWN = 10
+
+
+def lmf_elements(fn):
+    """the LexicalEntry and Synset elements of a WN-LMF file, by id, as
+       comparable tuples (senses sorted by id)"""
+    elements = dict()
+    for _, elem in ET.iterparse(fn):
+        if elem.tag == 'LexicalEntry':
+            senses = sorted((sense.get('id'), sense.get('synset'),
+                             tuple((r.get('relType'), r.get('target')) for r in sense))
+                            for sense in elem.iterfind('Sense'))
+            forms = tuple(form.get('writtenForm') for form in elem.iterfind('Form'))
+            lemma = elem.find('Lemma')
+            elements[elem.get('id')] = (lemma.get('writtenForm'), lemma.get('partOfSpeech'),
+                                        forms, tuple(senses))
+            elem.clear()
+        elif elem.tag == 'Synset':
+            elements[elem.get('id')] = (elem.get('partOfSpeech'),
+                                        tuple((child.tag, tuple(sorted(child.attrib.items())), child.text)
+                                              for child in elem))
+            elem.clear()
+    return elements
+
+
+def convert(tab, wnid, xml):
+    meta = dd(lambda: dd(str))
+    meta[wnid] = dd(str, {'id': wnid, 'label': 'Round trip', 'conf': '1.0'})
+    wn = read_wn(tab, wnid, dd(str), stable_ids=True)
+    with open(xml, 'w', encoding='utf-8') as out:
+        write_lmf(wn, meta, out)
+
+
+if __name__ == '__main__':
+    arg = sys.argv[1] if len(sys.argv) > 1 else '300000'
+    wnid = sys.argv[2] if len(sys.argv) > 2 else 'bench'
+
+    tmp = tempfile.mkdtemp()
+    tab, a, back, b = (os.path.join(tmp, name) for name in ('wn.tab', 'a.xml', 'back.tab', 'b.xml'))
+    try:
+        if arg.isdigit():
+            synthetic_tab(tab, int(arg))
+        else:
+            tab = arg
+        convert(tab, wnid, a)
+
+        start = time.perf_counter()
+        with open(back, 'w', encoding='utf-8') as out:
+            rows, unresolved = lmf2tab(a, out)
+        seconds = time.perf_counter() - start
+        size = os.path.getsize(a)
+        print('lmf2tab    {:10,.0f} rows/s  {:6.1f} MB/s  ({:,} rows in {:.3f} s)'.format(
+            rows / seconds, size / seconds / 1e6, rows, seconds))
+
+        convert(back, wnid, b)
+        before, after = lmf_elements(a), lmf_elements(b)
+    finally:
+        for fn in (tab, a, back, b):
+            if fn != arg and os.path.exists(fn):
+                os.remove(fn)
+        os.rmdir(tmp)
+
+    differ = sorted(i for i in before.keys() | after.keys() if before.get(i) != after.get(i))
+    print('round trip {:,} elements, {:,} different, {:,} unresolved rows'.format(
+        len(before), len(differ), unresolved))
+    for i in differ[:MAX_SHOWN]:
+        print('  {}\n    before: {}\n    after:  {}'.format(i, before.get(i), after.get(i)))
+    sys.exit(1 if differ or unresolved else 0)
@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+
+################################################################################
+# Luis Morgado da Costa (lmorgado.dacosta@gmail.com)
+# License: MIT License (see tab2lmf.py)
+################################################################################
+
+
+################################################################################
+# USAGE & NOTES
+################################################################################
+# Scaling benchmark of the whole conversion: for each size, a synthetic
+# .tab file and ILI map are written (synthetic.py) and tab2lmf.py is run on
+# them in a new process, which gives for each size
+#
+# - the throughput, in .tab rows per second of the whole run (best of
+#   --repeats runs, from the start of the process to its end);
+# - the peak RSS of the conversion (from its --stats-json report; with
+#   --jobs, the largest worker is reported separately);
+# - the size of the XML.
+#
+# python3 bench_scale.py [--sizes 10k,100k,1M,10M] [--repeats 3]
+#                        [--options "--stream"] [--save results.json]
+#                        [--baseline results.json] [--threshold 0.25]
+#
+# --save writes the results as JSON; with --baseline, the results are
+# compared with those of an earlier --save (of the same sizes and
+# options), and the exit status is 1 if any size got slower, or needs
+# more memory, or writes a larger XML, by more than --threshold (a share:
+# 0.25 is 25%), so this can run in CI. Throughput is noisy on shared
+# machines, and the smallest sizes are mostly the start of the process,
+# so the threshold should not be too tight.
+#
+# The default sizes go up to 10M rows: the 10M .tab file is about 480 MB,
+# and converting it in memory needs several GB (--options "--stream" for
+# the two pass writer, which keeps much less).
+################################################################################
+
+import sys, os, argparse, json, platform, shutil, subprocess, tempfile, time
+from synthetic import synthetic_tab
+from ilimap import load_ilimap
+
+TAB2LMF = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tab2lmf.py')
+WNID = 'okwn'  # (its meta data is in tab2lmf.py)
+
+# what is compared with the baseline, and whether more is better
+MEASURES = [('rows_per_s', True), ('peak_rss_mb', False), ('xml_mb', False)]
+
+
+def size(s):
+    """'10k' -> 10000, '1M' -> 1000000"""
+    units = {'k': 10**3, 'K': 10**3, 'M': 10**6, 'G': 10**9}
+    if s[-1] in units:
+        return int(float(s[:-1]) * units[s[-1]])
+    return int(s)
+
+
+def run_tab2lmf(tmp, options):
+    """converts tmp/wn.tab; returns the seconds it took and its stats"""
+    command = [sys.executable, TAB2LMF, WNID, 'wn.tab', '--yes', '--ili-map', 'ili.tab',
+               '--output', 'wn.xml', '--stats-json', 'stats.json'] + options
+    start = time.perf_counter()
+    subprocess.run(command, cwd=tmp, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    seconds = time.perf_counter() - start
+    with open(os.path.join(tmp, 'stats.json'), encoding='utf-8') as f:
+        return seconds, json.load(f)
+
+
+def measure(lines, options, repeats, seed=0):
+    """the results of converting a synthetic .tab file of lines rows"""
+    tmp = tempfile.mkdtemp()
+    try:
+        tab, ili = os.path.join(tmp, 'wn.tab'), os.path.join(tmp, 'ili.tab')
+        start = time.perf_counter()
+        synsets = synthetic_tab(tab, lines, ili_map=ili, seed=seed)
+        generated = time.perf_counter() - start
+        load_ilimap(ili)  # (compiled here, not in the first run)
+
+        seconds, rss, workers = None, 0.0, 0.0
+        for _ in range(repeats):
+            s, report = run_tab2lmf(tmp, options)
+            seconds = s if seconds is None else min(seconds, s)
+            peak = report['peak_rss_mb'] or {}
+            rss = max(rss, peak.get('self', 0.0))
+            workers = max(workers, peak.get('children', 0.0))
+        return {'rows': lines, 'synsets': synsets, 'tab_mb': round(os.path.getsize(tab) / 2**20, 2),
+                'generate_s': round(generated, 3), 'seconds': round(seconds, 3),
+                'rows_per_s': round(lines / seconds), 'peak_rss_mb': rss,
+                'workers_rss_mb': workers if '--jobs' in options else None,
+                'xml_mb': round(os.path.getsize(os.path.join(tmp, 'wn.xml')) / 2**20, 2)}
+    finally:
+        shutil.rmtree(tmp)
+
+
+def regressions(results, baseline, threshold):
+    """the measures of results that are worse than those of baseline by
+       more than threshold, as messages"""
+    found = []
+    for lines, result in results['sizes'].items():
+        before = baseline['sizes'].get(lines)
+        if before is None:
+            continue
+        for measure, more_is_better in MEASURES:
+            old, new = before.get(measure), result.get(measure)
+            if not old or new is None:
+                continue
+            change = new / old - 1
+            if (-change if more_is_better else change) > threshold:
+                found.append("{} rows: {} {} -> {} ({:+.1%})".format(lines, measure, old, new, change))
+    return found
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description="Scaling benchmark of tab2lmf.py")
+    parser.add_argument('--sizes', default='10k,100k,1M,10M', help="numbers of rows (e.g. 10k,1M)")
+    parser.add_argument('--repeats', type=int, default=3, help="runs of each size (the best is kept)")
+    parser.add_argument('--options', default='', help="options for tab2lmf.py, e.g. '--stream'")
+    parser.add_argument('--seed', type=int, default=0, help="seed of the synthetic files")
+    parser.add_argument('--save', metavar='FILE', help="write the results as JSON")
+    parser.add_argument('--baseline', metavar='FILE', help="compare with the results in FILE")
+    parser.add_argument('--threshold', type=float, default=0.25,
+                        help="regression threshold, as a share (default: 0.25)")
+    args = parser.parse_args(args)
+
+    options = args.options.split()
+    results = {'python': platform.python_version(), 'options': options, 'seed': args.seed,
+               'sizes': dict()}
+    print('{:>10} {:>8} {:>8} {:>9} {:>11} {:>9} {:>8}'.format(
+        'rows', 'tab MB', 'gen s', 'convert s', 'rows/s', 'peak MB', 'XML MB'))
+    for lines in map(size, args.sizes.split(',')):
+        r = results['sizes'][str(lines)] = measure(lines, options, args.repeats, args.seed)
+        print('{rows:>10,} {tab_mb:>8.1f} {generate_s:>8.2f} {seconds:>9.2f} {rows_per_s:>11,} '
+              '{peak_rss_mb:>9.1f} {xml_mb:>8.1f}'.format(**r))
+        sys.stdout.flush()
+
+    if args.save:
+        with open(args.save, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=1)
+
+    if args.baseline:
+        with open(args.baseline, encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline.get('options') != options or baseline.get('seed') != args.seed:
+            sys.stderr.write("{}: the baseline was run with other options or seed\n".format(args.baseline))
+        found = regressions(results, baseline, args.threshold)
+        for message in found:
+            print('REGRESSION ' + message)
+        if found:
+            return 1
+        print('no regressions (threshold {:.0%})'.format(args.threshold))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+
+################################################################################
+# Luis Morgado da Costa (lmorgado.dacosta@gmail.com)
+# License: MIT License (see tab2lmf.py)
+################################################################################
+
+
+################################################################################
+# USAGE & NOTES
+################################################################################
+# Microbenchmark of the two halves of a conversion, measured separately on
+# a synthetic .tab file (best of a few repeats):
+#
+# - read_wn():   .tab rows per second
+# - write_lmf(): LexicalEntry + Synset elements per second (to a null sink),
+#   also with validation (validate.py), exact and with Bloom filters
+# - write_sqlite(): the same elements per second, into a new SQLite
+#   database (backends.py)
+#
+# python3 bench_speed.py [number of lines] [repeats]
+################################################################################
+
+import sys, os, gc, tempfile, time
+from collections import defaultdict as dd
+from synthetic import synthetic_tab
+from lexicon import read_wn
+from lmfwriter import write_lmf
+from validate import Validator
+from backends import write_sqlite
+
+
+class NullOutput:
+    def write(self, s):
+        pass
+
+
+def best_of(repeats, f):
+    best = None
+    for _ in range(repeats):
+        gc.collect()
+        start = time.perf_counter()
+        result = f()
+        seconds = time.perf_counter() - start
+        best = seconds if best is None else min(best, seconds)
+    return best, result
+
+
+if __name__ == '__main__':
+    lines = int(sys.argv[1]) if len(sys.argv) > 1 else 300000
+    repeats = int(sys.argv[2]) if len(sys.argv) > 2 else 3
+
+    meta = dd(lambda: dd(str))
+    meta['bench'] = dd(str, {'id': 'bench', 'label': 'Benchmark', 'conf': '1.0'})
+
+    fd, tab = tempfile.mkstemp(suffix='.tab')
+    os.close(fd)
+    try:
+        synthetic_tab(tab, lines)
+        seconds, wn = best_of(repeats, lambda: read_wn(tab, 'bench', dd(str)))
+    finally:
+        os.remove(tab)
+
+    elements = sum(len(lexicon.entries) + len(lexicon.synsets) for lexicon in wn.lexicons.values())
+    print('read_wn    {:10,.0f} rows/s      ({:,} rows in {:.3f} s)'.format(lines / seconds, lines, seconds))
+
+    for name, validator in [('write_lmf', lambda: None),
+                            ('+ validate', lambda: Validator()),
+                            ('+ bloom', lambda: Validator(bloom=True))]:
+        seconds, _ = best_of(repeats, lambda: write_lmf(wn, meta, NullOutput(), validator=validator()))
+        print('{:<10} {:10,.0f} elements/s  ({:,} elements in {:.3f} s)'.format(
+            name, elements / seconds, elements, seconds))
+
+    fd, db = tempfile.mkstemp(suffix='.db')
+    os.close(fd)
+    try:
+        seconds, _ = best_of(repeats, lambda: write_sqlite(wn, meta, db))
+    finally:
+        os.remove(db)
+    print('{:<10} {:10,.0f} elements/s  ({:,} elements in {:.3f} s)'.format(
+        'sqlite', elements / seconds, elements, seconds))
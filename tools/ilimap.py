@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+
+################################################################################
+# Luis Morgado da Costa (lmorgado.dacosta@gmail.com)
+# License: MIT License (see tab2lmf.py)
+# Files: tab2lmf.py, ilimap.py
+################################################################################
+
+
+################################################################################
+# USAGE & NOTES
+################################################################################
+# This file is a companion to tab2lmf.py. It compiles an ILI map such as
+# ili-map-pwn30.tab or ili-map-pwn31.tab
+# (https://github.com/globalwordnet/ili) into a sorted binary index next to
+# it (ili-map-pwn30.tab.idx), which is memory-mapped and searched in
+# O(log n) instead of parsing the whole map on every run. Only the synsets
+# that are actually looked up are ever decoded.
+#
+# The index remembers the size, mtime and SHA-1 of the map it was built
+# from. When the size or mtime change, the map is hashed again, and the
+# index is only rebuilt if the contents really changed.
+#
+# To compile an index ahead of time (e.g. in CI), or to look up synsets:
+# python3 ilimap.py ili-map-pwn30.tab [01646866-v ...]
+################################################################################
+
+import sys, os, mmap, struct, hashlib
+from bisect import bisect_right
+
+
+MAGIC = b'WNBILI1\n'
+# magic, source size, source mtime (ns), source sha1, key width, value width, count
+HEADER = struct.Struct('<8sqq20sIII')
+
+
+def ilimap_path(name):
+    """'pwn30' and 'pwn31' are short for 'ili-map-pwn30.tab', etc."""
+
+    if name.startswith('pwn') and name[3:].isdigit():
+        return 'ili-map-{}.tab'.format(name)
+    return name
+
+
+def file_sha1(fn):
+    sha1 = hashlib.sha1()
+    with open(fn, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            sha1.update(block)
+    return sha1.digest()
+
+
+def compile_ilimap(fn):
+    """returns the bytes of the index for the ILI map fn"""
+
+    ilimap = dict()
+    map_file = open(fn, 'r')
+    for l in map_file:
+        row = l.strip().split()
+        if len(row) >= 2:
+            ilimap[row[1].replace('-s','-a').encode('utf-8')] = row[0].encode('utf-8')
+    map_file.close()
+
+    kw = max(map(len, ilimap), default=0)
+    vw = max(map(len, ilimap.values()), default=0)
+    st = os.stat(fn)
+    records = b''.join(k.ljust(kw, b'\0') + ilimap[k].ljust(vw, b'\0')
+                       for k in sorted(ilimap, key=lambda k: k.ljust(kw, b'\0')))
+    return HEADER.pack(MAGIC, st.st_size, st.st_mtime_ns, file_sha1(fn),
+                       kw, vw, len(ilimap)) + records
+
+
+class ILIMap:
+    """synset offset -> ILI id, looked up on a compiled index (a mmap or
+       bytes); unmapped synsets return '' (as the defaultdict(str) did)"""
+
+    BLOCK = 32
+
+    def __init__(self, data):
+        magic, _, _, _, self.kw, self.vw, self.n = HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError("not an ILI map index")
+        self.data = data
+        self.width = self.kw + self.vw
+
+        # every BLOCK-th key is kept in memory, so most of the search is a
+        # bisect on a small list and only a few records are read per lookup
+        self.fences = [data[HEADER.size + i * self.width:HEADER.size + i * self.width + self.kw]
+                       for i in range(0, self.n, self.BLOCK)]
+
+    def __len__(self):
+        return self.n
+
+    def __getitem__(self, ss):
+        key = ss.encode('utf-8')
+        if len(key) > self.kw:
+            return ''
+        key = key.ljust(self.kw, b'\0')
+
+        block = bisect_right(self.fences, key) - 1
+        if block < 0:
+            return ''
+        # the key is then searched for in the records of its block; since
+        # keys are padded to a fixed width, a match must be record-aligned
+        width = self.width
+        start = HEADER.size + block * self.BLOCK * width
+        records = self.data[start:start + self.BLOCK * width]
+        i = records.find(key)
+        while i >= 0 and i % width:
+            i = records.find(key, i + 1)
+        if i < 0:
+            return ''
+        return records[i + self.kw:i + width].rstrip(b'\0').decode('utf-8')
+
+    def __contains__(self, ss):
+        return self[ss] != ''
+
+
+def up_to_date(idx, fn):
+    """checks the header of the index file idx against the ILI map fn;
+       a changed mtime with unchanged contents only refreshes the header"""
+
+    with open(idx, 'rb') as f:
+        header = f.read(HEADER.size)
+    if len(header) < HEADER.size:
+        return False
+    magic, size, mtime, digest, kw, vw, n = HEADER.unpack(header)
+    if magic != MAGIC:
+        return False
+
+    st = os.stat(fn)
+    if (size, mtime) == (st.st_size, st.st_mtime_ns):
+        return True
+    if size != st.st_size or digest != file_sha1(fn):
+        return False
+    try:
+        with open(idx, 'r+b') as f:
+            f.write(HEADER.pack(MAGIC, size, st.st_mtime_ns, digest, kw, vw, n))
+    except OSError:
+        pass
+    return True
+
+
+def load_ilimap(fn):
+    """returns an ILIMap for the ILI map fn, (re)building its index when
+       needed; if the index cannot be written it is kept in memory"""
+
+    fn = ilimap_path(fn)
+    idx = fn + '.idx'
+
+    if os.path.exists(idx) and (not os.path.exists(fn) or up_to_date(idx, fn)):
+        with open(idx, 'rb') as f:
+            return ILIMap(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    data = compile_ilimap(fn)
+    try:
+        tmp = idx + '.{}.tmp'.format(os.getpid())
+        with open(tmp, 'wb') as f:
+            f.write(data)
+        os.replace(tmp, idx)
+    except OSError:
+        sys.stderr.write("Could not write {}, using the ILI map in memory\n".format(idx))
+    return ILIMap(data)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) < 2:
+        sys.stderr.write("\nUsage: python3 ilimap.py [ili-map.tab|pwn30|pwn31] [synset ...]\n\n")
+        sys.exit(1)
+
+    ilimap = load_ilimap(sys.argv[1])
+    sys.stderr.write("{}: {} synsets\n".format(ilimap_path(sys.argv[1]) + '.idx', len(ilimap)))
+    for ss in sys.argv[2:]:
+        print("{}\t{}".format(ss, ilimap[ss]))
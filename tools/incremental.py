@@ -0,0 +1,145 @@
+#!/usr/bin/env python3
+
+################################################################################
+# Luis Morgado da Costa (lmorgado.dacosta@gmail.com)
+# License: MIT License (see tab2lmf.py)
+# Files: tab2lmf.py, lexicon.py, lmfwriter.py, incremental.py, relations.py
+################################################################################
+
+
+################################################################################
+# USAGE & NOTES
+################################################################################
+# This file is a companion to tab2lmf.py (--incremental). It writes
+# the same XML as lmfwriter.write_lmf, but keeps the rendered fragments in
+# a sidecar cache and only renders again what changed since the last run:
+#
+# - the LexicalEntry elements of each Lexicon, as one block, keyed by a
+#   fingerprint of that language's :lemma rows (read_wn(digests=...)) and
+#   of the languages that define the synsets its senses point to, and of
+#   its sense relations (if any);
+# - each Synset element, keyed by a fingerprint of its id, ILI, POS,
+#   definitions, examples and relations.
+#
+# Entry ids must not depend on the position of a row in the file for this
+# to work (lex_c renumbers every entry after an inserted row), so the
+# incremental mode uses read_wn(stable_ids=True). The cache only keeps the
+# fragments used by the last run (what is left of the old cache when the
+# run is over is dropped).
+################################################################################
+
+import os, pickle
+from hashlib import blake2b
+import lmfwriter
+from lmfwriter import (render_entry, render_synset, print_header, print_footer,
+                       print_resource_header, print_resource_footer, entry_forms,
+                       lexicon_parts, validate_part, declare_synsets, wn_size)
+from translit import transliterate, UNIDECODE_VERSION
+from stats import stats
+
+CACHE_VERSION = 1
+
+
+def fingerprint(*parts):
+    return blake2b(repr(parts).encode('utf-8'), digest_size=16).digest()
+
+
+class FragmentCache:
+    """rendered XML fragments, by fingerprint, kept in a pickle file"""
+
+    def __init__(self, fn):
+        self.fn = fn
+        self.old = {'entries': {}, 'synsets': {}}
+        self.new = {'entries': {}, 'synsets': {}}
+        self.reused = {'entries': 0, 'synsets': 0}
+        self.rendered = {'entries': 0, 'synsets': 0}
+        if os.path.exists(fn):
+            with open(fn, 'rb') as f:
+                try:
+                    cache = pickle.load(f)
+                except Exception:
+                    cache = None
+            if cache and cache.get('version') == self.version():
+                self.old = cache['fragments']
+
+    @staticmethod
+    def version():
+        # fragments also depend on how forms are transliterated
+        return (CACHE_VERSION, UNIDECODE_VERSION, lmfwriter.ASCII_LEMMA_FORMS)
+
+    def get(self, kind, fp, render):
+        """the fragment for fp, from the cache or else from render()"""
+        # reused fragments are moved from old to new, so that each is held
+        # once (new also has those already used by this run)
+        xml = self.old[kind].pop(fp, None)
+        if xml is None:
+            xml = self.new[kind].get(fp)
+        if xml is None:
+            xml = render()
+            self.rendered[kind] += 1
+        else:
+            self.reused[kind] += 1
+        self.new[kind][fp] = xml
+        return xml
+
+    def save(self):
+        tmp = self.fn + '.{}.tmp'.format(os.getpid())
+        with open(tmp, 'wb') as f:
+            pickle.dump({'version': self.version(),
+                         'fragments': self.new}, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, self.fn)
+
+
+def write_lmf_incremental(wn, meta, out, digests, cache, validator=None):
+    """writes the WN-LMF for a wordnet read by read_wn(stable_ids=True,
+       digests=digests), taking unchanged fragments from cache (cached
+       fragments are validated too)"""
+
+    wnid = wn.wnid
+    if validator:
+        validator.expect(wn_size(wn))
+        declare_synsets(wn, validator)
+    out.write(print_resource_header())
+    for lang, lexicon in wn.lexicons.items():
+
+        out.write(print_header(meta[wnid], lang, None) + '\n')
+        if validator:
+            validator.lexicon(lang)
+            for part in lexicon_parts(lexicon):
+                validate_part(wn, part, validator)
+
+        sense_relations = None
+        if wn.srels.nodes:
+            sense_relations = [wn.sense_relations(lexicon, entry) for entry in lexicon.entries]
+
+        def render_entries():
+            transliterate.batch(entry_forms((entry.lemma, entry.variants) for entry in lexicon.entries))
+            xml = []
+            for i, entry in enumerate(lexicon.entries):
+                render_entry(xml, lexicon.xml_entry_id(entry), entry.lemma, entry.pos, entry.variants,
+                             [wn.xml_synset_id(synset) for synset in entry.senses],
+                             sense_relations[i] if sense_relations else None)
+            return ''.join(xml)
+
+        owners = ' '.join(synset.lang for entry in lexicon.entries for synset in entry.senses)
+        fp = fingerprint(wnid, lang, digests[lang].digest(), blake2b(owners.encode('utf-8')).digest(),
+                         blake2b(repr(sense_relations).encode('utf-8')).digest())
+        with stats.stage('entries ' + lang):
+            out.write(cache.get('entries', fp, render_entries))
+
+        with stats.stage('synsets ' + lang):
+            for synset in lexicon.synsets:
+                ssID = wn.xml_synset_id(synset)
+                defs, exes = wn.defs.get(synset.ss), wn.exes.get(synset.ss)
+                relations = wn.synset_relations(synset)
+                def render():
+                    xml = []
+                    render_synset(xml, ssID, synset.ili, synset.pos, defs, exes, relations)
+                    return ''.join(xml)
+                out.write(cache.get('synsets', fingerprint(ssID, synset.ili, synset.pos, defs, exes, relations), render))
+
+        out.write(print_footer() + '\n')
+    out.write(print_resource_footer())
+    if validator:
+        validator.finish()
+        validator.relations(wn.ssrels, wn.srels)
@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+
+################################################################################
+# Luis Morgado da Costa (lmorgado.dacosta@gmail.com)
+# Last Modified: August 2019
+# License: MIT License (below)
+# Files: tab2lmf.py, lexicon.py, tabreader.py, relations.py, xmlescape.py,
+#        meta.py
+################################################################################
+# Copyright 2019, Luis Morgado da Costa
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in
+# all copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING
+# FROM, OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS
+# IN THE SOFTWARE.
+################################################################################
+
+
+################################################################################
+# USAGE & NOTES
+################################################################################
+# This file is a companion to tab2lmf.py and it contains the in-memory model
+# of a wordnet read from a .tab file (read_wn).
+#
+# Every row of a large .tab file used to become a handful of nested
+# defaultdicts and sets. Here each lexical entry and synset is a single
+# object with __slots__ and scalar fields; languages and POS tags are
+# interned, and lexical entry ids are kept as the integer counter they are
+# built from. A sense holds nothing but the link between an entry and a
+# synset, so it is stored as a reference to the Synset in entry.senses.
+#
+# wn = read_wn('wn.tab', 'okwn', ilimap)
+# for lexicon in wn.lexicons.values():
+#     for entry in lexicon.entries:
+#         lexicon.entry_id(entry), [wn.synset_id(s) for s in entry.senses]
+################################################################################
+
+import gc
+from hashlib import blake2b
+from functools import wraps
+from tabreader import TabReader, LEMMA, DEF, EXE, SSREL, SREL
+from relations import Relations
+from xmlescape import escape_attr
+
+
+class Synset:
+    """a synset, defined in the lexicon of the first language it is seen in"""
+    __slots__ = ('ss', 'xml_ss', 'lang', 'pos', 'ili')
+
+    def __init__(self, ss, lang, pos, ili):
+        self.ss = ss      # original offset, e.g. '01646866-v'
+        self.xml_ss = escape_attr(ss)  # (the same string, unless it has to be escaped)
+        self.lang = lang  # the language of the lexicon that defines it
+        self.pos = pos
+        self.ili = ili
+
+
+class LexicalEntry:
+    """a lemma with its variant forms and senses (a list of Synsets)"""
+    __slots__ = ('lex', 'lemma', 'pos', 'variants', 'senses')
+
+    def __init__(self, lex, lemma, pos, variants):
+        self.lex = lex            # the lex_c counter (or stable_lex()) the id is built from
+        self.lemma = lemma
+        self.pos = pos
+        self.variants = variants  # sorted tuple
+        self.senses = []
+
+
+class Lexicon:
+    """the entries and synsets of a single language, in order of creation"""
+    __slots__ = ('lang', 'prefix', 'xml_prefix', 'entries', 'synsets', 'keys')
+
+    def __init__(self, wnid, lang):
+        self.lang = lang
+        self.prefix = wnid + '-' + lang + '-'
+        self.xml_prefix = escape_attr(self.prefix)
+        self.entries = []
+        self.synsets = []
+        self.keys = dict()  # keys[(lemma, variants, pos)] = LexicalEntry (while reading)
+
+    def entry_id(self, entry):
+        return self.prefix + 'lex' + str(entry.lex)
+
+    def xml_entry_id(self, entry):
+        return self.xml_prefix + 'lex' + str(entry.lex)
+
+
+class Wordnet:
+    """all lexicons read from a .tab file, plus synset definitions and
+       examples, in order: defs['01646866-v']['eng'][0] = "first English def" """
+    __slots__ = ('wnid', 'lexicons', 'synsets', 'defs', 'exes', 'reader',
+                 'ssrels', 'srels', 'senses')
+
+    def __init__(self, wnid):
+        self.wnid = wnid
+        self.lexicons = dict()  # lexicons['eng'] = Lexicon
+        self.synsets = dict()   # synsets['01646866-v'] = Synset
+        self.defs = dict()
+        self.exes = dict()
+        self.reader = None      # the TabReader it was read with (reader.problems)
+        self.ssrels = Relations()  # between synset offsets ('01646866-v')
+        self.srels = Relations()   # between senses, as (lang, lemma, synset offset)
+        self.senses = dict()       # senses[(lang, lemma, ss)] = (Lexicon, LexicalEntry, Synset),
+                                   # for the senses in srels
+
+    def synset_id(self, synset):
+        return self.wnid + '-' + synset.lang + '-' + synset.ss
+
+    def xml_synset_id(self, synset):
+        """synset_id(), escaped for the XML (from parts escaped once)"""
+        return self.lexicons[synset.lang].xml_prefix + synset.xml_ss
+
+    def xml_sense_id(self, key):
+        """the (escaped) id of the Sense (lang, lemma, ss) in srels"""
+        lexicon, entry, synset = self.senses[key]
+        return self.xml_synset_id(synset) + '-' + lexicon.xml_entry_id(entry)
+
+    def synset_relations(self, synset):
+        """(relation type, target synset id) of the relations of synset,
+           with the ids escaped for the XML"""
+        return [(rel, self.xml_synset_id(self.synsets[ss])) for rel, ss in self.ssrels.targets(synset.ss)]
+
+    def sense_relations(self, lexicon, entry):
+        """for each sense of entry, a list of (relation type, target sense
+           id, escaped), or None if no sense of entry has relations"""
+        if not self.srels.nodes:
+            return None
+        relations = [[(rel, self.xml_sense_id(target))
+                      for rel, target in self.srels.targets((lexicon.lang, entry.lemma, synset.ss))]
+                     for synset in entry.senses]
+        return relations if any(relations) else None
+
+
+def stable_lex(lemma, variants, pos):
+    """a lexical entry number that only depends on the entry itself, so 
+       that inserting rows in the .tab file does not renumber every entry 
+       that comes after them (lex_c does)"""
+    key = '\x1f'.join((lemma, pos) + variants)
+    return blake2b(key.encode('utf-8'), digest_size=6).hexdigest()
+
+
+def gc_paused(f):
+    """runs f with the cyclic garbage collector paused: a reader allocates
+       millions of small objects that never form cycles, and the collector
+       would otherwise walk all of them again and again while they pile up"""
+    @wraps(f)
+    def paused(*args, **kwargs):
+        enabled = gc.isenabled()
+        gc.disable()
+        try:
+            return f(*args, **kwargs)
+        finally:
+            if enabled:
+                gc.enable()
+    return paused
+
+
+def add_gloss(glosses, ss, lang, order, text):
+    """glosses[ss][lang][order] = text (without building throwaway dicts)"""
+    by_lang = glosses.get(ss)
+    if by_lang is None:
+        by_lang = glosses[ss] = dict()
+    texts = by_lang.get(lang)
+    if texts is None:
+        texts = by_lang[lang] = dict()
+    texts[order] = text
+
+
+def sort_by_order(by_lang):
+    """by_lang[lang] = {order: text} -> by_lang[lang] = [text, ...] in order"""
+    for lang, texts in by_lang.items():
+        by_lang[lang] = [texts[i] for i in sorted(texts)]
+
+
+def sort_glosses(glosses):
+    for by_lang in glosses.values():
+        sort_by_order(by_lang)
+
+
+@gc_paused
+def read_wn(fn, wnid, ilimap, stable_ids=False, digests=None):
+    """Given a .tab+ file (also ready for forms, and .tab.gz/.tab.xz), it
+       prepares lexical entries and senses; malformed rows are skipped and
+       counted in wn.reader.problems
+
+       stable_ids: number entries with stable_lex() instead of lex_c
+       digests: if given a dictionary, digests[lang] is a hash of all 
+                the :lemma rows of that language (see incremental.py)"""
+
+    wn = Wordnet(wnid)
+    lexicons = wn.lexicons
+    synsets = wn.synsets
+    used = dict()  # used[lang] = stable entry numbers already taken
+
+    reader = wn.reader = TabReader(fn)
+    lex_c = 0
+    for (kind, ss, lang, a, b, line) in reader:
+
+        if kind is LEMMA:
+            lex_c += 1
+
+            lemma, variants = a, b
+            pos = ss[-1]  # (one character strings are already shared)
+            if pos == 's':
+                pos = 'a'
+
+            lexicon = lexicons.get(lang)
+            if lexicon is None:
+                lexicon = lexicons[lang] = Lexicon(wnid, lang)
+                used[lang] = set()
+                if digests is not None:
+                    digests[lang] = blake2b(digest_size=16)
+
+            if digests is not None:
+                digests[lang].update((line + '\n').encode('utf-8'))
+
+            ####################################################################
+            # TRYING TO FIX:                                                   #
+            # Synset should only be defined once (in a single lexicon)         #
+            # and senses for other languages should link to the same synset    #
+            # The best decision is to take the first time it is defined and    #
+            # store a list to check whether it has been defined in other       #
+            # language.                                                        #
+            # the "Synset id naming convention" makes it that it must be       #
+            # defined  with the ID starting as the wnid. In a file with        #
+            # multiple languages this will also include the language           #
+            # (e.g. "ntumc-cmn" or "ntumc-in")                                 #
+            ####################################################################
+            synset = synsets.get(ss)
+            if synset is None:
+                synset = synsets[ss] = Synset(ss, lexicon.lang, pos, ilimap[ss])
+                lexicon.synsets.append(synset)
+
+            key = (lemma, variants, pos)
+            entry = lexicon.keys.get(key)
+            if entry is None:
+                lex = lex_c
+                if stable_ids:
+                    lex = stable_lex(lemma, variants, pos)
+                    if lex in used[lang]:  # (very unlikely) collision
+                        i = 2
+                        while '{}-{}'.format(lex, i) in used[lang]:
+                            i += 1
+                        lex = '{}-{}'.format(lex, i)
+                    used[lang].add(lex)
+                entry = lexicon.keys[key] = LexicalEntry(lex, lemma, pos, variants)
+                lexicon.entries.append(entry)
+
+            # a sense is only added once per synset (entries have few senses,
+            # and Synsets compare by identity)
+            senses = entry.senses
+            if synset not in senses:
+                senses.append(synset)
+
+
+        ########################################################################
+        # DEFINITIONS                                                          #
+        ########################################################################
+        # Definitions in this TSV file are synset objects. There is no plan to #
+        # support sense definitions in this TSV format.                        #
+        #                                                                      #
+        # But multiple definitions can still exist for multiple languages.     #
+        # Synsets in the XML format are only instanciated once even if there   #
+        # are multiple lexicons in the same WN-LMF.                            #
+        #                                                                      #
+        # Because it doesn't really matter in which lexicon they are first     #
+        # instanciated, they are being instanciated in the first language they #
+        # are seen. This matters for the definitions, since they should be     #
+        # grouped by synset first, and then language. All synset definitions   #
+        # need to be dumped when the synset is defined. And each langauge      #
+        # should be individually added to that definition. (when language is   #
+        # no added, the WN-LMF assumes the definition is given in the same     #
+        # language as the lexicon object.                                      #
+        #                                                                      #
+        # In the original tsv file, a definition is defined by 4 TSV values:   #
+        #                                                                      #
+        # synsetID  \t  lang:def  \t  OrderInteger  \t definition              #
+        #                                                                      #
+        # We will store the definitions like so:                               #
+        # wn.defs['synsetID']['eng'][0] = "first eng def"                      #
+        # wn.defs['synsetID']['eng'][1] = "second eng def"                     #
+        # wn.defs['synsetID']['cmn'][0] = "first cmn def"                      #
+        #                                                                      #
+        # and, once the whole file is read, replace each {order: text} by the  #
+        # list of texts in order (sort_glosses), so that writers don't sort.   #
+        ########################################################################
+        elif kind is DEF:
+            add_gloss(wn.defs, ss, lang, a, b)
+
+
+        ########################################################################
+        # EXAMPLES                                                             #
+        ########################################################################
+        # Examples are essentially the same as definitions.                    #
+        # We do not currently support sense examples in this TSV format.       #
+        ########################################################################
+        elif kind is EXE:
+            add_gloss(wn.exes, ss, lang, a, b)
+
+
+        ########################################################################
+        # RELATIONS                                                            #
+        ########################################################################
+        # Synset relations link synset offsets, and sense relations link the  #
+        # senses of a lemma in a synset, within a language (see relations.py). #
+        ########################################################################
+        elif kind is SSREL:
+            wn.ssrels.add(ss, a, b)
+
+        elif kind is SREL:
+            rel, target_ss, target_lemma = b
+            wn.srels.add((lang, a, ss), rel, (lang, target_lemma, target_ss))
+
+    sort_glosses(wn.defs)
+    sort_glosses(wn.exes)
+
+    # relations only link what was defined by :lemma rows
+    wn.ssrels.finish(synsets.__contains__)
+    if wn.srels.nodes:
+        nodes = wn.srels.nodes
+        for lexicon in lexicons.values():
+            for entry in lexicon.entries:
+                for synset in entry.senses:
+                    key = (lexicon.lang, entry.lemma, synset.ss)
+                    if key in nodes and key not in wn.senses:
+                        wn.senses[key] = (lexicon, entry, synset)
+    wn.srels.finish(wn.senses.__contains__)
+
+    # the (lemma, variants, pos) keys are only needed while reading
+    for lexicon in lexicons.values():
+        lexicon.keys = None
+    return wn
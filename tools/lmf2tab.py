@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+
+################################################################################
+# Luis Morgado da Costa (lmorgado.dacosta@gmail.com)
+# License: MIT License (see tab2lmf.py)
+# Files: lmf2tab.py, tabreader.py, lmfwriter.py
+################################################################################
+
+
+################################################################################
+# USAGE & NOTES
+################################################################################
+# The reverse of tab2lmf.py: writes the .tab rows of a WN-LMF file, e.g. to
+# diff or merge a wordnet received as WN-LMF with our .tab sources.
+#
+# python3 lmf2tab.py wnlmf.xml > wn.tab
+# python3 lmf2tab.py wnlmf.xml.gz --output wn.tab.gz
+#
+# The XML is read with expat callbacks (SAX style, no element objects are
+# built) and the rows of each element are written as soon as it ends, so
+# memory does not grow with the size of the file. What comes back:
+#
+# - a :lemma row for each Sense (the lemma, and the Forms that are not
+#   ASCII transliterations as variants);
+# - :def and :exe rows for each Definition and Example of a Synset;
+# - ssrel: and lang:srel: rows for each SynsetRelation and SenseRelation
+#   (with their WN-LMF names, e.g. ssrel:hypernym).
+#
+# Synset ids are mapped back to the offsets of the .tab file by taking out
+# the id of the lexicon that defines them (wnid-lang-, the same slicing as
+# ssID[len(wnid)+len(lang)+2:] in the writer). The rows of a Synset whose
+# id does not start with the id of a lexicon (e.g. ewn-02084071-n in the
+# Lexicon oewn-en), and those of senses and relations pointing to one, are
+# skipped and counted as unresolved.
+#
+# Converting the rows back gives the same WN-LMF elements with the same
+# content (and, with --stable-ids, the same ids): the lexicon that defines
+# each synset is kept by writing the rows of senses that point to synsets
+# of a later lexicon at the end. The order of entries, senses and synsets
+# may change, and so may lex_c ids, which count rows. Not kept: the ILI of
+# synsets (taken again from the ILI map), the order of several :def rows
+# of one language (the writer joins them with '; '), and the Lexicon
+# meta data (see meta.py).
+#
+# Sense relations name their target by id; if there are any, the file is
+# read a second time to find the lemmas of the target senses.
+################################################################################
+
+import sys, argparse, tempfile
+from xml.parsers import expat
+from tabreader import open_tab
+from lmfwriter import open_output, close_output
+
+CHUNK_SIZE = 4096  # rows joined before each write
+
+_field = str.maketrans('\t\r\n', '   ')
+
+
+def field(s):
+    """s as a single .tab field (without tabs or line ends)"""
+    return s.translate(_field).strip() if s else ''
+
+
+class Offsets:
+    """maps the synset ids of the lexicons seen so far to .tab offsets"""
+
+    def __init__(self):
+        self.prefixes = set()  # 'okwn-eng-' for the Lexicon okwn-eng
+
+    def add(self, lexicon_id):
+        self.prefixes.add(lexicon_id + '-')
+
+    def get(self, ssID):
+        """the offset of ssID, or None if its lexicon was not seen yet (the
+           longest prefix is taken, as language codes may contain '-')"""
+        end = len(ssID)
+        while True:
+            end = ssID.rfind('-', 0, end)
+            if end < 0:
+                return None
+            if ssID[:end + 1] in self.prefixes:
+                return ssID[end + 1:]
+
+
+class LMFRows:
+    """expat handlers that write the rows of each element as it ends; rows
+       that point to lexicons not seen yet go to the file later"""
+
+    def __init__(self, out, later):
+        self.out = out
+        self.later = later
+        self.offsets = Offsets()
+        self.rows = []
+        self.count = 0
+        self.unresolved = 0   # rows skipped, as their synset id is unknown
+        self.targets = set()  # the ids of the targets of sense relations
+        self.lang = None
+        self.lemma = None     # in a LexicalEntry: its lemma, variants and
+        self.forms = []       # (synset id, lemma) of its senses
+        self.senses = []
+        self.form = None      # in a Form: its writtenForm
+        self.ss = None        # in a Synset: its offset (None if its id is not
+                              # in a lexicon seen so far), and the number of
+        self.orders = None    # :def and :exe rows by language
+        self.text = None      # in a Definition or Example: its text (a list)
+        self.gloss = None     # kind and language
+        self.parser = expat.ParserCreate()
+        self.parser.buffer_text = True
+        self.parser.StartElementHandler = self.start
+        self.parser.EndElementHandler = self.end
+
+    def read(self, fn):
+        with open_tab(fn) as f:
+            self.parser.ParseFile(f)
+
+    def start(self, name, attrs):
+        if name == 'Sense':
+            self.senses.append(attrs['synset'])
+        elif name == 'Form':
+            self.form = attrs['writtenForm']
+        elif name == 'Tag':
+            if attrs.get('category') == 'transliteration':
+                self.form = None
+        elif name == 'LexicalEntry':
+            self.lemma, self.forms, self.senses = None, [], []
+        elif name == 'Lemma':
+            self.lemma = field(attrs['writtenForm'])
+        elif name == 'Synset':
+            self.ss = self.offsets.get(attrs['id'])
+            self.orders = dict()
+        elif name == 'Definition' or name == 'Example':
+            self.gloss = ('def' if name == 'Definition' else 'exe', attrs.get('language') or self.lang)
+            self.text = []
+            self.parser.CharacterDataHandler = self.text.append  # (only for texts)
+        elif name == 'SynsetRelation':
+            target = attrs['target']
+            tss = self.offsets.get(target)
+            if self.ss is None:
+                self.unresolved += 1
+            elif tss is None:
+                self.later.write('R\t{}\t{}\t{}\n'.format(self.ss, attrs['relType'], target))
+            else:
+                self.rows.append('{}\tssrel:{}\t{}\n'.format(self.ss, attrs['relType'], tss))
+        elif name == 'SenseRelation':
+            target = attrs['target']
+            self.targets.add(target)
+            self.later.write('S\t{}\t{}\t{}\t{}\t{}\n'.format(
+                self.lang, self.lemma, self.senses[-1], attrs['relType'], target))
+        elif name == 'Lexicon':
+            self.lang = attrs['language']
+            self.offsets.add(attrs['id'])
+
+    def end(self, name):
+        if name == 'Form':
+            if self.form is not None:  # (not a transliteration)
+                self.forms.append(field(self.form))
+                self.form = None
+        elif name == 'LexicalEntry':
+            forms = '\t'.join([self.lemma] + self.forms)
+            for ssID in self.senses:
+                ss = self.offsets.get(ssID)
+                if ss is None:  # defined by a later lexicon
+                    self.later.write('L\t{}\t{}\t{}\n'.format(ssID, self.lang, forms))
+                else:
+                    self.rows.append('{}\t{}:lemma\t{}\n'.format(ss, self.lang, forms))
+            if len(self.rows) >= CHUNK_SIZE:
+                self.flush()
+        elif name == 'Definition' or name == 'Example':
+            self.parser.CharacterDataHandler = None
+            if self.ss is None:
+                self.unresolved += 1
+                return
+            kind, lang = self.gloss
+            n = self.orders[kind, lang] = self.orders.get((kind, lang), -1) + 1
+            self.rows.append('{}\t{}:{}\t{}\t{}\n'.format(self.ss, lang, kind, n, field(''.join(self.text))))
+
+    def flush(self):
+        self.out.write(''.join(self.rows))
+        self.count += len(self.rows)
+        self.rows = []
+
+
+def sense_targets(fn, targets):
+    """senses[sense id] = (lemma, synset id), for the sense ids in targets"""
+    senses = dict()
+    lemma = [None]
+
+    def start(name, attrs):
+        if name == 'Lemma':
+            lemma[0] = field(attrs['writtenForm'])
+        elif name == 'Sense' and attrs['id'] in targets:
+            senses[attrs['id']] = (lemma[0], attrs['synset'])
+
+    parser = expat.ParserCreate()
+    parser.StartElementHandler = start
+    with open_tab(fn) as f:
+        parser.ParseFile(f)
+    return senses
+
+
+def lmf2tab(fn, out=sys.stdout):
+    """writes the .tab rows of the WN-LMF file fn to out; returns the
+       number of rows written and of rows that could not be resolved"""
+
+    with tempfile.TemporaryFile('w+', encoding='utf-8') as later:
+        lmf = LMFRows(out, later)
+        lmf.read(fn)
+
+        # the sense relations name their targets by id: find their lemmas
+        senses = sense_targets(fn, lmf.targets) if lmf.targets else dict()
+
+        # now that all lexicons are known
+        offsets, rows = lmf.offsets, lmf.rows
+        unresolved = lmf.unresolved
+        later.seek(0)
+        for line in later:
+            row = line.rstrip('\n').split('\t')
+            if row[0] == 'L':
+                ss = offsets.get(row[1])
+                if ss is None:
+                    unresolved += 1
+                    continue
+                rows.append('{}\t{}:lemma\t{}\n'.format(ss, row[2], '\t'.join(row[3:])))
+            elif row[0] == 'R':
+                tss = offsets.get(row[3])
+                if tss is None:
+                    unresolved += 1
+                    continue
+                rows.append('{}\tssrel:{}\t{}\n'.format(row[1], row[2], tss))
+            else:
+                _, lang, lemma, ssID, rel, target = row
+                ss = offsets.get(ssID)
+                tlemma, tssID = senses.get(target, (None, None))
+                tss = offsets.get(tssID) if tssID else None
+                if ss is None or tss is None:
+                    unresolved += 1
+                    continue
+                rows.append('{}\t{}:srel:{}\t{}\t{}\t{}\n'.format(ss, lang, rel, lemma, tss, tlemma))
+            if len(rows) >= CHUNK_SIZE:
+                lmf.flush()
+                rows = lmf.rows
+
+    lmf.flush()
+    return lmf.count, unresolved
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description="Convert WN-LMF to .tab rows")
+    parser.add_argument('xml', help="a WN-LMF file (.gz and .xz are decompressed)")
+    parser.add_argument('--output', help="output file (.gz/.zst are compressed; default: stdout)")
+    args = parser.parse_args(args)
+
+    out = open_output(args.output)
+    try:
+        count, unresolved = lmf2tab(args.xml, out)
+    finally:
+        close_output(out)
+    sys.stderr.write("{}: {} rows\n".format(args.xml, count))
+    if unresolved:
+        sys.stderr.write("{}: skipped {} rows of or pointing to unknown synsets or senses\n".format(
+            args.xml, unresolved))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,611 @@
+#!/usr/bin/env python3
+
+################################################################################
+# Luis Morgado da Costa (lmorgado.dacosta@gmail.com)
+# License: MIT License (see tab2lmf.py)
+# Files: tab2lmf.py, lexicon.py, lmfwriter.py, tabreader.py, relations.py,
+#        translit.py, pipeline.py, xmlescape.py
+################################################################################
+
+
+################################################################################
+# USAGE & NOTES
+################################################################################
+# This file is a companion to tab2lmf.py and it contains the WN-LMF writers:
+#
+# write_lmf(wn, meta, out)             for a wordnet loaded by read_wn()
+# stream_wn(fn, wnid, meta, ilimap, out)  two passes over a .tab file
+#
+# Elements are rendered into lists of string fragments, which are joined
+# and written out in large chunks (instead of building each element with
+# str += and print()ing it). open_output() gives the stream to write to:
+# stdout, a plain file, or a compressed file (.gz, or .zst when the
+# zstandard package is installed). Both writers also take a validator=
+# that checks the elements as they are written (see validate.py).
+################################################################################
+
+import sys, io, gzip
+import multiprocessing
+from array import array
+from translit import transliterate
+from xmlescape import escape_text, escape_attr, escape_name, POS
+from lexicon import add_gloss, sort_by_order, gc_paused
+from tabreader import TabReader, open_tab, LEMMA, DEF, SSREL, SREL
+from relations import Relations
+from stats import stats
+from pipeline import pipeline, ThreadedOutput
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+################################################################################
+# OUTPUT
+################################################################################
+BUFFER_SIZE = 1 << 20  # bytes buffered by the output file
+CHUNK_SIZE = 4096      # fragments joined before each write (streaming writer)
+
+
+def open_output(path=None):
+    """returns a text stream to write the XML to: stdout (path None or
+       '-'), or the file at path, compressed if it ends in .gz or .zst;
+       with --pipeline, the encoding, compression and writing are done
+       by a thread (see pipeline.py)"""
+
+    if path is None or path == '-':
+        if pipeline.enabled:
+            return ThreadedOutput(sys.stdout.buffer, pipeline.depth)
+        return io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8', newline='\n',
+                                write_through=False)
+
+    if path.endswith('.gz'):
+        raw = gzip.open(path, 'wb', compresslevel=6)
+    elif path.endswith('.zst'):
+        if zstandard is None:
+            raise SystemExit("Writing {} needs the zstandard package (pip install zstandard)".format(path))
+        raw = zstandard.ZstdCompressor().stream_writer(open(path, 'wb'))
+    else:
+        raw = open(path, 'wb')
+    if pipeline.enabled:
+        return ThreadedOutput(io.BufferedWriter(raw, BUFFER_SIZE), pipeline.depth)
+    return io.TextIOWrapper(io.BufferedWriter(raw, BUFFER_SIZE), encoding='utf-8', newline='\n')
+
+
+def close_output(out):
+    """flushes out; stdout itself is left open"""
+
+    if out.buffer is sys.stdout.buffer:
+        out.flush()
+        out.detach()
+    else:
+        out.close()
+
+
+def vary(lemma):
+    """returns a list of variants and their tag data
+       this version gives basic transliteration with unidecode
+       (memoized, see translit.py)"""
+    vars = []  # [(var, cat, tag), ]  e.g. ('colour', 'dialect', 'GB')
+    var = transliterate(lemma)
+    if var and var != lemma:
+        vars.append((var.lower(), 'transliteration', 'ascii'))
+    return vars
+    
+def print_header(meta, lang, comment):
+    """print the header of the lexicon, filled in with WN-LMF meta data"""
+
+    header = str()
+
+    if comment:
+        header += ("""<!-- {}  -->\n""".format(comment))
+
+    header += ("""  <Lexicon id="{}" \n""".format(escape_attr(meta['id']+'-'+lang)))
+    header += ("""           label="{}" \n""".format(escape_attr(meta['label'])))
+    header += ("""           language="{}" \n""".format(escape_attr(lang)))
+    header += ("""           email="{}" \n""".format(escape_attr(meta['email'])))
+    header += ("""           license="{}" \n""".format(escape_attr(meta['license'])))
+    header += ("""           version="{}" \n""".format(escape_attr(meta['version'])))
+    header += ("""           citation="{}" \n""".format(escape_attr(meta['citation'])))
+    header += ("""           url="{}" \n""".format(escape_attr(meta['url'])))
+    header += ("""           dc:publisher="Global Wordnet Association" \n""")
+    header += ("""           dc:format="OMW-LMF" \n""")
+    header += ("""           dc:description="{}" \n""".format(escape_attr(meta['description'])))
+    header += ("""           confidenceScore="{}">""".format(escape_attr(meta['conf'])))
+
+    return header
+
+
+def print_footer():
+
+    footer = str()
+    footer += ("  </Lexicon>")
+    return footer
+
+
+def print_resource_header():
+    return ("""<?xml version="1.0" encoding="UTF-8"?>\n"""
+            """<!DOCTYPE LexicalResource SYSTEM "http://globalwordnet.github.io/schemas/WN-LMF-1.0.dtd">\n"""
+            """<LexicalResource xmlns:dc="http://purl.org/dc/elements/1.1/">\n""")
+
+
+def print_resource_footer():
+    return """</LexicalResource>\n"""
+
+
+ASCII_LEMMA_FORMS = False  # also add ASCII forms of the lemmas themselves
+
+
+def entry_forms(entries):
+    """the forms vary() is called on when rendering entries, given as
+       (lemma, variants) pairs, for transliterate.batch()"""
+    for lemma, variants in entries:
+        if ASCII_LEMMA_FORMS:
+            yield lemma
+        yield from variants
+
+
+def lmf_forms(lemma, variants):
+    """the (form, tag category, tag) of the Form elements of an entry, in
+       order; category and tag are None for the variants from the .tab"""
+
+    forms = []
+    newvariants = set(variants)
+
+    ############################################################################
+    # This generates autmatic ASCII forms based on the unicode databse.        #
+    # ASCII forms generated here are based on the cannonical lemma.            #
+    # (off by default, see ASCII_LEMMA_FORMS)                                  #
+    ############################################################################
+    if ASCII_LEMMA_FORMS:
+        for (var,cat,tag) in vary(lemma):
+            if var not in newvariants:
+                newvariants.add(var)
+                forms.append((var, cat, tag))
+
+    ############################################################################
+    # Here we include the forms provided on the TSV file.                      #
+    # Currently there is no way of providing a tag for these forms.            #
+    # These forms might also be non-ascii and, as such, these might add        #
+    # further forms to the WN-LMF to aid in the search functions               #
+    ############################################################################
+    for v in variants:
+        forms.append((v, None, None))
+        for (var,cat,tag) in vary(v):
+            if var not in newvariants:
+                newvariants.add(var)
+                forms.append((var, cat, tag))
+    return forms
+
+
+def render_entry(xml, lexID, lemma, pos, variants, senses, sense_relations=None):
+    """appends the XML for a single LexicalEntry, with its forms and senses, 
+       to the list of fragments xml; sense_relations is None or, for each
+       sense, a list of (relation type, target sense id); the ids are
+       already escaped (see xmlescape.py)"""
+
+    xml.append("""    <LexicalEntry id="{}">\n""".format(lexID))
+    xml.append("""      <Lemma writtenForm="{}" partOfSpeech="{}"/>\n""".format(escape_attr(lemma),
+                                                                                    pos if pos in POS else escape_attr(pos)))
+
+
+    ############################################################################
+    # FORMS AND VARIANTS (see lmf_forms)                                       #
+    ############################################################################
+    for (form, cat, tag) in lmf_forms(lemma, variants):
+        if cat is None:
+            xml.append("""      <Form  writtenForm="{}"></Form>\n""".format(escape_attr(form)))
+        else:
+            xml.append("""      <Form  writtenForm="{}">\n"""
+                       """          <Tag category="{}">{}</Tag>\n"""
+                       """      </Form>\n""".format(escape_attr(form), cat, tag))
+
+    for i, ssID in enumerate(senses):
+        senseID = ssID+'-'+lexID
+        if sense_relations and sense_relations[i]:
+            xml.append("""      <Sense id="{}" synset="{}">\n""".format(senseID, ssID))
+            for (rel, target) in sense_relations[i]:
+                xml.append("""        <SenseRelation relType="{}" target="{}"/>\n""".format(escape_name(rel), target))
+            xml.append("""      </Sense>\n""")
+        else:
+            xml.append("""      <Sense id="{}" synset="{}"></Sense>\n""".format(senseID, ssID))
+
+    xml.append("""    </LexicalEntry>\n""")
+
+
+def render_synset(xml, ssID, ili, pos, defs, exes, relations=None):
+    """appends the XML for a single Synset to the list of fragments xml; 
+       defs and exes are either None or dictionaries of lists in order,
+       like defs['eng'][0] = "first English def" (see read_wn), and
+       relations a list of (relation type, target synset id); the ids
+       are already escaped (see xmlescape.py)"""
+
+    if ili and not ili.isalnum():
+        ili = escape_attr(ili)
+    if pos not in POS:
+        pos = escape_attr(pos)
+    if not (defs or exes or relations):
+        xml.append("""    <Synset id="{}" ili="{}" partOfSpeech="{}"></Synset>\n""".format(ssID, ili, pos))
+        return
+
+    xml.append("""    <Synset id="{}" ili="{}" partOfSpeech="{}">\n""".format(ssID, ili, pos))
+
+    if defs:
+        for def_lang, texts in defs.items():
+            # There is one definition per language;
+            # Multiple definitions are separated by ';'
+            definition = '; '.join(texts)
+            xml.append("""        <Definition language="{}">{}</Definition>\n""".format(escape_name(def_lang),
+                                                                                        escape_text(definition.strip('; '))))
+
+    if exes:
+        for exe_lang, texts in exes.items():
+            # There can be multiple examples per language;
+            for example in texts:
+                xml.append("""        <Example language="{}">{}</Example>\n""".format(escape_name(exe_lang),
+                                                                                  escape_text(example.strip())))
+
+    if relations:
+        for (rel, target) in relations:
+            xml.append("""        <SynsetRelation relType="{}" target="{}"/>\n""".format(escape_name(rel), target))
+
+    xml.append("""    </Synset>\n""")  # well aligned
+
+
+################################################################################
+# Each lexicon is rendered in parts of up to PART_SIZE entries or synsets.    
+# With jobs > 1 the parts are rendered by a pool of worker processes; the     
+# wordnet is inherited by the workers when they are forked (only the small    
+# part tuples go through pickle) and the results are written in the original 
+# order, so the output is the same as with a single process.                 
+################################################################################
+PART_SIZE = 5000
+
+
+def render_part(wn, part):
+    """renders ('LexicalEntry'|'Synset', lang, start, stop) of a lexicon"""
+
+    kind, lang, start, stop = part
+    lexicon = wn.lexicons[lang]
+    xml = []
+    if kind == 'LexicalEntry':
+        with stats.stage('entries ' + lang):
+            for entry in lexicon.entries[start:stop]:
+                senses = [wn.xml_synset_id(synset) for synset in entry.senses]
+                render_entry(xml, lexicon.xml_entry_id(entry), entry.lemma, entry.pos,
+                             entry.variants, senses, wn.sense_relations(lexicon, entry))
+    else:
+        with stats.stage('synsets ' + lang):
+            for synset in lexicon.synsets[start:stop]:
+                render_synset(xml, wn.xml_synset_id(synset), synset.ili, synset.pos,
+                              wn.defs.get(synset.ss), wn.exes.get(synset.ss),
+                              wn.synset_relations(synset))
+    return ''.join(xml)
+
+
+def validate_part(wn, part, validator):
+    """passes the elements of a part (see render_part) to a Validator"""
+
+    kind, lang, start, stop = part
+    lexicon = wn.lexicons[lang]
+    if kind == 'LexicalEntry':
+        for entry in lexicon.entries[start:stop]:
+            validator.entry(lexicon.xml_entry_id(entry), entry.pos,
+                            [wn.xml_synset_id(synset) for synset in entry.senses])
+    else:
+        for synset in lexicon.synsets[start:stop]:
+            validator.synset(wn.xml_synset_id(synset), synset.ili, synset.pos)
+
+
+def declare_synsets(wn, validator):
+    """declares every synset of wn to validator, before any entry"""
+    for lang, lexicon in wn.lexicons.items():
+        for synset in lexicon.synsets:
+            validator.declare(wn.xml_synset_id(synset), synset.pos, lang)
+
+
+def wn_size(wn):
+    """the number of LexicalEntry, Sense and Synset elements of wn"""
+    return sum(len(lexicon.entries) + len(lexicon.synsets) +
+               sum(len(entry.senses) for entry in lexicon.entries)
+               for lexicon in wn.lexicons.values())
+
+
+def lexicon_parts(lexicon):
+    for kind, elements in [('LexicalEntry', lexicon.entries), ('Synset', lexicon.synsets)]:
+        for start in range(0, len(elements), PART_SIZE):
+            yield (kind, lexicon.lang, start, start + PART_SIZE)
+
+
+forked_wn = None  # the wordnet being written, as seen by the worker processes
+
+def start_worker():
+    """clears the timings and transliteration counts a worker inherits"""
+    stats.take()
+    transliterate.take()
+
+
+def render_forked_part(part):
+    """renders a part in a worker, returned with the worker's timings and
+       transliteration counts"""
+    return render_part(forked_wn, part), stats.take(), transliterate.take()
+
+
+def write_lmf(wn, meta, out=sys.stdout, jobs=1, validator=None):
+    """writes the WN-LMF for a wordnet fully loaded by read_wn(); each 
+       part is also passed to validator (see validate.py), if given, 
+       while the next parts are being rendered"""
+
+    global forked_wn
+
+    wnid = wn.wnid
+    with stats.stage('transliteration'):
+        transliterate.batch(entry_forms((entry.lemma, entry.variants)
+                                        for lexicon in wn.lexicons.values()
+                                        for entry in lexicon.entries))
+    pool = None
+    if jobs > 1:
+        forked_wn = wn
+        pool = multiprocessing.get_context('fork').Pool(jobs, initializer=start_worker)
+
+    if validator:
+        validator.expect(wn_size(wn))
+        declare_synsets(wn, validator)
+
+    out.write(print_resource_header())
+    for lang, lexicon in wn.lexicons.items():
+
+        # header = print_header(meta[wnid+'-'+lang], None)
+        out.write(print_header(meta[wnid], lang, None) + '\n')
+        if validator:
+            validator.lexicon(lang)
+
+        lang_parts = list(lexicon_parts(lexicon))
+        if pool:
+            parts = pool.imap(render_forked_part, lang_parts)
+        else:
+            parts = ((render_part(wn, part), None, None) for part in lang_parts)
+        for part, (xml, times, translits) in zip(lang_parts, parts):
+            if times:
+                stats.merge(times)
+            if translits:
+                transliterate.merge(translits)
+            if validator:
+                validate_part(wn, part, validator)
+            out.write(xml)
+
+        out.write(print_footer() + '\n')
+    out.write(print_resource_footer())
+    if validator:
+        validator.finish()
+        validator.relations(wn.ssrels, wn.srels)
+
+    if pool:
+        pool.close()
+        pool.join()
+        forked_wn = None
+
+
+################################################################################
+# STREAMING (TWO-PASS) WRITER
+################################################################################
+# read_wn() keeps the whole wordnet in memory before anything is printed.     
+# For very large .tab files the streaming writer reads the file twice        
+# instead: the first pass (index_wn) only keeps which language defines each  
+# synset, the lexical entry keys, and the byte offsets of the rows belonging 
+# to each entry and synset (in compact arrays); the second pass (stream_wn)   
+# seeks back to those rows and writes the elements out as it goes.           
+# The output is the same as read_wn() + write_lmf().                        
+################################################################################
+
+def group_rows(owners, offsets, n):
+    """counting sort of (owner, offset) pairs into n groups; returns 
+       (starts, grouped) such that the offsets of group i are 
+       grouped[starts[i]:starts[i+1]], still in file order"""
+
+    starts = array('q', bytes(8 * (n + 1)))
+    for o in owners:
+        starts[o + 1] += 1
+    for i in range(n):
+        starts[i + 1] += starts[i]
+
+    fill = array('q', starts)
+    grouped = array('q', bytes(8 * len(offsets)))
+    for o, offset in zip(owners, offsets):
+        grouped[fill[o]] = offset
+        fill[o] += 1
+    return starts, grouped
+
+
+@gc_paused
+def index_wn(fn):
+    """first pass of the streaming writer: returns a dictionary with the 
+       small indexes needed to write the LMF in a second pass (and the
+       relation graphs, which are small enough to keep in memory)"""
+
+    langs = dict()        # langs['eng'] = (entry numbers, synset numbers) in order
+    synsets = dict()      # synsets['01646866-v'] = synset number
+    ss_names = list()     # synset number -> synset offset (e.g. '01646866-v')
+    ss_xml = list()       # synset number -> the offset, escaped (see xmlescape.py)
+    ss_owner = list()     # synset number -> language that defines it (or None)
+    entries = dict()      # entries[(lang, lemma, variants, pos)] = entry number
+    entry_lex = array('q')                  # entry number -> lex_c
+    sense_rows = (array('q'), array('q'))   # (entry number, offset) of :lemma rows
+    gloss_rows = (array('q'), array('q'))   # (synset number, offset) of :def/:exe rows
+    ssrels = Relations()  # as in read_wn()
+    srels = Relations()
+
+    def synset_number(ss):
+        n = synsets.get(ss)
+        if n is None:
+            n = synsets[ss] = len(ss_names)
+            ss_names.append(ss)
+            ss_xml.append(escape_attr(ss))
+            ss_owner.append(None)
+        return n
+
+    reader = TabReader(fn)
+    lex_c = 0
+    for offset, (kind, ss, lang, a, b, _) in reader.with_offsets():
+
+        if kind is LEMMA:
+            lex_c += 1
+
+            if lang not in langs:
+                langs[lang] = (array('q'), array('q'))
+
+            lemma, variants = a, b
+            pos = ss[-1].replace('s', 'a')
+
+            n = synset_number(ss)
+            if ss_owner[n] is None:
+                ss_owner[n] = lang
+                langs[lang][1].append(n)
+
+            e = entries.get((lang, lemma, variants, pos))
+            if e is None:
+                e = entries[(lang, lemma, variants, pos)] = len(entry_lex)
+                entry_lex.append(lex_c)
+                langs[lang][0].append(e)
+
+            sense_rows[0].append(e)
+            sense_rows[1].append(offset)
+
+        elif kind is SSREL:
+            ssrels.add(ss, a, b)
+
+        elif kind is SREL:
+            rel, target_ss, target_lemma = b
+            srels.add((lang, a, ss), rel, (lang, target_lemma, target_ss))
+
+        else:  # definitions and examples
+            gloss_rows[0].append(synset_number(ss))
+            gloss_rows[1].append(offset)
+
+    def defined(ss):
+        n = synsets.get(ss)
+        return n is not None and ss_owner[n] is not None
+    ssrels.finish(defined)
+
+    # the entry of each sense in srels (the first one, as in read_wn), which
+    # takes one more pass, only when there are sense relations
+    sense_entry = dict()  # sense_entry[(lang, lemma, ss)] = entry number
+    if srels.nodes:
+        for (kind, ss, lang, lemma, variants, _) in TabReader(fn):
+            key = (lang, lemma, ss)
+            if kind is LEMMA and key in srels.nodes:
+                e = entries[(lang, lemma, variants, ss[-1].replace('s', 'a'))]
+                if e < sense_entry.get(key, e + 1):
+                    sense_entry[key] = e
+    srels.finish(sense_entry.__contains__)
+
+    return {'reader': reader,
+            'ssrels': ssrels,
+            'srels': srels,
+            'sense_entry': sense_entry,
+            'langs': langs,
+            'ss_names': ss_names,
+            'ss_xml': ss_xml,
+            'ss_owner': ss_owner,
+            'synsets': synsets,
+            'entries': list(entries),
+            'entry_lex': entry_lex,
+            'senses': group_rows(sense_rows[0], sense_rows[1], len(entry_lex)),
+            'glosses': group_rows(gloss_rows[0], gloss_rows[1], len(ss_names))}
+
+
+def stream_wn(fn, wnid, meta, ilimap, out=sys.stdout, validator=None):
+    """writes the WN-LMF for a .tab file in two passes, see index_wn();
+       returns the TabReader of the first pass (reader.problems) and the
+       relation graphs (synset and sense relations, see relations.py)"""
+
+    with stats.stage('index_wn'):
+        idx = index_wn(fn)
+    reader = idx['reader']
+    ss_names, ss_xml, ss_owner, synsets = idx['ss_names'], idx['ss_xml'], idx['ss_owner'], idx['synsets']
+    # the (escaped) beginning of the ids of each lexicon, see xmlescape.py
+    prefixes = {lang: escape_attr(wnid+'-'+lang+'-') for lang in idx['langs']}
+    if validator:
+        validator.expect(len(idx['entries']) + len(idx['senses'][1]) + len(ss_names))
+        for lang, (_, lang_synsets) in idx['langs'].items():
+            for n in lang_synsets:
+                validator.declare(prefixes[lang] + ss_xml[n], ss_names[n][-1].replace('s', 'a'), lang)
+    with stats.stage('transliteration'):
+        transliterate.batch(entry_forms((lemma, variants) for (_, lemma, variants, _) in idx['entries']))
+    ssrels, srels, sense_entry = idx['ssrels'], idx['srels'], idx['sense_entry']
+
+    def synset_id(ss):
+        n = synsets[ss]
+        return prefixes[ss_owner[n]] + ss_xml[n]
+
+    def sense_id(key):
+        (lang, _, ss) = key
+        return synset_id(ss) + '-' + prefixes[lang] + 'lex' + str(idx['entry_lex'][sense_entry[key]])
+
+    tab_file = open_tab(fn)
+    def rows(grouping, n):
+        # (only rows that were parsed in the first pass are read back)
+        starts, grouped = grouping
+        for i in range(starts[n], starts[n + 1]):
+            tab_file.seek(grouped[i])
+            yield reader.parse(0, tab_file.readline().decode('utf-8').rstrip('\n'))
+
+    xml = [print_resource_header()]
+    for lang, (lang_entries, lang_synsets) in idx['langs'].items():
+
+        xml.append(print_header(meta[wnid], lang, None) + '\n')
+        if validator:
+            validator.lexicon(lang)
+
+        n_senses = 0
+        with stats.stage('entries ' + lang):
+            for e in lang_entries:
+                (_, lemma, variants, pos) = idx['entries'][e]
+                lexID = prefixes[lang]+'lex'+str(idx['entry_lex'][e])
+                senses = dict()  # senses[synset id] = ss
+                for (_, ss, _, _, _, _) in rows(idx['senses'], e):
+                    senses.setdefault(synset_id(ss), ss)
+                sense_relations = None
+                if srels.nodes:
+                    sense_relations = [[(rel, sense_id(target)) for rel, target in srels.targets((lang, lemma, ss))]
+                                       for ss in senses.values()]
+                n_senses += len(senses)
+                render_entry(xml, lexID, lemma, pos, variants, senses,
+                             sense_relations if sense_relations and any(sense_relations) else None)
+                if validator:
+                    validator.entry(lexID, pos, senses)
+                if len(xml) > CHUNK_SIZE:
+                    out.write(''.join(xml))
+                    xml.clear()
+
+        with stats.stage('synsets ' + lang):
+            for n in lang_synsets:
+                ss = ss_names[n]
+                defs = dict()
+                exes = dict()
+                for (kind, _, gloss_lang, order, text, _) in rows(idx['glosses'], n):
+                    add_gloss(defs if kind is DEF else exes, ss, gloss_lang, order, text)
+                defs, exes = defs.get(ss), exes.get(ss)
+                if defs:
+                    sort_by_order(defs)
+                if exes:
+                    sort_by_order(exes)
+                ssID, ili, pos = prefixes[lang]+ss_xml[n], ilimap[ss], ss[-1].replace('s', 'a')
+                render_synset(xml, ssID, ili, pos, defs, exes,
+                              [(rel, synset_id(target)) for rel, target in ssrels.targets(ss)])
+                if validator:
+                    validator.synset(ssID, ili, pos)
+                if len(xml) > CHUNK_SIZE:
+                    out.write(''.join(xml))
+                    xml.clear()
+        stats.lexicon(wnid + '-' + lang, len(lang_entries), n_senses, len(lang_synsets))
+
+        xml.append(print_footer() + '\n')
+    xml.append(print_resource_footer())
+    out.write(''.join(xml))
+    tab_file.close()
+    if validator:
+        validator.finish()
+        validator.relations(ssrels, srels)
+    return reader, (ssrels, srels)
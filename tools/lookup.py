@@ -0,0 +1,279 @@
+#!/usr/bin/env python3
+
+################################################################################
+# Luis Morgado da Costa (lmorgado.dacosta@gmail.com)
+# License: MIT License (see tab2lmf.py)
+# Files: tab2lmf.py, lookup.py, backends.py, lmfwriter.py
+################################################################################
+
+
+################################################################################
+# USAGE & NOTES
+################################################################################
+# This file is a companion to tab2lmf.py (--lookup): an index of the forms
+# of a wordnet, to find the synsets a word maps to (e.g. while aligning a
+# new dictionary) without searching the XML:
+#
+# python3 tab2lmf.py okwn wn.tab --lookup okwn.lemmas --output okwn.xml --yes
+# python3 lookup.py okwn.lemmas --lang eng dog 'hot dog'
+# python3 lookup.py okwn.lemmas --lang cmn --fold --prefix 狗
+#
+# Each entry is indexed by its lemma, its variants, and the ASCII forms
+# vary() gives for both (those of the variants are also Forms in the XML),
+# in its language. Queries are:
+#
+# - exact:   the form as written;
+# - folded:  the form without case and diacritics (fold(): NFKD without
+#            the combining marks, then casefold(), so 'Café' finds 'cafe');
+# - prefix:  the (folded) forms that start with a prefix.
+#
+# The index is a single file, which is memory-mapped and searched in place
+# (like the ILI map index, see ilimap.py), so loading it takes no time and
+# memory whatever its size. Its records are sorted by (language, folded
+# form, form), as UTF-8 bytes, so each kind of query is a search for the
+# first record (a bisect on every 32nd key, which are read on the first
+# query, then a binary search) and a scan of the next ones:
+#
+# header     MAGIC, number of records, of synsets, size of the languages
+# languages  the languages, tab separated (padded to 8 bytes)
+# records    n+1 offsets (uint64) of the records, then m+1 offsets of the
+#            synset ids
+# record     key length, number of synsets (uint16 each), the key
+#            (lang \0 folded \0 form), and the synset numbers (uint32)
+# synsets    the synset ids (UTF-8)
+#
+# Synsets are given by their WN-LMF id (okwn-eng-01646866-v), so that the
+# results can be looked up in the XML (and their ILI in the database
+# written by --sqlite). bench_lookup.py measures the latency of queries.
+################################################################################
+
+import sys, os, argparse, mmap, struct, unicodedata
+from bisect import bisect_left
+from lmfwriter import vary, entry_forms
+from translit import transliterate
+from lexicon import gc_paused
+
+MAGIC = b'WNLEMX1\n'
+HEADER = struct.Struct('<8sQQQ')  # magic, records, synsets, size of the languages
+RECORD = struct.Struct('<HH')     # key length, synsets
+OFFSET = struct.Struct('<Q')
+
+
+def fold(s):
+    """s without case and diacritics"""
+    if s.isascii():
+        return s.casefold()
+    return ''.join(c for c in unicodedata.normalize('NFKD', s) if not unicodedata.combining(c)).casefold()
+
+
+################################################################################
+# BUILDING THE INDEX
+################################################################################
+def entry_lookup_forms(lemma, variants):
+    """the forms an entry is found by: its lemma, variants, and their
+       ASCII forms (see vary())"""
+    forms = {lemma}
+    forms.update(variants)
+    for form in (lemma,) + variants:
+        forms.update(var for var, _, _ in vary(form))
+    return forms
+
+
+@gc_paused
+def compile_index(wn):
+    """returns the bytes of the index of the wordnet wn (see read_wn)"""
+
+    transliterate.batch(entry_forms((entry.lemma, entry.variants)
+                                    for lexicon in wn.lexicons.values() for entry in lexicon.entries))
+    transliterate.batch(entry.lemma for lexicon in wn.lexicons.values() for entry in lexicon.entries)
+
+    synset_ids = []
+    numbers = dict()  # numbers[synset] = its position in synset_ids
+    postings = dict()  # postings[key] = synset numbers
+    folded = dict()    # folded[form] = fold(form)
+    for lang, lexicon in wn.lexicons.items():
+        for entry in lexicon.entries:
+            senses = []
+            for synset in entry.senses:
+                n = numbers.get(synset)
+                if n is None:
+                    n = numbers[synset] = len(synset_ids)
+                    synset_ids.append(wn.synset_id(synset).encode('utf-8'))
+                senses.append(n)
+            for form in entry_lookup_forms(entry.lemma, entry.variants):
+                f = folded.get(form)
+                if f is None:
+                    f = folded[form] = fold(form)
+                key = '{}\0{}\0{}'.format(lang, f, form).encode('utf-8')
+                numbers_of = postings.get(key)
+                if numbers_of is None:
+                    postings[key] = senses
+                else:
+                    postings[key] = numbers_of + senses
+
+    langs = '\t'.join(wn.lexicons).encode('utf-8')
+    langs += b'\0' * (-len(langs) % 8)
+    n, m = len(postings), len(synset_ids)
+    start = HEADER.size + len(langs) + OFFSET.size * (n + 1 + m + 1)
+
+    records, offsets = [], []
+    packers = dict()  # packers[count] = the Struct of count synset numbers
+    position = start
+    for key in sorted(postings):
+        senses = postings[key]
+        if len(senses) > 1:  # (the same form in several entries)
+            senses = sorted(set(senses))
+        count = len(senses)
+        packer = packers.get(count) or packers.setdefault(count, struct.Struct('<{}I'.format(count)))
+        offsets.append(position)
+        records += (RECORD.pack(len(key), count), key, packer.pack(*senses))
+        position += RECORD.size + len(key) + packer.size
+    offsets.append(position)
+    for ssID in synset_ids:
+        offsets.append(position)
+        position += len(ssID)
+    offsets.append(position)
+
+    return b''.join([HEADER.pack(MAGIC, n, m, len(langs)), langs,
+                     struct.pack('<{}Q'.format(len(offsets)), *offsets)] + records + synset_ids)
+
+
+def write_lookup(wn, meta, path):
+    """writes the index of wn to path (as the backends in backends.py)"""
+    tmp = path + '.{}.tmp'.format(os.getpid())
+    with open(tmp, 'wb') as f:
+        f.write(compile_index(wn))
+    os.replace(tmp, path)
+
+
+################################################################################
+# QUERIES
+################################################################################
+class LemmaIndex:
+    """the forms of a wordnet -> synset ids, searched on a compiled index
+       (a mmap or bytes)"""
+
+    BLOCK = 32
+
+    def __init__(self, data):
+        magic, self.n, self.m, size = HEADER.unpack_from(data)
+        if magic != MAGIC:
+            raise ValueError("not a lemma index")
+        self.data = data
+        self.langs = bytes(data[HEADER.size:HEADER.size + size]).rstrip(b'\0').decode('utf-8').split('\t')
+        start = HEADER.size + size
+        self.offsets = memoryview(data)[start:start + OFFSET.size * (self.n + 1 + self.m + 1)].cast('Q')
+        # every BLOCK-th key, kept in memory (from the first query on) so
+        # that most of a search is a bisect on a small list
+        self.fences = None
+
+    def __len__(self):
+        return self.n
+
+    def key(self, i):
+        start = self.offsets[i]
+        length, _ = RECORD.unpack_from(self.data, start)
+        return self.data[start + RECORD.size:start + RECORD.size + length]
+
+    def first(self, key):
+        """the number of the first record whose key is not below key"""
+        if self.fences is None:
+            self.fences = [self.key(i) for i in range(0, self.n, self.BLOCK)]
+        block = bisect_left(self.fences, key)
+        lo, hi = max(0, (block - 1) * self.BLOCK + 1), min(self.n, block * self.BLOCK)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.key(mid) < key:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def records(self, prefix):
+        """the (form, synset ids) of the records whose key starts with prefix"""
+        data, offsets, base = self.data, self.offsets, self.n + 1
+        for i in range(self.first(prefix), self.n):
+            start = offsets[i]
+            length, count = RECORD.unpack_from(data, start)
+            key = data[start + RECORD.size:start + RECORD.size + length]
+            if not key.startswith(prefix):
+                return
+            senses = struct.unpack_from('<{}I'.format(count), data, start + RECORD.size + length)
+            yield (bytes(key).rsplit(b'\0', 1)[1].decode('utf-8'),
+                   [bytes(data[offsets[base + s]:offsets[base + s + 1]]).decode('utf-8') for s in senses])
+
+    def languages(self, lang):
+        return self.langs if lang is None else [lang]
+
+    def exact(self, form, lang=None):
+        """the synset ids of form, as written"""
+        found = []
+        for lang in self.languages(lang):
+            for (f, synsets) in self.records('{}\0{}\0'.format(lang, fold(form)).encode('utf-8')):
+                if f == form:
+                    found.extend(synsets)
+        return sorted(set(found))
+
+    def folded(self, form, lang=None):
+        """the (form, synset ids) of the forms that fold as form does"""
+        found = []
+        for lang in self.languages(lang):
+            found.extend(self.records('{}\0{}\0'.format(lang, fold(form)).encode('utf-8')))
+        return found
+
+    def prefix(self, prefix, lang=None, limit=None):
+        """the (form, synset ids) of the forms whose folded form starts
+           with the folded prefix (at most limit of them)"""
+        found = []
+        for lang in self.languages(lang):
+            for record in self.records('{}\0{}'.format(lang, fold(prefix)).encode('utf-8')):
+                if limit is not None and len(found) >= limit:
+                    return found
+                found.append(record)
+        return found
+
+    def batch(self, forms, lang=None, folded=False):
+        """{form: synset ids} for many forms; they are looked up in the
+           order of the index, so that its pages are read in order"""
+        found = dict()
+        for form in sorted(set(forms), key=fold):
+            if folded:
+                found[form] = sorted({ssID for _, synsets in self.folded(form, lang) for ssID in synsets})
+            else:
+                found[form] = self.exact(form, lang)
+        return found
+
+
+def load_lookup(fn):
+    """the LemmaIndex in the file fn, memory-mapped"""
+    with open(fn, 'rb') as f:
+        return LemmaIndex(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description="Look up forms in a lemma index (see tab2lmf.py --lookup)")
+    parser.add_argument('index', help="an index written by tab2lmf.py --lookup")
+    parser.add_argument('forms', nargs='*', help="forms to look up (default: one per line of stdin)")
+    parser.add_argument('--lang', help="only in this language")
+    parser.add_argument('--fold', action='store_true', help="ignore case and diacritics")
+    parser.add_argument('--prefix', action='store_true', help="forms starting with each form")
+    parser.add_argument('--limit', type=int, default=100, help="most prefix matches shown (default: 100)")
+    args = parser.parse_intermixed_args(args)
+
+    index = load_lookup(args.index)
+    forms = args.forms or (line.rstrip('\n') for line in sys.stdin)
+    for form in forms:
+        if args.prefix:
+            found = index.prefix(form, args.lang, args.limit)
+        elif args.fold:
+            found = index.folded(form, args.lang)
+        else:
+            found = [(form, index.exact(form, args.lang))]
+        for (f, synsets) in found:
+            if synsets:
+                print('{}\t{}\t{}'.format(form, f, ' '.join(synsets)))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,199 @@
+#!/usr/bin/env python3
+
+################################################################################
+# Luis Morgado da Costa (lmorgado.dacosta@gmail.com)
+# License: MIT License (see tab2lmf.py)
+# Files: tab2lmf.py, tabreader.py, lmfwriter.py, pipeline.py
+################################################################################
+
+
+################################################################################
+# USAGE & NOTES
+################################################################################
+# This file is a companion to tab2lmf.py (--pipeline): it runs the reading
+# and the writing of a conversion in threads, connected to the main thread
+# by bounded queues, so that disk (or network) I/O and compression happen
+# while the main thread tokenizes and renders:
+#
+#   reader thread          main thread                writer thread
+#   read + decompress  ->  tokenize, build, render  ->  encode, compress,
+#   blocks (tabreader)     (lexicon.py, lmfwriter.py)   write (open_output)
+#
+# The queues hold at most pipeline.depth items (1 MB blocks of the input,
+# ~1 MB chunks of the output): a stage that gets ahead waits for the next
+# one (backpressure), so memory stays bounded.
+#
+# Tokenizing and rendering are pure Python, and stay in the main thread:
+# threads only run Python code one at a time (the GIL), and it is the
+# reads, writes and zlib/lzma (de)compression that release it. So the
+# run takes about as long as its slowest part when the input and output
+# are compressed, or on slow storage, and gains little otherwise (with
+# --jobs, rendering already runs in worker processes). When stats are
+# enabled, the time the main thread spent waiting for the reader, and for
+# room in the output queue, is reported as stages.
+#
+# pipeline.enable() is called once (by tab2lmf.py); until then
+# read_ahead() returns its argument and open_output() writes directly.
+################################################################################
+
+import threading, queue, time
+from stats import stats
+
+DEPTH = 8            # items in each queue
+CHUNK_SIZE = 1 << 20  # characters of output per item of the writer's queue
+
+_end = object()
+
+
+class Pipeline:
+    """whether reading and writing run in threads, and how far ahead"""
+
+    def __init__(self):
+        self.enabled = False
+        self.depth = DEPTH
+
+    def enable(self, depth=DEPTH):
+        self.enabled = True
+        self.depth = depth
+
+    def read_ahead(self, iterable):
+        """iterable, produced by a reader thread up to depth items ahead"""
+        if not self.enabled:
+            return iterable
+        return read_ahead(iterable, self.depth)
+
+
+def put(q, item, stop):
+    """puts item in q, unless stop is set while waiting; returns whether
+       it was put"""
+    while True:
+        try:
+            q.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            if stop.is_set():
+                return False
+
+
+def read_ahead(iterable, depth):
+    """yields the items of iterable, which a thread takes from it while
+       the previous ones are being used (exceptions are raised here)"""
+
+    q = queue.Queue(depth)
+    stop = threading.Event()
+
+    def produce():
+        try:
+            for item in iterable:
+                if not put(q, (item, None), stop):
+                    return
+            put(q, (_end, None), stop)
+        except BaseException as e:
+            put(q, (_end, e), stop)
+
+    thread = threading.Thread(target=produce, name='read-ahead', daemon=True)
+    thread.start()
+    waited, waits = 0.0, 0
+    try:
+        while True:
+            try:
+                item, error = q.get_nowait()
+            except queue.Empty:
+                start = time.perf_counter()
+                item, error = q.get()
+                waited += time.perf_counter() - start
+                waits += 1
+            if item is _end:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        stop.set()
+        thread.join()
+        if stats.enabled and waits:
+            stats.add('pipeline: waiting for input', waits, waited, 0.0)
+
+
+class ThreadedOutput:
+    """a text stream whose writes are joined into chunks, which a thread
+       encodes and writes to buffer (a binary stream); the interface is the
+       part of TextIOWrapper that the writers and close_output() use"""
+
+    def __init__(self, buffer, depth=DEPTH, encoding='utf-8'):
+        self.buffer = buffer
+        self.encoding = encoding
+        self.chunk = []
+        self.size = 0
+        self.error = None
+        self.waited, self.waits = 0.0, 0
+        self.queue = queue.Queue(depth)
+        self.thread = threading.Thread(target=self.consume, name='writer', daemon=True)
+        self.thread.start()
+
+    def consume(self):
+        while True:
+            chunk = self.queue.get()
+            try:
+                if chunk is _end:
+                    return
+                if self.error is None:
+                    self.buffer.write(chunk.encode(self.encoding))
+            except BaseException as e:
+                self.error = e
+            finally:
+                self.queue.task_done()
+
+    def check(self):
+        if self.error is not None:
+            error, self.error = self.error, None
+            raise error
+
+    def write(self, s):
+        self.chunk.append(s)
+        self.size += len(s)
+        if self.size >= CHUNK_SIZE:
+            self.push()
+        return len(s)
+
+    def push(self):
+        self.check()
+        if not self.chunk:
+            return
+        chunk = ''.join(self.chunk)
+        self.chunk, self.size = [], 0
+        try:
+            self.queue.put_nowait(chunk)
+        except queue.Full:  # (the writer is behind: wait for it)
+            start = time.perf_counter()
+            self.queue.put(chunk)
+            self.waited += time.perf_counter() - start
+            self.waits += 1
+
+    def flush(self):
+        self.push()
+        self.queue.join()
+        self.check()
+        self.buffer.flush()
+
+    def detach(self):
+        """stops the thread, leaving buffer open (e.g. stdout)"""
+        try:
+            self.flush()
+        finally:
+            self.queue.put(_end)
+            self.thread.join()
+            if stats.enabled and self.waits:
+                stats.add('pipeline: waiting for output', self.waits, self.waited, 0.0)
+        buffer, self.buffer = self.buffer, None
+        return buffer
+
+    def close(self):
+        buffer = self.buffer
+        try:
+            self.detach()
+        finally:
+            buffer.close()
+
+
+pipeline = Pipeline()
@@ -0,0 +1,196 @@
+#!/usr/bin/env python3
+
+################################################################################
+# Luis Morgado da Costa (lmorgado.dacosta@gmail.com)
+# License: MIT License (see tab2lmf.py)
+# Files: tab2lmf.py, lexicon.py, lmfwriter.py, relations.py
+################################################################################
+
+
+################################################################################
+# USAGE & NOTES
+################################################################################
+# This file is a companion to lexicon.py: the relations between synsets
+# (ssrel:* rows) and between senses (lang:srel:* rows), as a graph kept in
+# integer arrays.
+#
+# Nodes (synset offsets, or (lang, lemma, synset) for senses) are numbered
+# as they are first seen, and each relation row is an edge appended to
+# three arrays (source, type, target). finish() then groups the edges by
+# source, CSR style: the edges of node n are edges[starts[n]:starts[n+1]],
+# each stored as type * number of nodes + target and sorted, so that
+# targets(key) is a slice and not a scan. Types and nodes are renumbered
+# in sorted order first (by WN-LMF name, and by key), so the relations of
+# an element come out sorted by type and target, whatever the order of the
+# rows was (lmf2tab.py relies on this for lossless round trips). In the
+# same linear pass over the graph it finds:
+#
+# - duplicate edges (the same source, type and target), kept once;
+# - dangling edges (a source or target that is never defined, e.g. a
+#   synset without any :lemma row), which are dropped;
+# - edges whose inverse is missing (hypernym without the hyponym back,
+#   see INVERSES), found by bisecting the target's sorted edges.
+#
+# Relation types can be given with the short names used in wordnet tab
+# files (e.g. hype, hypo, ants) or with their WN-LMF names (hypernym), and
+# are always written with the latter.
+################################################################################
+
+from array import array
+from bisect import bisect_left
+from sys import intern
+
+MAX_EXAMPLES = 20
+ISSUES = ('duplicate-relation', 'dangling-relation', 'missing-inverse')
+
+REL_NAMES = {'hype': 'hypernym', 'hypo': 'hyponym',
+             'inst': 'instance_hypernym', 'hasi': 'instance_hyponym',
+             'mmem': 'mero_member', 'msub': 'mero_substance', 'mprt': 'mero_part',
+             'hmem': 'holo_member', 'hsub': 'holo_substance', 'hprt': 'holo_part',
+             'enta': 'entails', 'caus': 'causes', 'sim': 'similar', 'also': 'also',
+             'attr': 'attribute', 'ants': 'antonym', 'deri': 'derivation',
+             'pert': 'pertainym', 'dmnc': 'domain_topic', 'dmtc': 'has_domain_topic',
+             'dmnr': 'domain_region', 'dmtr': 'has_domain_region',
+             'dmnu': 'exemplifies', 'dmtu': 'is_exemplified_by'}
+
+INVERSES = dict()
+for a, b in [('hypernym', 'hyponym'), ('instance_hypernym', 'instance_hyponym'),
+             ('mero_member', 'holo_member'), ('mero_substance', 'holo_substance'),
+             ('mero_part', 'holo_part'), ('entails', 'is_entailed_by'),
+             ('causes', 'is_caused_by'), ('domain_topic', 'has_domain_topic'),
+             ('domain_region', 'has_domain_region'), ('exemplifies', 'is_exemplified_by'),
+             ('antonym', 'antonym'), ('similar', 'similar'), ('attribute', 'attribute'),
+             ('derivation', 'derivation')]:
+    INVERSES[a] = b
+    INVERSES[b] = a
+
+
+class Relations:
+    """typed edges between keys (see the notes above)"""
+
+    def __init__(self):
+        self.nodes = dict()  # nodes[key] = node number
+        self.keys = list()   # node number -> key
+        self.types = dict()  # types['hype'] = types['hypernym'] = type number
+        self.names = list()  # type number -> WN-LMF name (e.g. 'hypernym')
+        self.source = array('q')
+        self.type = array('q')
+        self.target = array('q')
+        self.starts = None   # CSR, after finish()
+        self.edges = None
+        self.issues = dict.fromkeys(ISSUES, 0)
+        self.examples = {issue: [] for issue in ISSUES}
+
+    def node(self, key):
+        n = self.nodes.get(key)
+        if n is None:
+            n = self.nodes[key] = len(self.keys)
+            self.keys.append(key)
+        return n
+
+    def add(self, source, rel, target):
+        t = self.types.get(rel)
+        if t is None:
+            name = intern(REL_NAMES.get(rel, rel))
+            if name in self.names:
+                t = self.types[rel] = self.names.index(name)
+            else:
+                t = self.types[rel] = len(self.names)
+                self.names.append(name)
+        self.source.append(self.node(source))
+        self.type.append(t)
+        self.target.append(self.node(target))
+
+    def __len__(self):
+        return len(self.edges) if self.edges is not None else len(self.source)
+
+    def issue(self, issue, source, rel, target):
+        self.issues[issue] += 1
+        if len(self.examples[issue]) < MAX_EXAMPLES:
+            self.examples[issue].append({'source': source, 'type': rel, 'target': target})
+
+    def finish(self, defined):
+        """builds the CSR arrays and checks the graph; defined(key) tells
+           whether a node exists in the wordnet"""
+
+        n = len(self.keys)
+
+        # renumber the types and nodes in sorted order
+        order = sorted(range(len(self.names)), key=self.names.__getitem__)
+        type_rank = [0] * len(order)
+        for r, t in enumerate(order):
+            type_rank[t] = r
+        names = self.names = [self.names[t] for t in order]
+        self.types = {rel: type_rank[t] for rel, t in self.types.items()}
+        order = sorted(range(n), key=self.keys.__getitem__)
+        rank = array('q', bytes(8 * n))
+        for r, i in enumerate(order):
+            rank[i] = r
+        keys = self.keys = [self.keys[i] for i in order]
+        self.nodes = dict(zip(keys, range(n)))
+        ok = bytearray(1 if defined(key) else 0 for key in keys)
+
+        # group the edges by source (a counting sort), then sort each group
+        starts = array('q', bytes(8 * (n + 1)))
+        for s in self.source:
+            starts[rank[s] + 1] += 1
+        for i in range(n):
+            starts[i + 1] += starts[i]
+        grouped = array('q', bytes(8 * len(self.source)))
+        fill = array('q', starts)
+        for s, t, d in zip(self.source, self.type, self.target):
+            s = rank[s]
+            grouped[fill[s]] = type_rank[t] * n + rank[d]
+            fill[s] += 1
+        self.source = self.type = self.target = None
+        for s in range(n):
+            a, b = starts[s], starts[s + 1]
+            if b - a > 1:
+                grouped[a:b] = array('q', sorted(grouped[a:b]))
+
+        # one pass over the graph: keep each edge once, and only if both
+        # ends exist; look for the inverse edge among the target's edges
+        # (inverses[t] is None if t has no inverse, and -1 if its inverse
+        # is not in the graph at all, so that every edge of t misses it)
+        types = dict(zip(names, range(len(names))))
+        inverses = [types.get(INVERSES[name], -1) if name in INVERSES else None
+                    for name in names]
+        edges = array('q')
+        kept = array('q', bytes(8 * (n + 1)))
+        for s in range(n):
+            last = None
+            for i in range(starts[s], starts[s + 1]):
+                v = grouped[i]
+                t, d = divmod(v, n)
+                if v == last:
+                    self.issue('duplicate-relation', keys[s], names[t], keys[d])
+                    continue
+                last = v
+                if not (ok[s] and ok[d]):
+                    self.issue('dangling-relation', keys[s], names[t], keys[d])
+                    continue
+                edges.append(v)
+                inverse = inverses[t]
+                if inverse is None:
+                    continue
+                if inverse < 0:
+                    self.issue('missing-inverse', keys[s], names[t], keys[d])
+                    continue
+                w = inverse * n + s
+                j = bisect_left(grouped, w, starts[d], starts[d + 1])
+                if j == starts[d + 1] or grouped[j] != w:
+                    self.issue('missing-inverse', keys[s], names[t], keys[d])
+            kept[s + 1] = len(edges)
+        self.starts, self.edges = kept, edges
+
+    def targets(self, key):
+        """the (WN-LMF relation type, target key) of the edges from key"""
+        s = self.nodes.get(key)
+        if s is None or self.edges is None:
+            return []
+        n, keys, names = len(self.keys), self.keys, self.names
+        return [(names[v // n], keys[v % n]) for v in self.edges[self.starts[s]:self.starts[s + 1]]]
+
+    def summary(self):
+        issues = ', '.join('{} {}'.format(issue, n) for issue, n in self.issues.items() if n)
+        return '{} relations{}'.format(len(self), '; ' + issues if issues else '')
@@ -0,0 +1,131 @@
+#!/usr/bin/env python3
+
+################################################################################
+# Luis Morgado da Costa (lmorgado.dacosta@gmail.com)
+# License: MIT License (see tab2lmf.py)
+# Files: tab2lmf.py, lexicon.py, lmfwriter.py, incremental.py, stats.py
+################################################################################
+
+
+################################################################################
+# USAGE & NOTES
+################################################################################
+# This file is a companion to tab2lmf.py (--stats, --stats-json): timings
+# and counters of a conversion run, kept by the shared stats object.
+#
+# Stages are timed with
+#
+#     with stats.stage('read_wn'):
+#         ...
+#
+# which adds the wall and CPU time of the block to the stage (stages that
+# run many times, e.g. the rendering of each part of a lexicon, add up).
+# Stages may be nested: 'write_lmf' includes 'transliteration' and the
+# rendering of every lexicon. With --jobs N the lexicons are rendered by
+# worker processes, which send their timings (and transliteration cache
+# hits and misses) back with each part (so the CPU time of the stages can
+# add up to more than their wall time).
+#
+# Counters are plain dictionaries, by group (rows by type, elements by
+# lexicon, caches); report() puts everything together, with the peak RSS
+# of the process (and of the worker processes, if any).
+#
+# Until enable() is called nothing is recorded, and stage() costs about a
+# microsecond (it is only used around whole parts and lexicons), so the
+# calls are left in place.
+################################################################################
+
+import sys, time
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # (not on Windows)
+    resource = None
+
+
+class Stats:
+    """wall and CPU time by stage, and counters, of a conversion run"""
+
+    def __init__(self):
+        self.enabled = False
+        self.stages = dict()  # stages['read_wn'] = [calls, wall, cpu]
+        self.counts = dict()  # counts['rows'] = {'lemma': 7000, ...}
+
+    def enable(self):
+        self.enabled = True
+
+    @contextmanager
+    def stage(self, name):
+        if not self.enabled:
+            yield
+            return
+        self.stages.setdefault(name, [0, 0.0, 0.0])  # (listed in the order they start)
+        wall, cpu = time.perf_counter(), time.process_time()
+        try:
+            yield
+        finally:
+            self.add(name, 1, time.perf_counter() - wall, time.process_time() - cpu)
+
+    def add(self, name, calls, wall, cpu):
+        times = self.stages.get(name)
+        if times is None:
+            times = self.stages[name] = [0, 0.0, 0.0]
+        times[0] += calls
+        times[1] += wall
+        times[2] += cpu
+
+    def take(self):
+        """the stages timed so far, which are then cleared (for workers)"""
+        stages, self.stages = self.stages, dict()
+        return stages
+
+    def merge(self, stages):
+        for name, (calls, wall, cpu) in stages.items():
+            self.add(name, calls, wall, cpu)
+
+    def count(self, group, name, n=1):
+        if not self.enabled:
+            return
+        counts = self.counts.setdefault(group, dict())
+        counts[name] = counts.get(name, 0) + n
+
+    def lexicon(self, lexicon_id, entries, senses, synsets):
+        if not self.enabled:
+            return
+        self.counts.setdefault('lexicons', dict())[lexicon_id] = {
+            'entries': entries, 'senses': senses, 'synsets': synsets}
+
+    def peak_rss(self):
+        """peak resident set size in MB, of this process and of its
+           (finished) children, or None where it cannot be known"""
+        if resource is None:
+            return None
+        # (ru_maxrss is in KB on Linux, but in bytes on macOS)
+        unit = 1 / (1 << 20) if sys.platform == 'darwin' else 1 / (1 << 10)
+        return {'self': round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * unit, 1),
+                'children': round(resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * unit, 1)}
+
+    def report(self):
+        return {'stages': {name: {'calls': calls, 'wall': round(wall, 4), 'cpu': round(cpu, 4)}
+                           for name, (calls, wall, cpu) in self.stages.items()},
+                'counts': self.counts,
+                'peak_rss_mb': self.peak_rss()}
+
+    def write(self, out=sys.stderr):
+        """writes the report as a table"""
+        out.write("{:<32} {:>7} {:>10} {:>10}\n".format('stage', 'calls', 'wall s', 'cpu s'))
+        for name, (calls, wall, cpu) in self.stages.items():
+            out.write("{:<32} {:>7} {:>10.3f} {:>10.3f}\n".format(name, calls, wall, cpu))
+        for group, counts in self.counts.items():
+            out.write("{}:\n".format(group))
+            for name, n in counts.items():
+                if isinstance(n, dict):
+                    n = ', '.join('{} {}'.format(k, v) for k, v in n.items())
+                out.write("  {:<30} {}\n".format(name, n))
+        rss = self.peak_rss()
+        if rss:
+            out.write("peak RSS: {self} MB (worker processes: {children} MB)\n".format(**rss))
+
+
+stats = Stats()
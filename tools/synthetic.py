@@ -0,0 +1,200 @@
+#!/usr/bin/env python3
+
+################################################################################
+# Luis Morgado da Costa (lmorgado.dacosta@gmail.com)
+# License: MIT License (see tab2lmf.py)
+# Files: synthetic.py, bench_scale.py
+################################################################################
+
+
+################################################################################
+# USAGE & NOTES
+################################################################################
+# Writes synthetic .tab files that look like real wordnets, and a matching
+# ILI map, so that conversions can be measured without downloading
+# anything (bench_scale.py uses both):
+#
+# python3 synthetic.py wn.tab 1000000 --ili-map ili-map-synthetic.tab
+# python3 tab2lmf.py okwn wn.tab --ili-map ili-map-synthetic.tab --yes
+#
+# The rows are written synset by synset (synsets 00000000-n, 00000001-v,
+# ...), for a few languages. The first language has every synset, and
+# each of the others about half of them, in a random order (so some
+# synsets are owned by another language). What can be set:
+#
+# --langs         the languages (default: eng,cmn,ind,jpn,fra)
+# --lemmas        the mean number of lemmas of each synset, by language
+# --variants      the share of lemmas with variants (1 or 2: capitalized,
+#                 plural, other spelling or romanized forms)
+# --non-ascii     the share of lemmas (and gloss words) that are not ASCII,
+#                 which are the ones that go through unidecode in vary();
+#                 they are written in the script of the language (CJK for
+#                 cmn/jpn/yue, Cyrillic, Greek, or accented Latin)
+# --defs, --exes  the mean number of :def and :exe rows of each synset, by
+#                 language
+# --relations     the share of noun and verb synsets with a hypernym (an
+#                 ssrel:hype row and the ssrel:hypo row back)
+# --ili-coverage  the share of synsets in the ILI map
+# --seed          the same seed (and options) give the same files
+#
+# Lemmas are numbered words spelled with syllables, drawn so that most of
+# them have one or two senses and a few have many, and about one in ten
+# is a multiword expression. Whether a lemma is non-ASCII, and its
+# variants, depend only on its number, so a lemma always comes with the
+# same variants (and is one lexical entry per POS).
+################################################################################
+
+import sys, argparse, random
+
+LANGS = ['eng', 'cmn', 'ind', 'jpn', 'fra']
+POS = 'n' * 60 + 'v' * 15 + 'a' * 12 + 's' * 5 + 'r' * 8  # (roughly as in PWN)
+OTHER_LANGS = 0.5  # the share of synsets of each language but the first
+
+_latin = [c + v for c in 'bdfgklmnprstvz' for v in 'aeiou']
+SCRIPTS = {
+    'latin': [c + v for c in 'bdfgklmnprstvz' for v in 'áéíóúàèâêôãõüç'],
+    'cyrillic': [c + v for c in 'бвгдклмнпрст' for v in 'аеиоуя'],
+    'greek': [c + v for c in 'βγδκλμνπρστ' for v in 'αεηιου'],
+    'cjk': [chr(0x4e00 + i) for i in range(2000)],
+}
+LANG_SCRIPTS = {'cmn': 'cjk', 'jpn': 'cjk', 'yue': 'cjk', 'zho': 'cjk', 'rus': 'cyrillic',
+                'bul': 'cyrillic', 'ukr': 'cyrillic', 'ell': 'greek', 'grc': 'greek'}
+
+
+def spell(n, syllables):
+    """the word number n, with at least two syllables"""
+    base = len(syllables)
+    word = [syllables[n % base]]
+    n //= base
+    while n or len(word) < 2:
+        word.append(syllables[n % base])
+        n //= base
+    return ''.join(word)
+
+
+def share(n, salt):
+    """a number in [0, 1) that only depends on n (and salt)"""
+    x = (n * 0x9e3779b97f4a7c15 + salt * 0xbf58476d1ce4e5b9) & 0xffffffffffffffff
+    x = ((x ^ (x >> 31)) * 0x94d049bb133111eb) & 0xffffffffffffffff
+    return ((x ^ (x >> 29)) >> 40) / 0x1000000
+
+
+class Vocabulary:
+    """the words of a language, by number"""
+
+    def __init__(self, lang, size, non_ascii, variants):
+        self.size = size
+        self.script = SCRIPTS[LANG_SCRIPTS.get(lang, 'latin')]
+        self.non_ascii = non_ascii
+        self.variants = variants
+
+    def word(self, n):
+        if share(n, 1) < self.non_ascii:
+            return spell(n, self.script)
+        return spell(n, _latin)
+
+    def draw(self, rnd):
+        """a word number; one draw in five favours the first words, which
+           gives a few words with many senses"""
+        if rnd.random() < 0.2:
+            return int(self.size ** rnd.random()) - 1
+        return rnd.randrange(self.size)
+
+    def forms(self, n):
+        """the lemma number n, and its variants"""
+        lemma = self.word(n)
+        if share(n, 2) < 0.1:
+            lemma += ' ' + self.word((n * 7 + 3) % self.size)
+        if share(n, 3) >= self.variants:
+            return [lemma]
+        forms = [lemma.capitalize() if lemma.capitalize() != lemma else lemma + 'ing',
+                 lemma + 's', lemma + 'e' if lemma.isascii() else spell(n, _latin)]
+        variants = [forms[int(share(n, 4) * 3)]]
+        if share(n, 5) < 0.3:
+            variants.append(forms[int(share(n, 4) * 3) - 1])
+        return [lemma] + list(dict.fromkeys(variants))
+
+    def text(self, rnd, words):
+        return ' '.join(self.word(self.draw(rnd)) for _ in range(words))
+
+
+def count(rnd, mean):
+    """a number of rows with the given mean (at least 0)"""
+    n = int(mean)
+    return n + (rnd.random() < mean - n)
+
+
+def synthetic_tab(fn, lines, langs=LANGS, lemmas=1.8, variants=0.1, non_ascii=0.3,
+                  defs=0.8, exes=0.3, relations=0.5, ili_map=None, ili_coverage=0.9, seed=0):
+    """writes a synthetic .tab file of the given number of lines (and an
+       ILI map of its synsets to ili_map, if given); returns the number of
+       synsets"""
+
+    rnd = random.Random(seed)
+    per_synset = (1 + OTHER_LANGS * (len(langs) - 1)) * (lemmas + defs + exes) + 2 * relations * 0.75
+    n_ss = max(1, int(lines / per_synset))
+    vocabularies = {lang: Vocabulary(lang, max(10, int(n_ss * lemmas / 1.4)), non_ascii, variants)
+                    for lang in langs}
+    hypernyms = {'n': [], 'v': []}
+
+    out = open(fn, 'w', encoding='utf-8')
+    ili = open(ili_map, 'w', encoding='utf-8') if ili_map else None
+    written = k = 0
+    while written < lines:
+        ss = '{:08d}-{}'.format(k, POS[k % len(POS)])
+        rows = []
+        present = [langs[0]] + [lang for lang in langs[1:] if rnd.random() < OTHER_LANGS]
+        rnd.shuffle(present)
+        for lang in present:
+            vocabulary = vocabularies[lang]
+            for _ in range(max(1, count(rnd, lemmas))):
+                rows.append('\t'.join([ss, lang + ':lemma', *vocabulary.forms(vocabulary.draw(rnd))]))
+            for kind, mean, words in (('def', defs, 8), ('exe', exes, 6)):
+                for order in range(count(rnd, mean)):
+                    rows.append('{}\t{}:{}\t{}\t{}'.format(
+                        ss, lang, kind, order, vocabulary.text(rnd, rnd.randint(words // 2, words * 2))))
+        targets = hypernyms.get(ss[-1])
+        if targets is not None:
+            if targets and rnd.random() < relations:
+                target = targets[rnd.randrange(len(targets))]
+                rows.append('{}\tssrel:hype\t{}'.format(ss, target))
+                rows.append('{}\tssrel:hypo\t{}'.format(target, ss))
+            targets.append(ss)
+        rows = rows[:lines - written]
+        out.write('\n'.join(rows) + '\n')
+        written += len(rows)
+        if ili and share(k, 6) < ili_coverage:
+            ili.write('i{}\t{}\n'.format(k + 1, ss))
+        k += 1
+    out.close()
+    if ili:
+        ili.close()
+    return k
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description="Write a synthetic .tab file (and ILI map)")
+    parser.add_argument('tab', help="the .tab file to write")
+    parser.add_argument('lines', type=int, help="number of rows")
+    parser.add_argument('--ili-map', metavar='FILE', help="also write an ILI map of the synsets")
+    parser.add_argument('--langs', default=','.join(LANGS), help="comma separated languages")
+    parser.add_argument('--lemmas', type=float, default=1.8, help="mean lemmas per synset")
+    parser.add_argument('--variants', type=float, default=0.1, help="share of lemmas with variants")
+    parser.add_argument('--non-ascii', type=float, default=0.3, help="share of non-ASCII words")
+    parser.add_argument('--defs', type=float, default=0.8, help="mean :def rows per synset")
+    parser.add_argument('--exes', type=float, default=0.3, help="mean :exe rows per synset")
+    parser.add_argument('--relations', type=float, default=0.5, help="share of synsets with a hypernym")
+    parser.add_argument('--ili-coverage', type=float, default=0.9, help="share of synsets with an ILI")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(args)
+
+    synsets = synthetic_tab(args.tab, args.lines, langs=args.langs.split(','), lemmas=args.lemmas,
+                            variants=args.variants, non_ascii=args.non_ascii, defs=args.defs,
+                            exes=args.exes, relations=args.relations, ili_map=args.ili_map,
+                            ili_coverage=args.ili_coverage, seed=args.seed)
+    sys.stderr.write("{}: {} rows, {} synsets\n".format(args.tab, args.lines, synsets))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -4,7 +4,10 @@
 # Luis Morgado da Costa (lmorgado.dacosta@gmail.com)
 # Last Modified: August 2019
 # License: MIT License (below)
-# Files: tab2lmf.py, meta.py (optional)
+# Files: tab2lmf.py, lexicon.py, ilimap.py, lmfwriter.py, translit.py,
+#        incremental.py, tabreader.py, relations.py, validate.py,
+#        lmf2tab.py, backends.py, stats.py, tabmerge.py, pipeline.py,
+#        lookup.py, meta.py (optional)
 ################################################################################
 # Copyright 2019, Luis Morgado da Costa
 #
@@ -36,45 +39,140 @@
 # (https://github.com/globalwordnet/ili/blob/master/ili-map-pwn30.tab)
 #
 # python3 tab2lmf.py [wnid code] [wn.tab] > wnlmf.xml
+# python3 tab2lmf.py --batch [manifest.tab] --yes
 # 
 # Example:
 # python3 tab2lmf.py okwn wn.tab > wnlmf.xml
+# python3 tab2lmf.py okwn eng.tab cmn-dict1.tab cmn-dict2.tab > wnlmf.xml
 # 
-# The please validate (e.g.):
+# Several tab files (e.g. one per source dictionary) are first merged into
+# one sorted file, with an external sort that does not need them to fit
+# in memory; rows found in more than one file are kept once, and the
+# :def/:exe orders are numbered again (see tabmerge.py).
+# 
+# The tab file can also be compressed (wn.tab.gz, wn.tab.xz). Malformed rows
+# (e.g. missing fields, or an order that is not a number) are skipped and
+# reported at the end with their line numbers, see tabreader.py.
+# 
+# Besides :lemma, :def and :exe rows, the tab file can have relations
+# between synsets and between senses (the relation types can be given with
+# their WN-LMF names or with short names such as hype, hypo or ants):
+#
+# 01646866-v  	ssrel:hype 	01645601-v
+# 01646866-v  	eng:srel:ants 	lemma 	01647229-v 	other lemma
+#
+# Relations to synsets or senses that are not in the wordnet are dropped,
+# duplicates are written once, and relations without their inverse (e.g.
+# a hype without the hypo back) are kept; all three are counted in a
+# summary printed to stderr (and in the --validate report).
+# 
+# Options:
+# --yes, --no-confirm
+#            do not ask for confirmation of the meta info
+# --output FILE
+#            write the XML to FILE instead of stdout; FILE.gz and FILE.zst
+#            are compressed (.zst needs the zstandard package)
+# --batch MANIFEST
+#            convert many wordnets in one process; each line of MANIFEST is
+#            "wnid <tab> wn.tab [<tab> output]" (output defaults to wnid.xml;
+#            paths are relative to the directory of MANIFEST; several tab
+#            files to merge are separated by commas); the ILI map and
+#            transliterations are only loaded once
+# --owner-langs LANGS
+#            with several tab files: the languages that own the synsets
+#            they share, in order (e.g. eng,cmn; the others follow in
+#            alphabetical order), see tabmerge.py
+# --stream   write the XML in two passes over the tab file, keeping only 
+#            small indexes in memory (same output, for very large files;
+#            the tab file cannot be compressed)
+# --jobs N   render the lexicons with N worker processes (same output)
+# --pipeline read the tab file ahead, and encode, compress and write the
+#            XML, in threads connected by bounded queues, while the main
+#            thread parses and renders (same output; this helps most with
+#            compressed files or slow storage, see pipeline.py)
+# --stable-ids
+#            number lexical entries from their lemma, variants and POS 
+#            instead of their line in the file (e.g. okwn-mcm-lex8f3a01c2d4e5)
+# --incremental
+#            keep the rendered XML in a cache next to the output (OUTPUT.cache,
+#            or wnid.cache for stdout) and only render what changed since 
+#            the last run (implies --stable-ids, see incremental.py)
+# --translit-cache FILE
+#            keep the ASCII transliterations of the forms in FILE between 
+#            runs (see translit.py)
+# --validate
+#            check the XML while it is written: unique ids, Sense synset=
+#            references, POS of senses, empty ILIs (see validate.py); a
+#            summary is printed to stderr, and the exit status is 1 if
+#            there were errors
+# --validate-bloom
+#            the same, with fixed-size Bloom filters instead of exact
+#            sets (for very large resources); duplicate ids are then only
+#            warnings, as they can be false positives
+# --validate-report FILE
+#            also write the validation report(s) to FILE, as JSON
+# --sqlite FILE
+#            also write the wordnet into an indexed SQLite database (see
+#            backends.py); with --batch, FILE is a directory for wnid.db
+# --parquet DIR
+#            also write the same tables as Parquet files into DIR (needs
+#            the pyarrow package); with --batch, into DIR/wnid
+# --lookup FILE
+#            also write an index of the lemmas, variants and their ASCII
+#            forms, to find the synsets of a word by exact, case/diacritic
+#            folded or prefix queries (python3 lookup.py FILE word, see
+#            lookup.py); with --batch, FILE is a directory for wnid.lemmas
+# --stats   report the wall and CPU time of each stage (ILI map, reading,
+#            the rendering of the entries and synsets of each lexicon,
+#            transliteration, ...), the rows read by type, the entries,
+#            senses and synsets of each lexicon, cache hit rates and the
+#            peak RSS, to stderr (see stats.py)
+# --stats-json FILE
+#            the same report, as JSON, to FILE
+# --profile FILE
+#            run the conversion under cProfile and write the statistics
+#            to FILE (for python3 -m pstats FILE, or snakeviz)
+# --ili-map FILE
+#            the ILI map to use (default: ili-map-pwn30.tab); pwn30 and pwn31
+#            are short for ili-map-pwn30.tab and ili-map-pwn31.tab. The map
+#            is compiled once into FILE.idx, see ilimap.py
+#
+# The conversion can also be used from Python:
+# from tab2lmf import convert, meta
+# from ilimap import load_ilimap
+# convert('okwn', 'wn.tab', load_ilimap('pwn30'), output='okwn.xml')
+# 
+# lmf2tab.py converts WN-LMF back into .tab rows (and bench_roundtrip.py
+# checks that nothing is lost on the way there and back).
+# 
+# synthetic.py writes synthetic .tab files (and ILI maps) to try things on,
+# and bench_scale.py measures whole conversions of them from 10k to 10M rows.
+# 
+# align.py writes the lang:lemma rows of a new language from a bilingual
+# dictionary and an English wordnet (.tab), with a confidence for each.
+# 
+# --validate checks what is specific to wordnets (and what the writer
+# could get wrong); for a full check against the DTD one can still run:
 # xmlstarlet val -e wnlmf.xml
 # 
 # TODO:
-# - turn this into a script that can be used in the command-line (functions) 
 # - make ASCII romanization optional 
-# - add synset-synset relations... maybe something like:
-#   01646866-v  	ssrel:hypo 	01646866-v
 # 
 ################################################################################
 
-import sys, os
+import sys, os, argparse, json, tempfile, cProfile
 from collections import defaultdict as dd
-from unidecode import unidecode
-
-################################################################################
-# Making sure the number of arguments is either
-################################################################################
-if (len(sys.argv) <= 2) or (len(sys.argv) > 4):
-    sys.stderr.write("\nThis script expects 2 argument:\n")
-    sys.stderr.write("[1] the wordnet id code (e.g. pwn, okwn)\n")
-    sys.stderr.write("[2] a tsv to produce the LMF from\n\n")
-    sys.exit()
-
-elif len(sys.argv) == 3:
-    sys.stderr.write("\nThis script was able to find 2 arguments.\n")
-    sys.stderr.write("It will assume they are:\n")
-    sys.stderr.write("[1] the wordnet id code (e.g. pwn, okwn)\n")
-    sys.stderr.write("[2] a tsv to produce the LMF from\n\n")
-    wnid = sys.argv[1]
-    wnfile_path = sys.argv[2]
-################################################################################
-
-
-ilimapfile ='ili-map-pwn30.tab'
+from lexicon import read_wn
+from ilimap import load_ilimap
+from lmfwriter import write_lmf, stream_wn, open_output, close_output
+from translit import transliterate
+from tabreader import is_compressed
+from validate import Validator
+from backends import BACKENDS
+from incremental import FragmentCache, write_lmf_incremental
+from stats import stats
+from tabmerge import merge_tabs, report as merge_report
+from pipeline import pipeline
 
 
 ################################################################################
@@ -142,323 +240,290 @@ meta['copwn'] = {'id':'copwn',
 ################################################################################
 # Confirm the meta info before moving on
 ################################################################################
-if wnid not in list(meta.keys()):
-    sys.stderr.write("\nThere was no meta-info available for this wordnet.")
-    sys.stderr.write("\nPlease edit the script and include it.""")
-    sys.stderr.write("\nQuitting...\n\n")
-    sys.exit()
-
-sys.stderr.write("\nThis is the meta info found for this wnid.\n\n")
-for value in meta[wnid]:
-    sys.stderr.write("{}:{}\n".format(value, meta[wnid][value]))
-
-sys.stderr.write("\nDo you want to proceed? [yes|no]\n\n")
-confirmation = input()
-if confirmation.strip() not in  ["yes", "y", "Y", "Yes"]:
-    sys.stderr.write("Quitting...\n")
-    sys.exit()
-################################################################################
-
+def confirm(wnids, meta):
+    """shows the meta info of each wnid and asks whether to proceed"""
 
+    for wnid in wnids:
+        sys.stderr.write("\nThis is the meta info found for {}.\n\n".format(wnid))
+        for value in meta[wnid]:
+            sys.stderr.write("{}:{}\n".format(value, meta[wnid][value]))
 
-def vary(lemma):
-    """returns a list of variants and their tag data
-       this version gives basic transliteration with unidecode"""    
-    vars = []  # [(var, cat, tag), ]  e.g. ('colour', 'dialect', 'GB')
-    var = unidecode(lemma)
-    var = var.strip()
-    if var and var != lemma:
-        vars.append((var.lower(), 'transliteration', 'ascii'))
-    return vars
-    
-def print_header(meta, lang, comment):
-    """print the header of the lexicon, filled in with WN-LMF meta data"""
-
-    header = str()
-
-    if comment:
-        header += ("""<!-- {}  -->\n""".format(comment))
-
-    header += ("""  <Lexicon id="{}" \n""".format(meta['id']+'-'+lang))
-    header += ("""           label="{}" \n""".format(meta['label']))
-    header += ("""           language="{}" \n""".format(lang))
-    header += ("""           email="{}" \n""".format(meta['email']))
-    header += ("""           license="{}" \n""".format(meta['license']))
-    header += ("""           version="{}" \n""".format(meta['version']))
-    header += ("""           citation="{}" \n""".format(meta['citation']))
-    header += ("""           url="{}" \n""".format(meta['url']))
-    header += ("""           dc:publisher="Global Wordnet Association" \n""")
-    header += ("""           dc:format="OMW-LMF" \n""")
-    header += ("""           dc:description="{}" \n""".format(meta['description']))
-    header += ("""           confidenceScore="{}">""".format(meta['conf']))
-
-    return header
-
-
-def print_footer():
-
-    footer = str()
-    footer += ("  </Lexicon>")
-    return footer
-
-
-def read_wn(fn):
-    """Given a .tab+ file (also ready for forms), it prepares lexical 
-       entries and senses"""
-
-    lexicon = dd(lambda: dd(lambda: dd(lambda: dd(lambda:set()))))
-    ss_defs = dd(lambda: dd(lambda: dd())) # ssdefs['synsetID']['eng'][0] = "first English def" 
-    ss_exes = dd(lambda: dd(lambda: dd())) # ssexes['synsetID']['eng'][0] = "first English example" 
-
-    defined_synsets = dd() # this is a set to store all seen synsets as they should only be defined once
-    
-    map_file = open(ilimapfile,'r')
-    ilimap = dd(str)
-    for l in map_file:
-        row = l.strip().split()
-        ilimap[row[1].replace('-s','-a')] = row[0]
-
-
-    tab_file = open(fn, 'r')
-    lex_c = 0
-    for line in tab_file:
-
-        tab = line.split('\t')
-
-        if tab[1].endswith(':lemma'):
-            lex_c += 1
-
-            lang = tab[1].split(':')[0]
-            
-            ss = tab[0].strip()
-            lemma = tab[2].strip()
-            pos = ss[-1].replace('s', 'a')
-
-            var_end = len(tab) - 1
-            variants = set()
-            if var_end > 2:
-                for i in range(3, var_end+1):
-                    variants.add(tab[i].strip())
-
-            ####################################################################
-            # TRYING TO FIX:                                                   #
-            # Synset should only be defined once (in a single lexicon)         #
-            # and senses for other languages should link to the same synset    #
-            # The best decision is to take the first time it is defined and    #
-            # store a list to check whether it has been defined in other       #
-            # language.                                                        #
-            # the "Synset id naming convention" makes it that it must be       #
-            # defined  with the ID starting as the wnid. In a file with        #
-            # multiple languages this will also include the language           #
-            # (e.g. "ntumc-cmn" or "ntumc-in")                                 #
-            ####################################################################
-                                                                               #
-            if ss in defined_synsets.keys():                                   #
-                ssID = wnid + '-' + defined_synsets[ss] + '-' + ss             #
-                new_ss = False                                                 #
-            else:                                                              #
-                defined_synsets[ss] = lang                                     #
-                ssID = wnid + '-' + lang + '-' + ss                            #
-                new_ss = True                                                  #
-                                                                               #
-            ####################################################################
-
-            
-            if lexicon[lang]['Lex'][(lemma,tuple(variants),pos)]['lexID']:
-                lexID = list(lexicon[lang]['Lex'][(lemma,tuple(variants),pos)]['lexID'])[0]
-            
-            else:
-                lexID = wnid+'-'+lang+'-'+'lex'+str(lex_c)
-
-
-            senseID = ss+'-'+lexID
-
-
-            if new_ss:
-                lexicon[lang]['Synset'][ssID]['pos'].add(pos)
-                lexicon[lang]['Synset'][ssID]['ili'].add(ilimap[ss])
-
-            
-            lexicon[lang]['Lex'][(lemma,tuple(variants),pos)]['lexID'].add(lexID)
-            lexicon[lang]['LexEntry'][lexID]['lemma'].add(lemma)
-            lexicon[lang]['LexEntry'][lexID]['pos'].add(pos)
-            for var in variants:
-                lexicon[lang]['LexEntry'][lexID]['variants'].add(var)
-            lexicon[lang]['LexEntry'][lexID]['sense'].add(ssID)
-
-
-
-
-            
-        ########################################################################
-        # DEFINITIONS                                                          #
-        ########################################################################
-        # Definitions in this TSV file are synset objects. There is no plan to #
-        # support sense definitions in this TSV format.                        #
-        #                                                                      #
-        # But multiple definitions can still exist for multiple languages.     #
-        # Synsets in the XML format are only instanciated once even if there   #
-        # are multiple lexicons in the same WN-LMF.                            #
-        #                                                                      #
-        # Because it doesn't really matter in which lexicon they are first     #
-        # instanciated, they are being instanciated in the first language they #
-        # are seen. This matters for the definitions, since they should be     #
-        # grouped by synset first, and then language. All synset definitions   #
-        # need to be dumped when the synset is defined. And each langauge      #
-        # should be individually added to that definition. (when language is   #
-        # no added, the WN-LMF assumes the definition is given in the same     #
-        # language as the lexicon object.                                      #
-        #                                                                      #
-        # In the original tsv file, a definition is defined by 4 TSV values:   #
-        #                                                                      #
-        # synsetID  \t  lang:def  \t  OrderInteger  \t definition              #
-        #                                                                      #
-        # We will store the definitions like so:                               #
-        # ssdefs['synsetID']['eng'][0] = "first eng def"                       #
-        # ssdefs['synsetID']['eng'][1] = "second eng def"                      #
-        # ssdefs['synsetID']['cmn'][0] = "first cmn def"                       #
-        ########################################################################
-        elif (tab[1].endswith(':def')) and (len(tab) == 4) :
-            ss = tab[0].strip()
-            lang = tab[1].split(':')[0].strip()
-            order_int = int(tab[2].strip())
-            definition = tab[3].strip()
-            
-            ss_defs[ss][lang][order_int] = definition
-
-
-        ########################################################################
-        # EXAMPLES                                                             #
-        ########################################################################
-        # Examples are essentially the same as definitions.                    #
-        # We do not currently support sense examples in this TSV format.       # 
-        ########################################################################
-        elif (tab[1].endswith(':exe')) and (len(tab) == 4) :
-            ss = tab[0].strip()
-            lang = tab[1].split(':')[0].strip()
-            order_int = int(tab[2].strip())
-            example = tab[3].strip()
-            
-            ss_exes[ss][lang][order_int] = example
-            
-    return lexicon, ss_defs, ss_exes
+    sys.stderr.write("\nDo you want to proceed? [yes|no]\n\n")
+    confirmation = input()
+    return confirmation.strip() in ["yes", "y", "Y", "Yes"]
 
 
 ################################################################################
 # PRINT OUT XML
 ################################################################################
-
-wn, ss_defs, ss_exes = read_wn(wnfile_path)
-
-print("""<?xml version="1.0" encoding="UTF-8"?>""")
-print("""<!DOCTYPE LexicalResource SYSTEM "http://globalwordnet.github.io/schemas/WN-LMF-1.0.dtd">""")
-print("""<LexicalResource xmlns:dc="http://purl.org/dc/elements/1.1/">""")
-for lang in wn:
-
-    # header = print_header(meta[wnid+'-'+lang], None)
-    header = print_header(meta[wnid], lang, None)
-    print(header)
-
-    for lexID in wn[lang]['LexEntry']:
-
-        lexEntry = str()
-        lexEntry += """    <LexicalEntry id="{}">\n""".format(lexID)
-
-        lemma = list(wn[lang]['LexEntry'][lexID]['lemma'])[0]
-        pos = list(wn[lang]['LexEntry'][lexID]['pos'])[0]
-        lexEntry += """      <Lemma writtenForm="{}" partOfSpeech="{}"/>\n""".format(lemma,pos)
-        variants = wn[lang]['LexEntry'][lexID]['variants']
-
-        
-
-
-        ########################################################################
-        # FORMS AND VARIANTS                                                   #
-        ########################################################################
-        newvariants = set(variants)
-
-        ########################################################################
-        # This generates autmatic ASCII forms based on the unicode databse.    #
-        # ASCII forms generated here are based on the cannonical lemma.        #     
-        ########################################################################
-        # for (var,cat,tag) in vary(lemma):
-        #     if var not in newvariants:
-        #         newvariants.add(var)
-        #         lexEntry += """      <Form  writtenForm="{}">\n""".format(var)
-        #         lexEntry += """          <Tag category="{}">{}</Tag>\n""".format(cat, tag)
-        #         lexEntry += """      </Form>\n"""           
-
-        ########################################################################
-        # Here we include the forms provided on the TSV file.                  #
-        # Currently there is no way of providing a tag for these forms.        #
-        # These forms might also be non-ascii and, as such, these might add    #
-        # further forms to the WN-LMF to aid in the search functions           #
-        ########################################################################
-        for v in variants:
-            lexEntry += """      <Form  writtenForm="{}"></Form>\n""".format(v)
-            for (var,cat,tag) in vary(v):
-                if var not in newvariants:
-                    newvariants.add(var)
-                    lexEntry += """      <Form  writtenForm="{}">\n""".format(var)
-                    lexEntry += """          <Tag category="{}">{}</Tag>\n""".format(cat, tag)
-                    lexEntry += """      </Form>\n"""
-
-
-                
-
-        senses = wn[lang]['LexEntry'][lexID]['sense']
-
-        for ssID in senses:
-            senseID = ssID+'-'+lexID
-            lexEntry += """      <Sense id="{}" synset="{}"></Sense>\n""".format(senseID, ssID)
-
-        lexEntry += """    </LexicalEntry>"""
-
-        print(lexEntry)
-
-
-    for ssID in wn[lang]['Synset']:
-        
-        original_ss = ssID[len(wnid)+len(lang)+2:]
-        pos = list(wn[lang]['Synset'][ssID]['pos'])[0]
-        ili = list(wn[lang]['Synset'][ssID]['ili'])[0]
-        synEntry = """    <Synset id="{}" ili="{}" partOfSpeech="{}">""".format(ssID, ili, pos)
-
-        if (original_ss in ss_defs.keys()) or (original_ss in ss_exes.keys()):
-            synEntry += "\n"
-
-
-            if original_ss in ss_defs.keys():
-                for def_lang in ss_defs[original_ss]:
-                    # There is one definition per language;
-                    # Multiple definitions are separated by ';'
-
-                    definition = ""
-                    for i in sorted(list(ss_defs[original_ss][def_lang].keys())):
-                        definition += ss_defs[original_ss][def_lang][i]
-                        definition += '; '
-
-                    synEntry += """        <Definition language="{}">{}</Definition>\n""".format(def_lang,
-                                                                                                 definition.strip('; '))
-
-
-
-            if original_ss in ss_exes.keys():
-                for exe_lang in ss_exes[original_ss]:
-                    # There can be multiple examples per language;
-
-                    for i in sorted(list(ss_exes[original_ss][exe_lang].keys())):
-                        example = ss_exes[original_ss][exe_lang][i]
-                        synEntry += """        <Example language="{}">{}</Example>\n""".format(exe_lang,
-                                                                                           example.strip())
-                    
-            synEntry += """    </Synset>""".format(ssID, ili, pos) # well aligned
-            
+def convert(wnid, fn, ilimap, output=None, stream=False, jobs=1,
+            stable_ids=False, incremental=False, validator=None, backends=()):
+    """converts the .tab file fn into WN-LMF, written to output (a path, 
+       see open_output(), or stdout when None), checked by validator if
+       given (see validate.py); backends are (name, path) pairs of other
+       outputs to write from the same wordnet (see backends.py); raises
+       ValueError for backends with stream, which keeps no wordnet"""
+
+    if stream and backends:
+        raise ValueError("backends ({}) are written from the wordnet in memory, "
+                         "which stream does not keep".format(', '.join(name for (name, _) in backends)))
+    out = open_output(output)
+    cache = wn = None
+    try:
+        if stream:
+            with stats.stage('stream_wn'):
+                reader, relations = stream_wn(fn, wnid, meta, ilimap, out, validator=validator)
+        elif incremental:
+            digests = dict()
+            with stats.stage('read_wn'):
+                wn = read_wn(fn, wnid, ilimap, stable_ids=True, digests=digests)
+            reader, relations = wn.reader, (wn.ssrels, wn.srels)
+            cache = FragmentCache((output or wnid) + '.cache')
+            with stats.stage('write_lmf_incremental'):
+                write_lmf_incremental(wn, meta, out, digests, cache, validator=validator)
         else:
-            synEntry += """</Synset>""".format(ssID, ili, pos)  # well aligned
-        
-        print(synEntry)
-
-    footer = print_footer()
-    print(footer)
-print("""</LexicalResource>""")
+            with stats.stage('read_wn'):
+                wn = read_wn(fn, wnid, ilimap, stable_ids=stable_ids)
+            reader, relations = wn.reader, (wn.ssrels, wn.srels)
+            with stats.stage('write_lmf'):
+                write_lmf(wn, meta, out, jobs=jobs, validator=validator)
+    finally:
+        close_output(out)
+
+    for (name, path) in backends:
+        with stats.stage(name):
+            BACKENDS[name](wn, meta, path)
+
+    if stats.enabled:
+        count_run(wnid, reader, relations, wn, cache)
+
+    reader.problems.report()
+    ssrels, srels = relations
+    if ssrels.nodes or srels.nodes:
+        sys.stderr.write("{}: synsets: {}; senses: {}\n".format(wnid, ssrels.summary(), srels.summary()))
+    if validator:
+        sys.stderr.write("{}: {}\n".format(wnid, validator.summary()))
+
+    if cache:
+        cache.save()
+        sys.stderr.write("Incremental: {} of {} lexicon entry blocks and {} of {} synsets reused\n".format(
+            cache.reused['entries'], cache.reused['entries'] + cache.rendered['entries'],
+            cache.reused['synsets'], cache.reused['synsets'] + cache.rendered['synsets']))
+
+
+def merge_inputs(fns, langs=()):
+    """merges the .tab files fns into a temporary sorted .tab file (see
+       tabmerge.py), whose path is returned"""
+
+    fd, merged = tempfile.mkstemp(suffix='.tab')
+    with stats.stage('merge'), open(fd, 'w', encoding='utf-8', newline='\n') as out:
+        readers, counts = merge_tabs(fns, out, langs)
+    merge_report(fns, readers, counts)
+    for kind in ('read', 'duplicates', 'runs'):
+        stats.count('merge', kind, counts[kind])
+    return merged
+
+
+def count_run(wnid, reader, relations, wn=None, cache=None):
+    """adds the counters of a conversion to stats (see stats.py)"""
+
+    for kind, n in reader.counts.items():
+        stats.count('rows', kind, n)
+    stats.count('rows', 'malformed', reader.problems.count)
+    if wn:  # (stream_wn counts its lexicons as it writes them)
+        for lang, lexicon in wn.lexicons.items():
+            stats.lexicon(wnid + '-' + lang, len(lexicon.entries),
+                          sum(len(entry.senses) for entry in lexicon.entries), len(lexicon.synsets))
+    ssrels, srels = relations
+    stats.count('relations', 'synset', len(ssrels))
+    stats.count('relations', 'sense', len(srels))
+    if cache:
+        for kind in ('entries', 'synsets'):
+            stats.count('incremental', kind + ' reused', cache.reused[kind])
+            stats.count('incremental', kind + ' rendered', cache.rendered[kind])
+
+
+def write_stats(json_file=None):
+    """adds the cache hit rates to stats, and writes the report to stderr
+       (or as JSON to json_file)"""
+
+    def hit_rate(hits, misses):
+        return round(hits / (hits + misses), 4) if hits + misses else None
+
+    translit = transliterate.stats()
+    caches = {'transliteration': dict(translit, hit_rate=hit_rate(translit['hits'], translit['misses']))}
+    incremental = stats.counts.pop('incremental', None)
+    if incremental:
+        reused = incremental['entries reused'] + incremental['synsets reused']
+        rendered = incremental['entries rendered'] + incremental['synsets rendered']
+        caches['incremental'] = dict(incremental, hit_rate=hit_rate(reused, rendered))
+    stats.counts['caches'] = caches
+
+    if json_file:
+        with open(json_file, 'w', encoding='utf-8') as f:
+            json.dump(stats.report(), f, indent=1, ensure_ascii=False)
+    else:
+        stats.write(sys.stderr)
+
+
+def read_manifest(fn):
+    """returns the (wnid, tab path, output) of each line of a manifest
+       (tab path is a list if there are several files to merge); relative
+       paths are taken from the manifest's directory, and so is the
+       default output (wnid.xml); raises ValueError for a malformed line"""
+
+    base = os.path.dirname(fn)
+    wordnets = []
+    for lineno, line in enumerate(open(fn, 'r'), 1):
+        row = [field.strip() for field in line.rstrip('\n').split('\t')]
+        if not row[0] or row[0].startswith('#'):
+            continue
+        wnid = row[0]
+        if len(row) < 2 or not any(t.strip() for t in row[1].split(',')):
+            raise ValueError("{}, line {}: expected a wordnet id code and a tsv".format(fn, lineno))
+        tab = [os.path.join(base, t.strip()) for t in row[1].split(',') if t.strip()]
+        tab = tab[0] if len(tab) == 1 else tab
+        output = os.path.join(base, row[2] if len(row) > 2 and row[2] else wnid + '.xml')
+        wordnets.append((wnid, tab, output))
+    return wordnets
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description="Convert .tab wordnets to WN-LMF")
+    parser.add_argument('wnid', nargs='?', help="the wordnet id code (e.g. pwn, okwn)")
+    parser.add_argument('tab', nargs='*', help="a tsv to produce the LMF from (several are merged)")
+    parser.add_argument('--yes', '--no-confirm', dest='yes', action='store_true',
+                        help="do not ask for confirmation of the meta info")
+    parser.add_argument('--output', help="output file (.gz/.zst are compressed; default: stdout)")
+    parser.add_argument('--batch', metavar='MANIFEST',
+                        help="convert every (wnid, tab[, output]) line of MANIFEST")
+    parser.add_argument('--stream', action='store_true',
+                        help="two-pass writer with small memory use")
+    parser.add_argument('--jobs', type=int, default=1, help="worker processes")
+    parser.add_argument('--pipeline', action='store_true',
+                        help="read and write in threads, while parsing and rendering")
+    parser.add_argument('--stable-ids', action='store_true',
+                        help="entry ids that do not depend on row positions")
+    parser.add_argument('--incremental', action='store_true',
+                        help="only render what changed since the last run")
+    parser.add_argument('--translit-cache', metavar='FILE',
+                        help="keep transliterations in FILE between runs")
+    parser.add_argument('--validate', action='store_true',
+                        help="check ids and synset references while writing")
+    parser.add_argument('--validate-bloom', action='store_true',
+                        help="--validate with fixed-size Bloom filters")
+    parser.add_argument('--validate-report', metavar='FILE',
+                        help="write the validation report to FILE as JSON (implies --validate)")
+    parser.add_argument('--sqlite', metavar='FILE', help="also write an SQLite database")
+    parser.add_argument('--parquet', metavar='DIR', help="also write Parquet tables")
+    parser.add_argument('--lookup', metavar='FILE', help="also write a lemma lookup index")
+    parser.add_argument('--stats', action='store_true',
+                        help="report the time of each stage and the counts of the run")
+    parser.add_argument('--stats-json', metavar='FILE',
+                        help="write the --stats report to FILE as JSON")
+    parser.add_argument('--profile', metavar='FILE',
+                        help="run under cProfile and write the pstats to FILE")
+    parser.add_argument('--ili-map', default='ili-map-pwn30.tab', metavar='FILE',
+                        help="ILI map (or pwn30, pwn31)")
+    parser.add_argument('--owner-langs', default='', metavar='LANGS',
+                        help="with several tsv files: the languages that own shared synsets first")
+    args = parser.parse_args(args)
+
+    if args.batch:
+        if args.wnid or args.output:
+            parser.error("--batch takes the wordnets and outputs from the manifest")
+        try:
+            wordnets = read_manifest(args.batch)
+        except ValueError as e:
+            parser.error(str(e))
+    elif args.wnid and args.tab:
+        wordnets = [(args.wnid, args.tab[0] if len(args.tab) == 1 else args.tab, args.output)]
+    else:
+        parser.error("expected a wordnet id code and a tsv, or --batch MANIFEST")
+
+    for (wnid, tab, output) in wordnets:
+        if wnid not in meta:
+            sys.stderr.write("\nThere was no meta-info available for this wordnet ({}).".format(wnid))
+            sys.stderr.write("\nPlease edit the script (or meta.py) and include it.")
+            sys.stderr.write("\nQuitting...\n\n")
+            return 1
+
+    if args.stream and (args.jobs > 1 or args.stable_ids or args.incremental):
+        parser.error("--stream cannot be combined with --jobs, --stable-ids or --incremental")
+    if args.stream and any(isinstance(tab, str) and is_compressed(tab) for (_, tab, _) in wordnets):
+        parser.error("--stream reads rows back by offset and needs an uncompressed .tab file")
+    if args.stream and (args.sqlite or args.parquet or args.lookup):
+        parser.error("--sqlite, --parquet and --lookup are written from the wordnet in memory (not --stream)")
+    if args.incremental and args.jobs > 1:
+        sys.stderr.write("--jobs is ignored with --incremental\n")
+
+    if not args.yes and not confirm([wnid for (wnid, _, _) in wordnets], meta):
+        sys.stderr.write("Quitting...\n")
+        return 1
+
+    if args.stats or args.stats_json:
+        stats.enable()
+    if args.pipeline:
+        pipeline.enable()
+    if args.profile:
+        profiler = cProfile.Profile()
+        try:
+            status = profiler.runcall(run, args, wordnets)
+        finally:
+            profiler.dump_stats(args.profile)
+            sys.stderr.write("Profile written to {0} (python3 -m pstats {0})\n".format(args.profile))
+    else:
+        status = run(args, wordnets)
+    if stats.enabled:
+        write_stats(args.stats_json)
+    return status
+
+
+def run(args, wordnets):
+    """converts the wordnets, once the options have been checked by main()"""
+
+    if args.translit_cache:
+        transliterate.load(args.translit_cache)
+    with stats.stage('ili map'):
+        ilimap = load_ilimap(args.ili_map)
+
+    validate = args.validate or args.validate_bloom or args.validate_report
+    reports = dict()
+    for (wnid, tab, output) in wordnets:
+        if len(wordnets) > 1:
+            sys.stderr.write("{} -> {}\n".format(tab, output))
+        validator = Validator(bloom=args.validate_bloom) if validate else None
+        backends = []
+        for name, path, suffix in [('sqlite', args.sqlite, '.db'), ('parquet', args.parquet, ''),
+                                   ('lookup', args.lookup, '.lemmas')]:
+            if path and args.batch:
+                os.makedirs(path, exist_ok=True)
+                path = os.path.join(path, wnid + suffix)
+            if path:
+                backends.append((name, path))
+        merged = None
+        if not isinstance(tab, str):  # several files, merged first
+            merged = merge_inputs(tab, [lang for lang in args.owner_langs.split(',') if lang])
+        try:
+            convert(wnid, merged or tab, ilimap, output, stream=args.stream, jobs=args.jobs,
+                    stable_ids=args.stable_ids, incremental=args.incremental,
+                    validator=validator, backends=backends)
+        finally:
+            if merged:
+                os.remove(merged)
+        if validator:
+            reports[wnid] = dict(validator.report(), tab=tab, output=output)
+
+    if args.validate_report:
+        with open(args.validate_report, 'w', encoding='utf-8') as f:
+            json.dump(reports, f, indent=1, ensure_ascii=False)
+
+    if args.translit_cache:
+        transliterate.save(args.translit_cache)
+    sys.stderr.write("Transliterations: {hits} cache hits, {misses} misses, {batched} batched\n".format(
+        **transliterate.stats()))
+    return 0 if all(report['valid'] for report in reports.values()) else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
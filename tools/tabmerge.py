@@ -0,0 +1,222 @@
+#!/usr/bin/env python3
+
+################################################################################
+# Luis Morgado da Costa (lmorgado.dacosta@gmail.com)
+# License: MIT License (see tab2lmf.py)
+# Files: tab2lmf.py, tabmerge.py, tabreader.py
+################################################################################
+
+
+################################################################################
+# USAGE & NOTES
+################################################################################
+# This file is a companion to tab2lmf.py: it merges several .tab files
+# (e.g. one per source dictionary and language) into a single sorted one,
+# without holding them in memory:
+#
+# python3 tabmerge.py eng.tab cmn-dict1.tab cmn-dict2.tab.gz > wn.tab
+# python3 tabmerge.py *.tab --output wn.tab --owner-langs eng,cmn
+#
+# (tab2lmf.py does the same when it is given several .tab files.)
+#
+# The merge is an external sort:
+#
+# - the rows of every file are read with the TabReader (so malformed rows
+#   are skipped and reported, as by tab2lmf.py) and turned into sort
+#   records, keyed by (synset, language, type); these are sorted in runs
+#   of at most --memory MB, and each run is written to a temporary file;
+# - the runs are merged with a k-way merge (heapq.merge), at most
+#   MAX_FANIN at a time (more runs are first merged into larger ones);
+# - rows that come out twice (the same lemma and variants, or the same
+#   relation, from two files) are written once, and the :def and :exe rows
+#   of a synset and language are numbered again from 0, in the order of
+#   their old numbers (then of their text), without duplicate texts.
+#
+# The output is sorted by synset, then language, then type (lemmas,
+# definitions, examples, sense relations; synset relations come first).
+# So which language owns a synset (the first one with a :lemma row, see
+# read_wn) no longer depends on the order of the files or of their rows:
+# it is the first language in --owner-langs that has a lemma for it, or
+# else the first one in alphabetical order.
+################################################################################
+
+import sys, os, argparse, heapq, tempfile
+from contextlib import ExitStack
+from tabreader import TabReader, LEMMA, DEF, EXE, SSREL, SREL
+from lmfwriter import open_output, close_output
+
+RUN_SIZE = 256  # MB of sort records in memory before a run is written
+MAX_FANIN = 64  # runs merged at a time (each is an open file)
+RECORD_SIZE = 80  # bytes taken by each record besides its characters (roughly)
+CHUNK_SIZE = 4096  # rows joined before each write
+
+CODES = {SSREL: '0', LEMMA: '1', DEF: '2', EXE: '3', SREL: '4'}
+KINDS = {'2': DEF, '3': EXE}
+ORDER_OFFSET = 10 ** 18  # orders are written as 19 digits, so they sort as numbers
+
+
+def language_keys(langs):
+    """a function giving the sort key of a language: those in langs first,
+       in that order, then the others alphabetically"""
+    ranks = {lang: i for i, lang in enumerate(langs)}
+
+    def key(lang):
+        return '{:03d}{}'.format(ranks.get(lang, 999), lang)
+    return key
+
+
+def sort_record(record, lang_key):
+    """the sort record of a TabReader record: a line beginning with the
+       synset, language key and type code, and then the fields"""
+    kind, ss, lang, a, b, _ = record
+    if kind is LEMMA:
+        fields = (a,) + b
+    elif kind is SSREL:
+        return '{}\t\t0\t{}\t{}\n'.format(ss, a, b)
+    elif kind is SREL:
+        fields = (b[0], a, b[1], b[2])
+    else:
+        fields = ('{:019d}'.format(a + ORDER_OFFSET), b)
+    return '{}\t{}\t{}\t{}\n'.format(ss, lang_key(lang), CODES[kind], '\t'.join(fields))
+
+
+def write_run(records, tmpdir):
+    records.sort()
+    fd, path = tempfile.mkstemp(suffix='.run', dir=tmpdir)
+    with open(fd, 'w', encoding='utf-8', newline='\n') as f:
+        f.writelines(records)
+    return path
+
+
+def write_runs(readers, tmpdir, lang_key, run_size):
+    """the sorted runs of the rows of readers (temporary files)"""
+    runs, records, size = [], [], 0
+    limit = run_size << 20
+    for reader in readers:
+        for record in reader:
+            line = sort_record(record, lang_key)
+            records.append(line)
+            size += len(line) + RECORD_SIZE
+            if size >= limit:
+                runs.append(write_run(records, tmpdir))
+                records, size = [], 0
+    if records or not runs:
+        runs.append(write_run(records, tmpdir))
+    return runs
+
+
+def merge_runs(runs, tmpdir):
+    """the lines of the runs, in order; if there are more than MAX_FANIN
+       runs, they are first merged into fewer, larger ones"""
+    while len(runs) > MAX_FANIN:
+        merged = []
+        for i in range(0, len(runs), MAX_FANIN):
+            group = runs[i:i + MAX_FANIN]
+            fd, path = tempfile.mkstemp(suffix='.run', dir=tmpdir)
+            with open(fd, 'w', encoding='utf-8', newline='\n') as out, ExitStack() as stack:
+                files = [stack.enter_context(open(run, encoding='utf-8', newline='\n')) for run in group]
+                out.writelines(heapq.merge(*files))
+            for run in group:
+                os.remove(run)
+            merged.append(path)
+        runs = merged
+
+    with ExitStack() as stack:
+        files = [stack.enter_context(open(run, encoding='utf-8', newline='\n')) for run in runs]
+        yield from heapq.merge(*files)
+
+
+def merged_rows(lines, counts):
+    """the .tab rows of the sorted lines, without duplicates, and with the
+       :def and :exe rows of each synset and language numbered again"""
+
+    def glosses(group, texts):
+        ss, key, code = group
+        unique = list(dict.fromkeys(texts))
+        counts['duplicates'] += len(texts) - len(unique)
+        kind = '{}:{}'.format(key[3:], KINDS[code])
+        for order, text in enumerate(unique):
+            yield '{}\t{}\t{}\t{}\n'.format(ss, kind, order, text)
+
+    previous = group = None
+    texts = []
+    for line in lines:
+        if line == previous:
+            counts['duplicates'] += 1
+            continue
+        previous = line
+        ss, key, code, rest = line.rstrip('\n').split('\t', 3)
+        if code in KINDS:
+            if group != (ss, key, code):
+                if texts:
+                    yield from glosses(group, texts)
+                group, texts = (ss, key, code), []
+            texts.append(rest.split('\t', 1)[1])
+            continue
+        if texts:
+            yield from glosses(group, texts)
+            group, texts = None, []
+        if code == '1':
+            yield '{}\t{}:lemma\t{}\n'.format(ss, key[3:], rest)
+        elif code == '0':
+            yield '{}\tssrel:{}\n'.format(ss, rest)
+        else:
+            rel, rest = rest.split('\t', 1)
+            yield '{}\t{}:srel:{}\t{}\n'.format(ss, key[3:], rel, rest)
+    if texts:
+        yield from glosses(group, texts)
+
+
+def merge_tabs(fns, out, langs=(), run_size=RUN_SIZE, tmpdir=None):
+    """writes the rows of the .tab files fns to out, merged and sorted (see
+       the notes above); returns the readers of the files (for their
+       problems) and counts of rows read and written, duplicates and runs"""
+
+    readers = [TabReader(fn) for fn in fns]
+    counts = {'read': 0, 'written': 0, 'duplicates': 0, 'runs': 0}
+    with tempfile.TemporaryDirectory(dir=tmpdir) as tmp:
+        runs = write_runs(readers, tmp, language_keys(langs), run_size)
+        counts['runs'] = len(runs)
+        chunk = []
+        for row in merged_rows(merge_runs(runs, tmp), counts):
+            chunk.append(row)
+            if len(chunk) >= CHUNK_SIZE:
+                out.write(''.join(chunk))
+                counts['written'] += len(chunk)
+                chunk = []
+        out.write(''.join(chunk))
+        counts['written'] += len(chunk)
+    counts['read'] = sum(sum(reader.counts.values()) for reader in readers)
+    return readers, counts
+
+
+def report(fns, readers, counts, out=sys.stderr):
+    for reader in readers:
+        reader.problems.report(out)
+    out.write("Merged {} files: {} rows read, {} written ({} duplicates), {} sorted run(s)\n".format(
+        len(fns), counts['read'], counts['written'], counts['duplicates'], counts['runs']))
+
+
+def main(args=None):
+    parser = argparse.ArgumentParser(description="Merge .tab files into one sorted .tab file")
+    parser.add_argument('tab', nargs='+', help=".tab files (.gz and .xz are decompressed)")
+    parser.add_argument('--output', help="output file (.gz/.zst are compressed; default: stdout)")
+    parser.add_argument('--owner-langs', default='', metavar='LANGS',
+                        help="languages that own shared synsets first, e.g. eng,cmn")
+    parser.add_argument('--memory', type=int, default=RUN_SIZE, metavar='MB',
+                        help="memory for sorting (default: {})".format(RUN_SIZE))
+    parser.add_argument('--tmpdir', help="directory for the sorted runs")
+    args = parser.parse_args(args)
+
+    out = open_output(args.output)
+    try:
+        readers, counts = merge_tabs(args.tab, out, [lang for lang in args.owner_langs.split(',') if lang],
+                                     run_size=args.memory, tmpdir=args.tmpdir)
+    finally:
+        close_output(out)
+    report(args.tab, readers, counts)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
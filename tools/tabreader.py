@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+
+################################################################################
+# Luis Morgado da Costa (lmorgado.dacosta@gmail.com)
+# License: MIT License (see tab2lmf.py)
+# Files: tab2lmf.py, lexicon.py, lmfwriter.py, tabreader.py, pipeline.py
+################################################################################
+
+
+################################################################################
+# USAGE & NOTES
+################################################################################
+# This file is a companion to lexicon.py and lmfwriter.py: the tokenizer
+# for .tab files, shared by read_wn() and the streaming writer.
+#
+# - the file is read BLOCK_SIZE bytes at a time and split into lines per
+#   block; wn.tab.gz and wn.tab.xz are decompressed on the fly (with
+#   --pipeline, by a thread that reads ahead, see pipeline.py);
+# - each row is split once (at most 2 splits, to find the type field) and
+#   classified with a single lookup in a table of the type fields seen so
+#   far ('eng:lemma' -> (LEMMA, 'eng', None));
+# - rows come out as small tuples, (kind, ss, lang, a, b, line):
+#       (LEMMA, '01646866-v', 'eng', lemma, variants, line)
+#       (DEF,   '01646866-v', 'eng', order, definition, line)
+#       (EXE,   '01646866-v', 'eng', order, example, line)
+#       (SSREL, '01646866-v', None,  'hype', '01645601-v', line)
+#       (SREL,  '01646866-v', 'eng', lemma, ('ants', target ss, target lemma), line)
+#   where variants is a sorted tuple and order an int; rows of any other
+#   type (and blank lines) are skipped, as before;
+# - relations are rows like these (see relations.py for the types):
+#       01646866-v  ssrel:hype        01645601-v
+#       01646866-v  eng:srel:ants     lemma    01647229-v  target lemma
+# - malformed rows (missing fields, an empty synset id, an order that is
+#   not an integer, undecodable bytes) are skipped too, and counted in
+#   reader.problems, which keeps the first MAX_REPORTED line numbers.
+#
+# reader = TabReader('wn.tab.gz')
+# for (kind, ss, lang, a, b, line) in reader:
+#     ...
+# reader.problems.report()
+################################################################################
+
+import sys, gzip, lzma
+from pipeline import pipeline
+
+BLOCK_SIZE = 1 << 20
+MAX_REPORTED = 100
+
+LEMMA = 'lemma'
+DEF = 'def'
+EXE = 'exe'
+SSREL = 'ssrel'
+SREL = 'srel'
+IGNORED = (None, None, None)
+
+
+def is_compressed(fn):
+    return fn.endswith('.gz') or fn.endswith('.xz')
+
+
+def open_tab(fn, buffering=-1):
+    """opens a .tab file for reading bytes (.gz and .xz are decompressed);
+       buffering=0 is for reading it in large blocks (file_blocks), not by
+       lines"""
+    if fn.endswith('.gz'):
+        return gzip.open(fn, 'rb')
+    if fn.endswith('.xz'):
+        return lzma.open(fn, 'rb')
+    return open(fn, 'rb', buffering=buffering)
+
+
+def tab_blocks(fn):
+    """the file in blocks of whole lines (as bytes), read ahead by a
+       thread with --pipeline (see pipeline.py)"""
+    return pipeline.read_ahead(file_blocks(fn))
+
+
+def file_blocks(fn):
+    with open_tab(fn, buffering=0) as f:
+        rest = b''
+        while True:
+            block = f.read(BLOCK_SIZE)
+            if not block:
+                break
+            if rest:
+                block = rest + block
+            end = block.rfind(b'\n') + 1
+            if end == 0:
+                rest = block
+                continue
+            rest = block[end:]
+            yield block[:end]
+        if rest:
+            yield rest + b'\n'
+
+
+def tab_lines(fn, offsets=False):
+    """yields each line of fn without its line end, as (line number, line),
+       or as (line number, byte offset, line) if offsets is True; a line
+       that is not valid UTF-8 is yielded as None"""
+    lineno = 0
+    offset = 0
+    for block in tab_blocks(fn):
+        if offsets:
+            for raw in block.split(b'\n')[:-1]:
+                lineno += 1
+                try:
+                    yield lineno, offset, raw.decode('utf-8')
+                except UnicodeDecodeError:
+                    yield lineno, offset, None
+                offset += len(raw) + 1
+            continue
+        try:
+            lines = block.decode('utf-8').split('\n')
+        except UnicodeDecodeError:  # only this block is decoded line by line
+            lines = []
+            for raw in block.split(b'\n'):
+                try:
+                    lines.append(raw.decode('utf-8'))
+                except UnicodeDecodeError:
+                    lines.append(None)
+        lines.pop()  # (after the last '\n')
+        for line in lines:
+            lineno += 1
+            yield lineno, line
+
+
+class Problems:
+    """the malformed rows of a file: how many, and where the first ones are"""
+
+    def __init__(self, fn):
+        self.fn = fn
+        self.count = 0
+        self.rows = []  # (line number, reason), up to MAX_REPORTED
+
+    def add(self, lineno, reason):
+        self.count += 1
+        if len(self.rows) < MAX_REPORTED:
+            self.rows.append((lineno, reason))
+
+    def report(self, out=sys.stderr):
+        if not self.count:
+            return
+        out.write("{}: skipped {} malformed row(s)\n".format(self.fn, self.count))
+        for (lineno, reason) in self.rows:
+            out.write("  line {}: {}\n".format(lineno, reason))
+        if self.count > len(self.rows):
+            out.write("  ...\n")
+
+
+def classify(field):
+    """the (kind, language, relation type) of a type field like 'eng:lemma'
+       or 'ssrel:hype'"""
+    if field.endswith(':lemma'):
+        return (LEMMA, sys.intern(field[:field.find(':')]), None)
+    for kind in (DEF, EXE):
+        if field.endswith(':' + kind):
+            return (kind, sys.intern(field[:field.find(':')].strip()), None)
+    field = field.strip()
+    if field.startswith('ssrel:'):
+        return (SSREL, None, sys.intern(field[len('ssrel:'):]))
+    if ':srel:' in field:
+        lang, rel = field.split(':srel:', 1)
+        return (SREL, sys.intern(lang), sys.intern(rel))
+    return IGNORED
+
+
+class TabReader:
+    """the rows of a .tab file, tokenized (see the notes above)"""
+
+    def __init__(self, fn):
+        self.fn = fn
+        self.kinds = dict()  # kinds['eng:lemma'] = (LEMMA, 'eng', None)
+        self.problems = Problems(fn)
+        self.counts = dict.fromkeys((LEMMA, DEF, EXE, SSREL, SREL), 0)  # rows read, by kind
+
+    def parse(self, lineno, line):
+        """the record for a single line, or None (skipped)"""
+        if line is None:
+            self.problems.add(lineno, "not valid UTF-8")
+            return None
+        fields = line.split('\t', 2)
+        if len(fields) < 2:
+            if line.strip():
+                self.problems.add(lineno, "no type field")
+            return None
+
+        kind, lang, rel = self.kinds.get(fields[1]) or self.kinds.setdefault(fields[1], classify(fields[1]))
+        if kind is None:
+            return None
+        if len(fields) < 3:
+            self.problems.add(lineno, "missing fields")
+            return None
+        ss = fields[0].strip()
+        if not ss:
+            self.problems.add(lineno, "empty synset id")
+            return None
+        rest = fields[2].split('\t')
+
+        if kind is LEMMA:
+            if len(rest) > 1:
+                variants = tuple(sorted({v.strip() for v in rest[1:]}))
+            else:
+                variants = ()
+            return (LEMMA, ss, lang, rest[0].strip(), variants, line)
+
+        # relations: synsetID \t ssrel:type \t target synsetID
+        #            synsetID \t lang:srel:type \t lemma \t target synsetID \t target lemma
+        if kind is SSREL or kind is SREL:
+            expected = 1 if kind is SSREL else 3
+            if len(rest) != expected:
+                self.problems.add(lineno, "expected {} fields, found {}".format(expected + 2, len(rest) + 2))
+                return None
+            rest = [field.strip() for field in rest]
+            if not all(rest):
+                self.problems.add(lineno, "empty field")
+                return None
+            if kind is SSREL:
+                return (SSREL, ss, None, rel, rest[0], line)
+            return (SREL, ss, lang, rest[0], (rel, rest[1], rest[2]), line)
+
+        # definitions and examples: synsetID \t lang:def \t order \t text
+        if len(rest) != 2:
+            self.problems.add(lineno, "expected 4 fields, found {}".format(len(rest) + 2))
+            return None
+        try:
+            order = int(rest[0].strip())
+        except ValueError:
+            self.problems.add(lineno, "order is not an integer: {!r}".format(rest[0]))
+            return None
+        return (kind, ss, lang, order, rest[1].strip(), line)
+
+    def __iter__(self):
+        parse, counts = self.parse, self.counts
+        for lineno, line in tab_lines(self.fn):
+            record = parse(lineno, line)
+            if record is not None:
+                counts[record[0]] += 1
+                yield record
+
+    def with_offsets(self):
+        """yields (byte offset, record), for readers that seek back to rows
+           (offsets are in the decompressed stream)"""
+        parse, counts = self.parse, self.counts
+        for lineno, offset, line in tab_lines(self.fn, offsets=True):
+            record = parse(lineno, line)
+            if record is not None:
+                counts[record[0]] += 1
+                yield offset, record
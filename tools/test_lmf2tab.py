@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+
+################################################################################
+# Luis Morgado da Costa (lmorgado.dacosta@gmail.com)
+# License: MIT License (see tab2lmf.py)
+# Files: lmf2tab.py, test_lmf2tab.py
+################################################################################
+
+
+################################################################################
+# USAGE & NOTES
+################################################################################
+# Tests of lmf2tab.py on small WN-LMF files:
+#
+# python3 -m pytest test_lmf2tab.py
+################################################################################
+
+import io
+from lmf2tab import lmf2tab
+
+MISMATCHED = """<?xml version="1.0" encoding="UTF-8"?>
+<LexicalResource xmlns:dc="https://globalwordnet.github.io/schemas/dc/">
+  <Lexicon id="oewn-en" label="Open English Wordnet" language="en" email="" license="" version="1.0">
+    <LexicalEntry id="oewn-en-lex1">
+      <Lemma writtenForm="dog" partOfSpeech="n"/>
+      <Sense id="ewn-02084071-n-oewn-en-lex1" synset="ewn-02084071-n"/>
+      <Sense id="oewn-en-02083346-n-oewn-en-lex1" synset="oewn-en-02083346-n"/>
+    </LexicalEntry>
+    <Synset id="ewn-02084071-n" ili="i46360" partOfSpeech="n">
+      <Definition>a domesticated canid</Definition>
+      <Example>the dog barked</Example>
+      <SynsetRelation relType="hypernym" target="oewn-en-02083346-n"/>
+    </Synset>
+    <Synset id="oewn-en-02083346-n" ili="i46359" partOfSpeech="n">
+      <Definition>a canine</Definition>
+      <SynsetRelation relType="hyponym" target="ewn-02084071-n"/>
+    </Synset>
+  </Lexicon>
+</LexicalResource>
+"""
+
+
+def rows(tmp_path, xml):
+    fn = tmp_path / 'wn.xml'
+    fn.write_text(xml, encoding='utf-8')
+    out = io.StringIO()
+    count, unresolved = lmf2tab(str(fn), out)
+    lines = out.getvalue().splitlines()
+    assert count == len(lines)
+    return lines, unresolved
+
+
+def test_mismatched_synset_prefix(tmp_path):
+    lines, unresolved = rows(tmp_path, MISMATCHED)
+    assert not any('None' in line for line in lines)
+    assert sorted(lines) == ['02083346-n\ten:def\t0\ta canine',
+                             '02083346-n\ten:lemma\tdog']
+    # the sense, definition, example and both relations of ewn-02084071-n
+    assert unresolved == 5
@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+
+################################################################################
+# Luis Morgado da Costa (lmorgado.dacosta@gmail.com)
+# License: MIT License (see tab2lmf.py)
+# Files: relations.py, test_relations.py
+################################################################################
+
+
+################################################################################
+# USAGE & NOTES
+################################################################################
+# Tests of the checks relations.py makes when it builds a graph:
+#
+# python3 -m pytest test_relations.py
+################################################################################
+
+from relations import Relations
+
+
+def graph(edges, defined=lambda key: True):
+    relations = Relations()
+    for source, rel, target in edges:
+        relations.add(source, rel, target)
+    relations.finish(defined)
+    return relations
+
+
+def test_only_one_direction():
+    # no hyponym edge at all: every hypernym misses its inverse
+    relations = graph([('a', 'hype', 'b'), ('c', 'hype', 'b'), ('b', 'hype', 'd')])
+    assert relations.issues['missing-inverse'] == 3
+    assert {(e['source'], e['type'], e['target']) for e in relations.examples['missing-inverse']} == \
+        {('a', 'hypernym', 'b'), ('c', 'hypernym', 'b'), ('b', 'hypernym', 'd')}
+    assert relations.targets('a') == [('hypernym', 'b')]
+
+
+def test_some_inverses_missing():
+    relations = graph([('a', 'hype', 'b'), ('b', 'hypo', 'a'), ('c', 'hype', 'b')])
+    assert relations.issues['missing-inverse'] == 1
+    assert relations.examples['missing-inverse'] == [{'source': 'c', 'type': 'hypernym', 'target': 'b'}]
+
+
+def test_symmetric_and_without_inverse():
+    # antonym is its own inverse; also has none
+    relations = graph([('a', 'ants', 'b'), ('b', 'antonym', 'a'), ('a', 'also', 'c')])
+    assert relations.issues['missing-inverse'] == 0
+    relations = graph([('a', 'ants', 'b')])
+    assert relations.issues['missing-inverse'] == 1
+
+
+def test_duplicate_and_dangling():
+    relations = graph([('a', 'also', 'b'), ('a', 'also', 'b'), ('a', 'also', 'x')],
+                      defined=lambda key: key != 'x')
+    assert relations.issues['duplicate-relation'] == 1
+    assert relations.issues['dangling-relation'] == 1
+    assert relations.targets('a') == [('also', 'b')]
@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+
+################################################################################
+# Luis Morgado da Costa (lmorgado.dacosta@gmail.com)
+# License: MIT License (see tab2lmf.py)
+# Files: tab2lmf.py, lmfwriter.py, translit.py
+################################################################################
+
+
+################################################################################
+# USAGE & NOTES
+################################################################################
+# This file is a companion to lmfwriter.py. unidecode() is one of the most
+# expensive calls per form, and the same forms repeat across senses and
+# languages, so transliterations are memoized:
+#
+# - transliterate(s) looks s up in the pinned table, then in a bounded LRU
+#   cache (functools.lru_cache) around unidecode;
+# - transliterate.batch(forms) transliterates all distinct forms once, up
+#   front, and pins them for the rest of the run (the writer does this
+#   before rendering, so forked workers inherit the table);
+# - transliterate.load(fn) / .save(fn) keep the pinned table on disk
+#   between runs of the same wordnet (a JSON file, discarded when it was
+#   written by another version of unidecode).
+################################################################################
+
+import os, json
+from functools import lru_cache
+from unidecode import unidecode
+
+try:
+    from importlib.metadata import version
+    UNIDECODE_VERSION = version('unidecode')
+except Exception:
+    UNIDECODE_VERSION = None
+
+
+def ascii_form(s):
+    return unidecode(s).strip()
+
+
+class Transliterator:
+    """ascii_form(s), memoized (see the notes above)"""
+
+    def __init__(self, maxsize=1 << 17):
+        self.table = dict()  # pinned transliterations: batch() and load()
+        self.pinned_hits = 0
+        self.batched = 0
+        self.taken = (0, 0, 0)   # (pinned hits, LRU hits, misses) at the last take()
+        self.merged = [0, 0]     # hits and misses of worker processes (merge())
+        self.saved = 0       # len(self.table) when it was last loaded/saved
+        self.resize(maxsize)
+
+    def resize(self, maxsize):
+        """sets the bound of the LRU cache (which is emptied)"""
+        self.lru = lru_cache(maxsize=maxsize)(ascii_form)
+
+    def __call__(self, s):
+        t = self.table.get(s)
+        if t is None:
+            return self.lru(s)
+        self.pinned_hits += 1
+        return t
+
+    def batch(self, forms):
+        """transliterates every distinct form once and pins the results"""
+        table = self.table
+        for s in forms:
+            if s not in table:
+                table[s] = ascii_form(s)
+                self.batched += 1
+
+    def take(self):
+        """the (hits, misses) since the last take() (in worker processes,
+           to be merged by the parent)"""
+        info = self.lru.cache_info()
+        now = (self.pinned_hits, info.hits, info.misses)
+        taken, self.taken = self.taken, now
+        return (now[0] - taken[0] + now[1] - taken[1], now[2] - taken[2])
+
+    def merge(self, counts):
+        self.merged[0] += counts[0]
+        self.merged[1] += counts[1]
+
+    def stats(self):
+        info = self.lru.cache_info()
+        hits = self.pinned_hits + info.hits + self.merged[0]
+        misses = info.misses + self.merged[1]
+        return {'hits': hits,
+                'misses': misses,
+                'batched': self.batched,
+                'hit_rate': hits / (hits + misses) if hits + misses else 0.0,
+                'pinned': len(self.table),
+                'lru_size': info.currsize,
+                'lru_maxsize': info.maxsize}
+
+    def load(self, fn):
+        """pins the transliterations saved in fn, if it exists and was
+           written with the same version of unidecode"""
+        if not os.path.exists(fn):
+            return
+        with open(fn, 'r', encoding='utf-8') as f:
+            try:
+                cache = json.load(f)
+            except ValueError:
+                return
+        if cache.get('unidecode') != UNIDECODE_VERSION:
+            return
+        self.table.update(cache.get('forms', {}))
+        self.saved = len(self.table)
+
+    def save(self, fn):
+        """writes the pinned transliterations to fn (if there are new ones)"""
+        if len(self.table) == self.saved and os.path.exists(fn):
+            return
+        tmp = fn + '.{}.tmp'.format(os.getpid())
+        with open(tmp, 'w', encoding='utf-8') as f:
+            json.dump({'unidecode': UNIDECODE_VERSION, 'forms': self.table}, f,
+                      ensure_ascii=False, separators=(',', ':'))
+        os.replace(tmp, fn)
+        self.saved = len(self.table)
+
+
+transliterate = Transliterator()
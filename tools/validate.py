@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+
+################################################################################
+# Luis Morgado da Costa (lmorgado.dacosta@gmail.com)
+# License: MIT License (see tab2lmf.py)
+# Files: tab2lmf.py, lmfwriter.py, incremental.py, relations.py, validate.py
+################################################################################
+
+
+################################################################################
+# USAGE & NOTES
+################################################################################
+# This file is a companion to tab2lmf.py (--validate). The writers call a
+# Validator with each element as they write it, so the output is checked
+# in the same pass instead of running xmlstarlet on it afterwards:
+#
+# errors:    duplicate-id          the same id on two LexicalEntry, Sense or
+#                                  Synset elements (in the exact mode)
+#            dangling-synset       a synset= (of Senses) that no Synset defines
+#            pos-mismatch          Senses whose entry and synset differ in POS
+# warnings:  other-lexicon-synset  a synset= (of Senses) defined in another
+#                                  lexicon
+#            empty-ili             a Synset with ili="" (not in the ILI map)
+#            duplicate-relation    the same relation given twice (written once)
+#            dangling-relation     a relation to or from a synset or sense
+#                                  that is not in the wordnet (not written)
+#            missing-inverse       a relation without its inverse (e.g. a
+#                                  hypernym without the hyponym back)
+#            possible-duplicate-id an id that may be a duplicate-id (in the
+#                                  Bloom filter mode, where it can also be
+#                                  a false positive)
+#
+# The relation issues are found when the relation graphs are built (see
+# relations.py), and added to the report by relations().
+#
+# Ids are not kept as strings: the exact mode keeps 64-bit hashes of them
+# in sets, and the Bloom filter mode (Validator(bloom=True)) keeps them in
+# fixed-size Bloom filters, sized from the number of elements announced
+# by the writer (expect()). A Bloom filter can wrongly report a duplicate,
+# or miss a dangling reference, with a probability of about error_rate
+# per check, so in this mode duplicates are possible-duplicate-id warnings
+# (a resource is not found invalid for a false positive).
+#
+# Sense references are checked (and counted) once per distinct (synset,
+# POS, lexicon). Entries are written before the synsets of a lexicon, so
+# the writers declare() every synset of the wordnet first, and references
+# are checked as they come. References to synsets that were not declared
+# are checked at the end (finish()): they are kept by name in the exact
+# mode, and as three hashes (24 bytes, so without names in the report) in
+# the Bloom filter mode.
+#
+# validator = Validator()
+# write_lmf(wn, meta, out, validator=validator)   # (calls declare(), finish())
+# report = validator.report()   # a dictionary, ready for json.dump()
+################################################################################
+
+from math import log
+from array import array
+
+MAX_EXAMPLES = 20
+ERRORS = ('duplicate-id', 'dangling-synset', 'pos-mismatch')
+WARNINGS = ('other-lexicon-synset', 'empty-ili',
+            'duplicate-relation', 'dangling-relation', 'missing-inverse',
+            'possible-duplicate-id')
+MASK = (1 << 64) - 1
+
+
+GOLDEN = 0x9E3779B97F4A7C15
+
+
+class BloomFilter:
+    """a set of 64-bit keys in a fixed number of bits: a blocked Bloom
+       filter, where each key sets one bit in each of the 8 words of a
+       single 512-bit block (as accurate as a plain Bloom filter with 8
+       hash functions, for a few integer operations per key)"""
+
+    def __init__(self, capacity, error_rate):
+        # bits per key for error_rate with 8 hash functions, and 30% more
+        # for the uneven load of the blocks
+        bits = 1.3 * max(capacity, 1) * -8 / log(1 - error_rate ** (1 / 8))
+        self.blocks = int(bits / 512) + 1
+        self.words = array('Q', bytes(64 * self.blocks))
+
+    def add(self, h):
+        w = self.words
+        i = h % self.blocks * 8
+        g = h * GOLDEN & MASK  # (the high bits of g give the 8 bits)
+        w[i] |= 1 << (g >> 16 & 63)
+        w[i + 1] |= 1 << (g >> 22 & 63)
+        w[i + 2] |= 1 << (g >> 28 & 63)
+        w[i + 3] |= 1 << (g >> 34 & 63)
+        w[i + 4] |= 1 << (g >> 40 & 63)
+        w[i + 5] |= 1 << (g >> 46 & 63)
+        w[i + 6] |= 1 << (g >> 52 & 63)
+        w[i + 7] |= 1 << (g >> 58)
+
+    def __contains__(self, h):
+        w = self.words
+        i = h % self.blocks * 8
+        g = h * GOLDEN & MASK
+        return bool(w[i] >> (g >> 16 & 63) & w[i + 1] >> (g >> 22 & 63) &
+                    w[i + 2] >> (g >> 28 & 63) & w[i + 3] >> (g >> 34 & 63) &
+                    w[i + 4] >> (g >> 40 & 63) & w[i + 5] >> (g >> 46 & 63) &
+                    w[i + 6] >> (g >> 52 & 63) & w[i + 7] >> (g >> 58) & 1)
+
+
+class Validator:
+    """checks the elements of a WN-LMF resource as they are written"""
+
+    def __init__(self, bloom=False, error_rate=1e-6):
+        self.bloom = bloom
+        self.error_rate = error_rate
+        self.lang = None
+        self.lang_salt = 0
+        self.salts = dict()
+        self.counts = {'Lexicon': 0, 'LexicalEntry': 0, 'Sense': 0, 'Synset': 0}
+        self.issues = dict.fromkeys(ERRORS + WARNINGS, 0)
+        self.examples = {issue: [] for issue in ERRORS + WARNINGS}
+        self.expect(0)
+
+    def expect(self, elements):
+        """starts the validation of a resource with about this many
+           elements (only used to size the Bloom filters)"""
+        if self.bloom:
+            self.ids = BloomFilter(elements, self.error_rate)
+            self.synsets = BloomFilter(3 * elements, self.error_rate)
+            self.refs = BloomFilter(elements, self.error_rate)
+            self.pending = array('Q')  # the three synset keys of each reference
+        else:
+            self.ids = set()
+            self.synsets = set()
+            self.refs = set()
+            self.pending = list()      # (ssID, pos, lang, first sense id)
+
+    ############################################################################
+    # Keys are 64-bit hashes. A synset is known by three: its id (h), h ^ the
+    # salt of its POS and h ^ the salt of its lexicon's language, so that
+    # a reference can be checked for all three without hashing tuples.
+    ############################################################################
+    def salt(self, value):
+        s = self.salts.get(value)
+        if s is None:
+            s = self.salts[value] = hash(('salt', value)) & MASK
+        return s
+
+    def issue(self, issue, **example):
+        self.issues[issue] += 1
+        if example and len(self.examples[issue]) < MAX_EXAMPLES:
+            self.examples[issue].append(example)
+
+    def unique(self, h, id):
+        """adds the key h of id, which should not have been seen yet"""
+        if h in self.ids:
+            self.issue('possible-duplicate-id' if self.bloom else 'duplicate-id', id=id)
+        else:
+            self.ids.add(h)
+
+    def lexicon(self, lang):
+        self.counts['Lexicon'] += 1
+        self.lang = lang
+        self.lang_salt = self.salt(lang)
+
+    def entry(self, lexID, pos, synsets):
+        """a LexicalEntry, with the synset ids of its senses"""
+        refs, known = self.refs, self.synsets
+        self.counts['LexicalEntry'] += 1
+        self.counts['Sense'] += len(synsets)
+        self.unique(hash(lexID) & MASK, lexID)
+
+        pos_salt, lang_salt = self.salt(pos), self.lang_salt
+        for ssID in synsets:
+            senseID = ssID + '-' + lexID
+            self.unique(hash(senseID) & MASK, senseID)
+
+            h = hash(ssID) & MASK
+            r = h ^ pos_salt ^ lang_salt
+            if r in refs:
+                continue  # (already checked, or pending)
+            refs.add(r)
+            if h in known:
+                self.check(h, h ^ pos_salt, h ^ lang_salt, ssID, senseID)
+            elif self.bloom:
+                self.pending.extend((h, h ^ pos_salt, h ^ lang_salt))
+            else:
+                self.pending.append((ssID, pos, self.lang, senseID))
+
+    def declare(self, ssID, pos, lang):
+        """a Synset that will be written (in the lexicon of lang), so that
+           references to it can be checked before it is"""
+        known = self.synsets
+        h = hash(ssID) & MASK
+        known.add(h)
+        known.add(h ^ self.salt(pos))
+        known.add(h ^ self.salt(lang))
+
+    def synset(self, ssID, ili, pos):
+        self.counts['Synset'] += 1
+        known = self.synsets
+        h = hash(ssID) & MASK
+        self.unique(h, ssID)
+        known.add(h)
+        known.add(h ^ self.salt(pos))
+        known.add(h ^ self.lang_salt)
+        if not ili:
+            self.issue('empty-ili', synset=ssID)
+
+    def check(self, h, pos_h, lang_h, ssID=None, senseID=None):
+        example = {'sense': senseID, 'synset': ssID} if ssID else {}
+        if h not in self.synsets:
+            self.issue('dangling-synset', **example)
+        elif pos_h not in self.synsets:
+            self.issue('pos-mismatch', **example)
+        elif lang_h not in self.synsets:
+            self.issue('other-lexicon-synset', **example)
+
+    def finish(self):
+        """checks the references to synsets that came after them"""
+        if self.bloom:
+            pending = self.pending
+            for i in range(0, len(pending), 3):
+                # (the ids are not kept in this mode, so there are no examples)
+                self.check(pending[i], pending[i + 1], pending[i + 2])
+        else:
+            for (ssID, pos, lang, senseID) in self.pending:
+                h = hash(ssID) & MASK
+                self.check(h, h ^ self.salt(pos), h ^ self.salt(lang), ssID, senseID)
+        self.pending = array('Q') if self.bloom else list()
+
+    def relations(self, *graphs):
+        """adds the issues found in relation graphs (relations.Relations)"""
+        for graph in graphs:
+            for issue, n in graph.issues.items():
+                self.issues[issue] += n
+                room = MAX_EXAMPLES - len(self.examples[issue])
+                self.examples[issue].extend(graph.examples[issue][:room])
+
+    def valid(self):
+        return not any(self.issues[issue] for issue in ERRORS)
+
+    def report(self):
+        ids = self.counts['LexicalEntry'] + self.counts['Sense'] + self.counts['Synset']
+        return {'valid': self.valid(),
+                'mode': 'bloom' if self.bloom else 'exact',
+                'error_rate': self.error_rate if self.bloom else 0.0,
+                'expected_false_positives': self.error_rate * ids if self.bloom else 0.0,
+                'elements': dict(self.counts),
+                'errors': {issue: self.issues[issue] for issue in ERRORS},
+                'warnings': {issue: self.issues[issue] for issue in WARNINGS},
+                'examples': {issue: examples for issue, examples in self.examples.items() if examples}}
+
+    def summary(self):
+        issues = ', '.join('{} {}'.format(issue, n) for issue, n in self.issues.items() if n)
+        return '{} ({} LexicalEntry, {} Sense, {} Synset{})'.format(
+            'valid' if self.valid() else 'INVALID',
+            self.counts['LexicalEntry'], self.counts['Sense'], self.counts['Synset'],
+            '; ' + issues if issues else '')
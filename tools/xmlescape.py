@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+
+################################################################################
+# Luis Morgado da Costa (lmorgado.dacosta@gmail.com)
+# License: MIT License (see tab2lmf.py)
+# Files: lmfwriter.py, lexicon.py, xmlescape.py
+################################################################################
+
+
+################################################################################
+# USAGE & NOTES
+################################################################################
+# XML escaping, for the writers (lmfwriter.py) and for the ids that are
+# built once while reading (lexicon.py, index_wn).
+#
+# Every value that comes from the .tab file or from meta is escaped. Most
+# strings have nothing to escape: if a string is printable (so it has no
+# controls) and has none of the special characters (str methods, which
+# are faster than a regex on long texts), it is returned as it is; else a
+# precompiled regex search decides whether the (slower) translate() with
+# the escape table is needed. Characters that are not allowed in XML 1.0
+# (most C0 controls) are dropped.
+#
+# What is escaped when:
+#
+# - ids (of synsets, entries and senses, and so relation targets) are
+#   built from the wnid, the language and the synset field: their parts
+#   are escaped once, when the synset or lexicon is first read (escaping
+#   the parts escapes the whole, as nothing is escaped across them);
+# - the POS is one of POS, and ILI ids are letters and digits, or else
+#   they are escaped; languages and relation types are few, and escaped
+#   once each (escape_name);
+# - free text (lemmas, forms, definitions, examples) is escaped as it is
+#   written.
+################################################################################
+
+import re
+
+POS = frozenset('nvarsctpxu')  # the partOfSpeech values of WN-LMF
+
+_controls = {c: None for c in range(0x20) if chr(c) not in '\t\n\r'}
+_text_table = str.maketrans(dict(_controls, **{'&': '&amp;', '<': '&lt;', '>': '&gt;'}))
+_attr_table = str.maketrans(dict(_controls, **{'&': '&amp;', '<': '&lt;', '>': '&gt;', '"': '&quot;'}))
+_text_special = re.compile('[&<>\x00-\x08\x0b\x0c\x0e-\x1f]').search
+_attr_special = re.compile('[&<>"\x00-\x08\x0b\x0c\x0e-\x1f]').search
+
+
+def escape_text(s):
+    """escapes s for use as element content"""
+    if s.isprintable() and '&' not in s and '<' not in s and '>' not in s:
+        return s
+    if _text_special(s):
+        return s.translate(_text_table)
+    return s
+
+
+def escape_attr(s):
+    """escapes s for use as a (double quoted) attribute value"""
+    if s.isprintable() and '&' not in s and '<' not in s and '>' not in s and '"' not in s:
+        return s
+    if _attr_special(s):
+        return s.translate(_attr_table)
+    return s
+
+
+_names = dict()  # _names[language or relation type] = escaped
+
+
+def escape_name(s):
+    """escape_attr(s), remembered (for the few languages and relation
+       types)"""
+    e = _names.get(s)
+    if e is None:
+        e = _names[s] = escape_attr(s)
+    return e
+